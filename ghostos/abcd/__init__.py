@@ -1,6 +1,6 @@
 from ghostos.abcd.concepts import (
     GhostOS, Ghost, GhostDriver, Shell,
-    Operator, Action,
+    Operator, Action, ParallelAction,
     Session, Scope, StateValue, Messenger,
     Background, Conversation,
     Context,
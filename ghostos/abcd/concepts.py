@@ -55,7 +55,7 @@ and the Most valuable features about ghost are:
 
 __all__ = (
     "Ghost", "GhostDriver", "GhostOS", "Shell", "Conversation", "Background",
-    "Operator", "Action",
+    "Operator", "Action", "ParallelAction",
     "Session", "Messenger", "StateValue", "Scope",
     "Taskflow", "Subtasks",
     "Context",
@@ -251,6 +251,28 @@ class Action(PromptPipe, ABC):
         pass
 
 
+class ParallelAction(Action, ABC):
+    """
+    the action that is safe to run concurrently with other parallel actions.
+    it returns the output messages instead of responding them by session,
+    so the thought can run the calls concurrently and keep the outputs in the calling order.
+    """
+
+    @abstractmethod
+    def execute(self, session: Session, caller: FunctionCaller) -> Tuple[List[MessageKind], Union[Operator, None]]:
+        """
+        run the caller without responding to the session.
+        :return: (output messages, operator)
+        """
+        pass
+
+    def run(self, session: Session, caller: FunctionCaller) -> Union[Operator, None]:
+        messages, op = self.execute(session, caller)
+        if messages:
+            session.respond(messages)
+        return op
+
+
 class GhostOS(Protocol):
 
     @abstractmethod
@@ -362,6 +384,31 @@ class Shell(ABC):
     def submit(self, caller: Callable, *args, **kwargs):
         pass
 
+    @abstractmethod
+    def prewarm(
+            self,
+            *,
+            ghosts: Iterable[Union[Ghost, str]] = (),
+            modules: Iterable[str] = (),
+            llm_apis: Iterable[str] = (),
+    ) -> None:
+        """
+        import the ghosts, compile the moss modules with their prompts and build the llm apis in the background,
+        so the first requests cost the same as the steady ones.
+        :param ghosts: the ghost instances or their import paths.
+        :param modules: the moss module names.
+        :param llm_apis: the llm api names, empty string means the default one.
+        """
+        pass
+
+    @abstractmethod
+    def prewarm_status(self, timeout: float = 0.0) -> Dict[str, str]:
+        """
+        :param timeout: if positive, wait for the prewarming until timeout.
+        :return: prewarm target => pending, ready or failed with the reason.
+        """
+        pass
+
     @abstractmethod
     def close(self):
         pass
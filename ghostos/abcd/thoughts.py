@@ -1,7 +1,12 @@
 from typing import Optional, Generic, TypeVar, Tuple, List, Iterable
+import time
+from threading import Event
 from abc import ABC, abstractmethod
-from ghostos.abcd.concepts import Session, Operator, Action
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from ghostos.abcd.concepts import Session, Operator, Action, ParallelAction
 from ghostos.core.llms import Prompt, ModelConf, ServiceConf, LLMs, LLMApi
+from ghostos.core.messages import FunctionCaller
+from ghostos.contracts.pool import Pool
 from pydantic import BaseModel, Field
 
 __all__ = ['Thought', 'LLMThought', 'SummaryThought', 'ChainOfThoughts']
@@ -49,6 +54,8 @@ class LLMThought(Thought[Operator]):
             message_stage: str = "",
             model: Optional[ModelConf] = None,
             service: Optional[ServiceConf] = None,
+            parallel: bool = False,
+            parallel_timeout: float = 60.0,
     ):
         """
 
@@ -57,11 +64,18 @@ class LLMThought(Thought[Operator]):
         :param actions:
         :param model: the llm model to use, if given, overrides llm_api
         :param service: the llm service to use, if given, override ModelConf service field
+        :param parallel: run the adjacent calls of ParallelAction concurrently on the shell pool
+        :param parallel_timeout: timeout in seconds of each parallel call, counted from the call starts,
+            the time waiting for a free pool worker is not counted.
+            a python thread can not be killed, so a timed-out call keeps running in the pool until it returns,
+            its outputs are discarded and it keeps occupying a pool worker till then.
         """
         self.llm_api = llm_api
         self.message_stage = message_stage
         self.model = model
         self.service = service
+        self.parallel = parallel
+        self.parallel_timeout = parallel_timeout
         self.actions = {}
         if actions:
             self.actions = {action.name(): action for action in actions}
@@ -78,13 +92,92 @@ class LLMThought(Thought[Operator]):
         prompt.added.extend(messages)
         session.logger.debug("llm thinking on prompt %s is done", prompt.id)
 
+        pool = session.container.get(Pool) if self.parallel else None
+        batch: List[FunctionCaller] = []
         for caller in callers:
-            if caller.name in self.actions:
-                action = self.actions[caller.name]
-                op = action.run(session, caller)
-                if op is not None:
-                    return prompt, op
-        return prompt, None
+            if caller.name not in self.actions:
+                continue
+            action = self.actions[caller.name]
+            if pool is not None and isinstance(action, ParallelAction):
+                batch.append(caller)
+                continue
+            op = self._run_parallel(session, pool, batch)
+            batch = []
+            if op is not None:
+                return prompt, op
+            op = action.run(session, caller)
+            if op is not None:
+                return prompt, op
+        op = self._run_parallel(session, pool, batch)
+        return prompt, op
+
+    def _run_parallel(
+            self,
+            session: Session,
+            pool: Optional[Pool],
+            callers: List[FunctionCaller],
+    ) -> Optional[Operator]:
+        """
+        run the callers of parallel actions concurrently, respond the outputs in the calling order.
+        :return: the first operator in the calling order.
+        """
+        if not callers:
+            return None
+        if len(callers) == 1:
+            return self.actions[callers[0].name].run(session, callers[0])
+        futures: List[Future] = []
+        started: List[Event] = []
+        started_at: List[float] = [0.0] * len(callers)
+        for i, caller in enumerate(callers):
+            action = self.actions[caller.name]
+            event = Event()
+            started.append(event)
+            futures.append(pool.submit(self._execute_started, event, started_at, i, action, session, caller))
+
+        operator = None
+        for i, (caller, future, event) in enumerate(zip(callers, futures, started)):
+            try:
+                # the call may wait in the pool queue, its timeout counts from the start.
+                while not event.wait(0.05):
+                    if future.done():
+                        break
+                deadline = (started_at[i] or time.time()) + self.parallel_timeout
+                outputs, op = future.result(timeout=max(deadline - time.time(), 0))
+            except FutureTimeoutError:
+                # still running, log when it returns at last.
+                future.add_done_callback(self._log_discarded(session, caller))
+                session.logger.error("parallel call %s timeout after %s seconds", caller.id, self.parallel_timeout)
+                outputs, op = [caller.new_output(f"call timeout after {self.parallel_timeout} seconds")], None
+            except Exception as e:
+                session.logger.exception("parallel call %s failed: %s", caller.id, e)
+                outputs, op = [caller.new_output(f"call failed: {e}")], None
+            if outputs:
+                session.respond(outputs)
+            if operator is None:
+                operator = op
+        return operator
+
+    @staticmethod
+    def _execute_started(
+            event: Event,
+            started_at: List[float],
+            index: int,
+            action: ParallelAction,
+            session: Session,
+            caller: FunctionCaller,
+    ):
+        started_at[index] = time.time()
+        event.set()
+        return action.execute(session, caller)
+
+    @staticmethod
+    def _log_discarded(session: Session, caller: FunctionCaller):
+        logger = session.logger
+
+        def callback(future: Future) -> None:
+            logger.warning("parallel call %s returned after timeout, the outputs are discarded", caller.id)
+
+        return callback
 
     def get_llm_api(self, session: Session) -> LLMApi:
         llms = session.container.force_fetch(LLMs)
@@ -1,6 +1,7 @@
 from typing import Optional, Type, Union, List
 from types import ModuleType
-from ghostos.helpers import import_class_from_path
+from weakref import WeakKeyDictionary
+from ghostos.helpers import import_class_from_path, import_path_registry
 from ghostos.identifier import get_identifier
 from ghostos.entity import to_entity_meta
 from ghostos.abcd.concepts import Ghost, GhostDriver, Session, Operator
@@ -14,16 +15,37 @@ __all__ = [
 ]
 
 
+# ghost class => driver type found by the default protocol.
+_ghost_driver_types: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def _invalidate_ghost_driver_types(modulename: Optional[str]) -> None:
+    if modulename is None:
+        _ghost_driver_types.clear()
+        return
+    for ghost_type in list(_ghost_driver_types.keys()):
+        if ghost_type.__module__ == modulename or ghost_type.__module__.startswith(modulename + "."):
+            _ghost_driver_types.pop(ghost_type, None)
+
+
+import_path_registry.add_invalidation_hook(_invalidate_ghost_driver_types)
+
+
 def get_ghost_driver_type(ghost: Ghost) -> Type[GhostDriver]:
     """
     get ghost driver instance by default protocol
     """
     if ghost.DriverType is not None:
         return ghost.DriverType
-    name = ghost.__class__.__name__
-    module_name = ghost.__class__.__module__
+    ghost_type = ghost.__class__
+    cls = _ghost_driver_types.get(ghost_type, None)
+    if cls is not None:
+        return cls
+    name = ghost_type.__name__
+    module_name = ghost_type.__module__
     import_path = f"{module_name}:{name}Driver"
     cls = import_class_from_path(import_path, GhostDriver)
+    _ghost_driver_types[ghost_type] = cls
     return cls
 
 
@@ -1,11 +1,11 @@
 from __future__ import annotations
 import yaml
 from warnings import warn
+from threading import Lock
 from typing import List, Optional, Tuple
 from os.path import dirname, join, exists, abspath, isdir
 from ghostos.abcd import GhostOS
 from ghostos.container import Container, Provider, Contracts
-from ghostos.prototypes.ghostfunc import init_ghost_func, GhostFunc
 from pydantic import BaseModel, Field
 
 # Core Concepts
@@ -257,7 +257,7 @@ def default_application_providers(
     """
     from ghostos.contracts.shutdown import ShutdownProvider
     from ghostos.contracts.modules import DefaultModulesProvider
-    from ghostos.core.moss import DefaultMOSSProvider
+    from ghostos.core.moss import DefaultMOSSProvider, MossSandboxProvider
     from ghostos.core.messages.openai import DefaultOpenAIParserProvider
     from ghostos.framework.workspaces import BasicWorkspaceProvider
     from ghostos.framework.configs import WorkspaceConfigsProvider
@@ -272,7 +272,10 @@ def default_application_providers(
     from ghostos.framework.ghostos import GhostOSProvider
     from ghostos.framework.documents import ConfiguredDocumentRegistryProvider
     from ghostos.framework.realtime import ConfigBasedRealtimeProvider
-    from ghostos.core.aifunc import DefaultAIFuncExecutorProvider, AIFuncRepoByConfigsProvider
+    from ghostos.core.aifunc import (
+        DefaultAIFuncExecutorProvider, AIFuncRepoByConfigsProvider, AIFuncResultCacheInWorkspaceProvider,
+        AIFuncCodeStoreInWorkspaceProvider,
+    )
 
     # session level libraries
     from ghostos.libraries.replier import ReplierImplProvider
@@ -308,6 +311,7 @@ def default_application_providers(
 
         # --- moss --- #
         DefaultMOSSProvider(),
+        MossSandboxProvider(),
 
         # --- llm --- #
         ConfigBasedLLMsProvider(),
@@ -321,6 +325,10 @@ def default_application_providers(
         # --- aifunc --- #
         DefaultAIFuncExecutorProvider(),
         AIFuncRepoByConfigsProvider(),
+        # only the AIFuncs with `__aifunc_memoize__` use the cache.
+        AIFuncResultCacheInWorkspaceProvider(),
+        # only the AIFuncs with `__aifunc_reuse_code__` reuse the code.
+        AIFuncCodeStoreInWorkspaceProvider(),
 
         GhostOSProvider(),
         ConfigBasedRealtimeProvider(),
@@ -373,21 +381,43 @@ def make_app_container(
     return _container
 
 
-application_container = make_app_container()
-""" the global static application container. reset it before application usage"""
+# the global static application container is made at the first access of `application_container`,
+# reset it before application usage.
+_app_container_lock = Lock()
+
 
-ghost_func = init_ghost_func(application_container)
-""" the default ghost func on default container"""
+def __getattr__(name: str):
+    # the application container and the ghost func prototype import the llm drivers,
+    # which are slow to import, so they are made at the first access.
+    if name == "application_container":
+        return get_container()
+    elif name == "ghost_func":
+        from ghostos.prototypes.ghostfunc import init_ghost_func
+        func = init_ghost_func(get_container())
+        globals()["ghost_func"] = func
+        return func
+    elif name in ("GhostFunc", "init_ghost_func"):
+        from ghostos.prototypes import ghostfunc
+        return getattr(ghostfunc, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_ghostos(container: Optional[Container] = None) -> GhostOS:
     if container is None:
-        container = application_container
+        container = get_container()
     return container.force_fetch(GhostOS)
 
 
 def get_container() -> Container:
-    return application_container
+    container = globals().get("application_container")
+    if container is not None:
+        return container
+    with _app_container_lock:
+        container = globals().get("application_container")
+        if container is None:
+            container = make_app_container()
+            globals()["application_container"] = container
+        return container
 
 
 def reset(con: Container) -> Container:
@@ -396,11 +426,11 @@ def reset(con: Container) -> Container:
     :param con: a container with application level contract bindings, shall be validated outside.
     :return:
     """
-    global application_container, ghost_func
+    global application_container
     # reset global container
     application_container = con
-    # reset global ghost func
-    ghost_func = init_ghost_func(application_container)
+    # reset global ghost func, it is created again on the default container at the next access.
+    globals().pop("ghost_func", None)
     return application_container
 
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 import inspect
 from abc import ABCMeta, abstractmethod
 from typing import Type, Dict, TypeVar, Callable, Set, Optional, List, Generic, Any, Union, Iterable
-from typing import get_args, get_origin, ClassVar
+from typing import get_args, get_origin, ClassVar, Tuple
 import warnings
 
 __all__ = [
@@ -171,6 +171,16 @@ class Container(IoCContainer):
         self._aliases: Dict[Any, Any] = {}
         self._is_shutdown: bool = False
         self._shutdown: List[Callable[[], None]] = []
+        # version of the bindings of this container.
+        self._version: int = 0
+        self._frozen: bool = False
+        # the providers and aliases are shared with the parent's inheritable bindings until changed.
+        self._shared_bindings: bool = False
+        self._inherited_providers: Dict[Any, Provider] = {}
+        # cache of the inheritable bindings for the children, with the versions of the chain.
+        self._inheritable: Optional[Tuple[Tuple[int, ...], Dict[Any, Provider], Dict[Any, Any], Set]] = None
+        # abstract => (versions of the ancestors chain, the ancestor container that binds it or None)
+        self._resolved: Dict[Any, Tuple[Tuple[int, ...], Optional[Container]]] = {}
         if inherit and parent is not None:
             self._inherit(parent)
 
@@ -180,9 +190,77 @@ class Container(IoCContainer):
         """
         inherit none singleton provider from parent
         """
-        for provider in parent.providers(recursively=True):
+        _, providers, aliases, bound = parent._inheritable_bindings()
+        self._providers = providers
+        self._inherited_providers = providers
+        self._aliases = aliases
+        self._bound = bound.copy()
+        self._shared_bindings = True
+
+    def _chain_versions(self) -> Tuple[int, ...]:
+        versions = []
+        container = self
+        while container is not None:
+            versions.append(container._version)
+            container = container.parent
+        return tuple(versions)
+
+    def _inheritable_bindings(self) -> Tuple[Tuple[int, ...], Dict[Any, Provider], Dict[Any, Any], Set]:
+        """
+        the bindings of the inheritable providers for the children, computed once until the chain changed.
+        """
+        versions = self._chain_versions()
+        cached = self._inheritable
+        if cached is not None and cached[0] == versions:
+            return cached
+        providers = {}
+        aliases = {}
+        bound = set()
+        # same as registering the providers one by one.
+        for provider in self.providers(recursively=True):
             if provider.inheritable() and not isinstance(provider, Bootstrapper):
-                self._register(provider)
+                contract = provider.contract()
+                bound.add(contract)
+                providers[contract] = provider
+                for alias in provider.aliases():
+                    if alias not in bound:
+                        aliases[alias] = contract
+                        bound.add(alias)
+        cached = (versions, providers, aliases, bound)
+        self._inheritable = cached
+        return cached
+
+    def _own_bindings(self) -> None:
+        """
+        copy the shared bindings before changing them.
+        """
+        if self._shared_bindings:
+            self._providers = self._providers.copy()
+            self._aliases = self._aliases.copy()
+            self._shared_bindings = False
+
+    def _check_frozen(self) -> None:
+        if self._frozen:
+            raise RuntimeError(f"container {self.bloodline} is frozen")
+
+    def _changed(self) -> None:
+        self._version += 1
+
+    def freeze(self) -> Container:
+        """
+        freeze the container as a template, its bindings can not be changed any more.
+        the children share the bindings of the template, so they are cheap to create for each session.
+        the singletons are still made lazily.
+        :return: self
+        """
+        self._check_destroyed()
+        self.bootstrap()
+        self._inheritable_bindings()
+        self._frozen = True
+        return self
+
+    def frozen(self) -> bool:
+        return self._frozen
 
     def bootstrap(self) -> None:
         """
@@ -196,7 +274,11 @@ class Container(IoCContainer):
         if self._bootstrapper:
             for b in self._bootstrapper:
                 b.bootstrap(self)
-        for provider in self._providers.values():
+        inherited = self._inherited_providers
+        for contract, provider in self._providers.items():
+            # the inherited providers are never bootstrapper.
+            if inherited.get(contract, None) is provider:
+                continue
             # some bootstrapper provider may be override
             if isinstance(provider, Bootstrapper):
                 provider.bootstrap(self)
@@ -209,9 +291,12 @@ class Container(IoCContainer):
         设置一个实例, 不会污染父容器.
         """
         self._check_destroyed()
+        self._check_frozen()
         if abstract in self._providers:
+            self._own_bindings()
             del self._providers[abstract]
         self._set_instance(abstract, instance)
+        self._changed()
 
     def _add_bound_contract(self, abstract: ABSTRACT) -> None:
         """
@@ -260,9 +345,41 @@ class Container(IoCContainer):
 
         # at last
         if self.parent is not None:
-            return self.parent.get(abstract)
+            owner = self._resolve_owner(abstract)
+            if owner is not None:
+                got = owner._instances.get(abstract, None)
+                if got is not None and not owner._is_shutdown:
+                    return got
+                return owner.get(abstract)
         return None
 
+    def _binds(self, abstract: Any) -> bool:
+        return (
+                self._instances.get(abstract, None) is not None
+                or abstract in self._providers
+                or abstract in self._aliases
+        )
+
+    def _resolve_owner(self, abstract: Any) -> Optional[Container]:
+        """
+        find the ancestor that binds the abstract, cached until the bindings of the ancestors changed.
+        """
+        version = self.parent._chain_versions()
+        resolved = self._resolved.get(abstract, None)
+        if resolved is not None and resolved[0] == version:
+            return resolved[1]
+        owner = self.parent
+        while owner is not None:
+            owner._check_destroyed()
+            if not owner._bootstrapped:
+                warnings.warn("container is not bootstrapped before using")
+                owner.bootstrap()
+            if owner._binds(abstract):
+                break
+            owner = owner.parent
+        self._resolved[abstract] = (version, owner)
+        return owner
+
     def get_bound(self, abstract: ABSTRACT) -> Union[INSTANCE, Provider, None]:
         """
         get bound of an abstract
@@ -300,8 +417,10 @@ class Container(IoCContainer):
         register factory of the contract by provider
         """
         self._check_destroyed()
+        self._check_frozen()
         for provider in providers:
             self._register(provider)
+        self._changed()
 
     def _register(self, provider: Provider) -> None:
         contract = provider.contract()
@@ -317,6 +436,7 @@ class Container(IoCContainer):
             provider.bootstrap(self)
 
     def _bind_alias(self, alias: Any, contract: Any) -> None:
+        self._own_bindings()
         self._aliases[alias] = contract
         self._bound.add(alias)
 
@@ -325,6 +445,7 @@ class Container(IoCContainer):
         if contract in self._instances:
             del self._instances[contract]
         # override the existing one
+        self._own_bindings()
         self._providers[contract] = provider
 
     def add_bootstrapper(self, bootstrapper: Bootstrapper) -> None:
@@ -334,6 +455,7 @@ class Container(IoCContainer):
         :return:
         """
         self._check_destroyed()
+        self._check_frozen()
         if not self._bootstrapped:
             self._bootstrapper.append(bootstrapper)
 
@@ -429,9 +551,11 @@ class Container(IoCContainer):
         del self._bootstrapper
         del self._bootstrapped
         del self._aliases
+        del self._resolved
+        del self._inheritable
+        del self._inherited_providers
         Container.instance_count -= 1
 
-
 Factory = Callable[[Container], Any]
 
 
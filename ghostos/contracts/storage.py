@@ -1,7 +1,10 @@
-from typing import Optional, Iterable
+from typing import Optional, Iterable, Dict, Tuple
 from abc import ABC, abstractmethod
+import os
+import threading
+import time
 
-__all__ = ['Storage', 'FileStorage']
+__all__ = ['Storage', 'FileStorage', 'LRUFileStore']
 
 
 class Storage(ABC):
@@ -74,3 +77,86 @@ class FileStorage(Storage, ABC):
         FileStorage's sub storage is still FileStorage
         """
         pass
+
+
+class LRUFileStore:
+    """
+    size-bounded store of the files with the same suffix in a FileStorage.
+    reading a file touches its mtime, the least recently used files are evicted when the total size exceeds.
+    """
+
+    def __init__(self, storage: FileStorage, suffix: str, max_bytes: int):
+        """
+        :param storage: the storage of the files
+        :param suffix: suffix of the file names, the other files in the storage are ignored.
+        :param max_bytes: max total size of the files.
+        """
+        self._storage = storage
+        self._suffix = suffix
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes: Optional[Dict[str, Tuple[float, int]]] = None
+
+    def filename(self, key: str) -> str:
+        return f"{key}{self._suffix}"
+
+    def _abspath(self, filename: str) -> str:
+        return os.path.join(self._storage.abspath(), filename)
+
+    def _index(self) -> Dict[str, Tuple[float, int]]:
+        if self._sizes is None:
+            sizes = {}
+            directory = self._storage.abspath()
+            if os.path.isdir(directory):
+                for entry in os.scandir(directory):
+                    if entry.is_file() and entry.name.endswith(self._suffix):
+                        stat = entry.stat()
+                        sizes[entry.name] = (stat.st_mtime, stat.st_size)
+            self._sizes = sizes
+        return self._sizes
+
+    def get(self, key: str) -> Optional[bytes]:
+        filename = self.filename(key)
+        if not self._storage.exists(filename):
+            return None
+        content = self._storage.get(filename)
+        with self._lock:
+            index = self._index()
+            now = time.time()
+            # touch the file to keep the recently used ones.
+            os.utime(self._abspath(filename), (now, now))
+            index[filename] = (now, len(content))
+        return content
+
+    def put(self, key: str, content: bytes) -> None:
+        filename = self.filename(key)
+        with self._lock:
+            self._storage.put(filename, content)
+            index = self._index()
+            index[filename] = (time.time(), len(content))
+            self._evict(index)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(self._index(), self.filename(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            index = self._index()
+            for filename in list(index.keys()):
+                self._remove(index, filename)
+
+    def _remove(self, index: Dict[str, Tuple[float, int]], filename: str) -> None:
+        if self._storage.exists(filename):
+            self._storage.remove(filename)
+        index.pop(filename, None)
+
+    def _evict(self, index: Dict[str, Tuple[float, int]]) -> None:
+        total = sum(size for _, size in index.values())
+        if total <= self._max_bytes:
+            return
+        for filename, (_, size) in sorted(index.items(), key=lambda x: x[1][0]):
+            if total <= self._max_bytes:
+                break
+            self._remove(index, filename)
+            total -= size
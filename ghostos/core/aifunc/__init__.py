@@ -1,10 +1,17 @@
 from ghostos.core.aifunc.driver import DefaultAIFuncDriverImpl
 from ghostos.core.aifunc.interfaces import (
     AIFunc, AIFuncResult, AIFuncCtx, AIFuncDriver, AIFuncExecutor,
-    AIFuncRepository,
-    ExecFrame, ExecStep,
+    AIFuncRepository, AIFuncResultCache, AIFuncCodeStore,
+    ExecFrame, ExecStep, ExecDagRun,
+    TooManyFailureError, AIFuncCanceledError,
 )
 from ghostos.core.aifunc.func import get_aifunc_result_type
-from ghostos.core.aifunc.executor import DefaultAIFuncExecutorImpl, DefaultAIFuncExecutorProvider
+from ghostos.core.aifunc.executor import (
+    DefaultAIFuncExecutorImpl, DefaultAIFuncExecutorProvider, AIFuncParallelism,
+)
 from ghostos.core.aifunc.repository import AIFuncRepoByConfigsProvider, AIFuncRepoByConfigs, AIFuncsConf
 
+from ghostos.core.aifunc.cache import (
+    AIFuncResultCacheByStorage, AIFuncResultCacheInWorkspaceProvider,
+    AIFuncCodeStoreByStorage, AIFuncCodeStoreInWorkspaceProvider,
+)
@@ -0,0 +1,183 @@
+from typing import Optional, Dict, Tuple, Type
+from hashlib import sha1
+import inspect
+import json
+import os
+import threading
+import time
+
+from ghostos.core.aifunc.func import AIFunc, AIFuncResult
+from ghostos.core.aifunc.interfaces import AIFuncResultCache, AIFuncCodeStore
+from ghostos.contracts.storage import FileStorage, Storage, LRUFileStore
+from ghostos.contracts.workspace import Workspace
+from ghostos.container import Provider, Container
+from ghostos.entity import EntityMeta, to_entity_meta, get_entity
+from ghostos.helpers import generate_import_path
+
+__all__ = [
+    'AIFuncResultCacheByStorage', 'AIFuncResultCacheInWorkspaceProvider',
+    'AIFuncCodeStoreByStorage', 'AIFuncCodeStoreInWorkspaceProvider',
+    'aifunc_cache_key', 'aifunc_source_version',
+]
+
+_source_versions: Dict[str, Tuple[float, str]] = {}
+_source_versions_lock = threading.Lock()
+
+
+def aifunc_source_version(cls: Type[AIFunc]) -> str:
+    """
+    the hash of the source file that defines the AIFunc, change of the code expires the cached results.
+    """
+    try:
+        filename = inspect.getsourcefile(cls)
+    except TypeError:
+        filename = None
+    if not filename or not os.path.exists(filename):
+        return ""
+    mtime = os.path.getmtime(filename)
+    with _source_versions_lock:
+        cached = _source_versions.get(filename)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(filename, "rb") as f:
+        version = sha1(f.read()).hexdigest()
+    with _source_versions_lock:
+        _source_versions[filename] = (mtime, version)
+    return version
+
+
+def aifunc_cache_key(fn: AIFunc) -> str:
+    """
+    key of the request by the entity of the AIFunc and the version of its source code.
+    """
+    meta = to_entity_meta(fn)
+    version = aifunc_source_version(type(fn))
+    return sha1(f"{meta['type']}\n{version}\n{meta['content']}".encode()).hexdigest()
+
+
+class AIFuncResultCacheByStorage(AIFuncResultCache):
+    """
+    save each result as a json file, the expired ones are ignored,
+    and the least recently used ones are evicted when the total size exceeds.
+    """
+
+    def __init__(self, storage: FileStorage, ttl: float = 24 * 3600, max_bytes: int = 64 * 1024 * 1024):
+        """
+        :param storage: the storage of the result files
+        :param ttl: seconds of the result is valid after saved, not positive means forever.
+        :param max_bytes: max total size of the result files.
+        """
+        self._store = LRUFileStore(storage, ".aifunc_result.json", max_bytes)
+        self._ttl = ttl
+
+    def get(self, fn: AIFunc) -> Optional[AIFuncResult]:
+        key = aifunc_cache_key(fn)
+        content = self._store.get(key)
+        if content is None:
+            return None
+        data = json.loads(content)
+        if 0 < self._ttl < time.time() - data["created"]:
+            self._store.remove(key)
+            return None
+        meta: EntityMeta = data["result"]
+        return get_entity(meta, AIFuncResult)
+
+    def save(self, fn: AIFunc, result: AIFuncResult) -> None:
+        data = dict(
+            func=generate_import_path(type(fn)),
+            created=time.time(),
+            result=to_entity_meta(result),
+        )
+        content = json.dumps(data, ensure_ascii=False).encode()
+        self._store.put(aifunc_cache_key(fn), content)
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+class AIFuncResultCacheInWorkspaceProvider(Provider[AIFuncResultCache]):
+    """
+    cache the results of the memoized AIFuncs in the workspace runtime cache.
+    """
+
+    def __init__(
+            self,
+            relative_path: str = "aifunc_results",
+            ttl: float = 24 * 3600,
+            max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self._relative_path = relative_path
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+
+    def singleton(self) -> bool:
+        return True
+
+    def factory(self, con: Container) -> Optional[AIFuncResultCache]:
+        ws = con.force_fetch(Workspace)
+        storage = ws.runtime_cache().sub_storage(self._relative_path)
+        return AIFuncResultCacheByStorage(storage, self._ttl, self._max_bytes)
+
+
+class AIFuncCodeStoreByStorage(AIFuncCodeStore):
+    """
+    save the code of each AIFunc version as a json file, and keep the loaded ones in memory.
+    """
+
+    def __init__(self, storage: Storage):
+        self._storage = storage
+        self._codes: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_filename(fn: Type[AIFunc]) -> str:
+        key = sha1(f"{generate_import_path(fn)}\n{aifunc_source_version(fn)}".encode()).hexdigest()
+        return f"{key}.aifunc_code.json"
+
+    def get_code(self, fn: Type[AIFunc]) -> Optional[str]:
+        filename = self._get_filename(fn)
+        with self._lock:
+            if filename in self._codes:
+                return self._codes[filename]
+        code = None
+        if self._storage.exists(filename):
+            data = json.loads(self._storage.get(filename))
+            code = data["code"]
+        with self._lock:
+            self._codes[filename] = code
+        return code
+
+    def save_code(self, fn: Type[AIFunc], code: str) -> None:
+        filename = self._get_filename(fn)
+        data = dict(
+            func=generate_import_path(fn),
+            created=time.time(),
+            code=code,
+        )
+        with self._lock:
+            self._storage.put(filename, json.dumps(data, ensure_ascii=False, indent=2).encode())
+            self._codes[filename] = code
+
+    def discard_code(self, fn: Type[AIFunc]) -> None:
+        filename = self._get_filename(fn)
+        with self._lock:
+            if self._storage.exists(filename):
+                self._storage.remove(filename)
+            self._codes[filename] = None
+
+
+class AIFuncCodeStoreInWorkspaceProvider(Provider[AIFuncCodeStore]):
+    """
+    store the reusable code of the AIFuncs in the workspace runtime cache.
+    """
+
+    def __init__(self, relative_path: str = "aifunc_codes"):
+        self._relative_path = relative_path
+
+    def singleton(self) -> bool:
+        return True
+
+    def factory(self, con: Container) -> Optional[AIFuncCodeStore]:
+        ws = con.force_fetch(Workspace)
+        storage = ws.runtime_cache().sub_storage(self._relative_path)
+        return AIFuncCodeStoreByStorage(storage)
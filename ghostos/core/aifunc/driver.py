@@ -2,7 +2,7 @@ import traceback
 from typing import Tuple, List, Optional, Any
 
 from ghostos.core.aifunc.interfaces import (
-    AIFuncDriver, AIFuncExecutor, ExecStep, ExecFrame, AIFuncRepository,
+    AIFuncDriver, AIFuncExecutor, ExecStep, ExecFrame, AIFuncRepository, AIFuncCodeStore,
     TooManyFailureError,
 )
 from ghostos.core.aifunc.func import (
@@ -86,6 +86,10 @@ class DefaultAIFuncDriverImpl(AIFuncDriver):
     def __init__(self, fn: AIFunc):
         self.error_times = 0
         self.max_error_times = 3
+        # the stored code is tried at the first step only.
+        self.stored_code_tried = False
+        # the code depends on the observations of the previous steps, shall not be reused.
+        self.observed = False
         super().__init__(fn)
 
     def name(self) -> str:
@@ -147,19 +151,88 @@ class DefaultAIFuncDriverImpl(AIFuncDriver):
     def on_system_messages(self, messages: List[Message]) -> None:
         pass
 
-    def think(
+    def compile_runtime(
             self,
             manager: AIFuncExecutor,
             thread: GoThreadInfo,
             step: ExecStep,
-            upstream: Optional[Stream]
-    ) -> Tuple[GoThreadInfo, Optional[Any], bool]:
+            upstream: Optional[Stream],
+    ) -> MossRuntime:
         # get compiler by current exec step
         # the MossCompiler.container().get(AIFuncCtx) will bind this step.
         compiler = manager.compiler(step, upstream)
         compiler.join_context(thread.get_pycontext())
         compiler.bind(self.aifunc.__class__, self.aifunc)
-        runtime = compiler.compile(None)
+        return compiler.compile(None)
+
+    def get_code_store(self, manager: AIFuncExecutor) -> Optional[AIFuncCodeStore]:
+        if not self.aifunc.__aifunc_reuse_code__:
+            return None
+        return manager.container().get(AIFuncCodeStore)
+
+    def think_with_stored_code(
+            self,
+            manager: AIFuncExecutor,
+            thread: GoThreadInfo,
+            step: ExecStep,
+            upstream: Optional[Stream],
+    ) -> Optional[Tuple[GoThreadInfo, Optional[Any], bool]]:
+        """
+        execute the code that succeeded before without calling the llm.
+        :return: None if no code stored or the code failed on the request, then think by the llm.
+        """
+        store = self.get_code_store(manager)
+        if store is None:
+            return None
+        code = store.get_code(self.aifunc.__class__)
+        if not code:
+            return None
+
+        runtime = self.compile_runtime(manager, thread, step, upstream)
+        try:
+            executed = runtime.execute(
+                code=code,
+                target='main',
+                local_args=['moss'],
+                kwargs={"fn": self.aifunc},
+            )
+            result, finish = executed.returns
+            result_type = get_aifunc_result_type(self.aifunc.__class__)
+            if finish is not True or not isinstance(result, result_type):
+                raise RuntimeError(f"stored code returns unfinished result {result!r}")
+        except TooManyFailureError:
+            raise
+        except Exception as e:
+            # the stored code no longer works, think by the llm and replace it.
+            store.discard_code(self.aifunc.__class__)
+            # keep the failure for the analysis, but not in the thread the llm reads.
+            step.messages.append(Role.new_system(content=f"stored code of the AIFunc failed, think by llm: {e}"))
+            return None
+        finally:
+            runtime.close()
+
+        generation = Role.ASSISTANT.new(content=f"{CODE_MARK_LEFT}\n{code}\n{CODE_MARK_RIGHT}")
+        thread.append(generation)
+        step.generate = generation
+        step.std_output = executed.std_output
+        step.pycontext = executed.pycontext
+        self.on_message(generation, step, upstream)
+        return thread, result, True
+
+    def think(
+            self,
+            manager: AIFuncExecutor,
+            thread: GoThreadInfo,
+            step: ExecStep,
+            upstream: Optional[Stream]
+    ) -> Tuple[GoThreadInfo, Optional[Any], bool]:
+        if not self.stored_code_tried:
+            self.stored_code_tried = True
+            done = self.think_with_stored_code(manager, thread, step, upstream)
+            if done is not None:
+                return done
+
+        runtime = self.compile_runtime(manager, thread, step, upstream)
         # 使用默认的方法, 将 thread 转成 chat.
         systems = self.generate_system_messages(runtime)
         systems.append(Role.SYSTEM.new(
@@ -258,6 +331,12 @@ class DefaultAIFuncDriverImpl(AIFuncDriver):
             # I think this method is thread-safe
             step.messages.extend(messages)
             self.error_times = 0
+            if not finish:
+                self.observed = True
+            elif not self.observed:
+                store = self.get_code_store(manager)
+                if store is not None:
+                    store.save_code(self.aifunc.__class__, code)
         except TooManyFailureError:
             raise
         except Exception as e:
@@ -1,17 +1,192 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-from typing import Dict, Any, Optional, Type, Callable, Iterable
+from typing import Dict, Any, Optional, Type, Callable, Iterable, Tuple, List, Union
 from typing_extensions import Self
+from threading import BoundedSemaphore, Event, Lock
+from functools import partial
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+import time
 
 from ghostos.container import Container, Provider, ABSTRACT
+from ghostos.contracts.pool import Pool, DefaultPool
 from ghostos.core.llms import LLMApi, LLMs
 from ghostos.core.moss import MossCompiler
 from ghostos.core.aifunc.func import AIFunc, AIFuncResult, get_aifunc_result_type
-from ghostos.core.aifunc.interfaces import AIFuncExecutor, AIFuncCtx, AIFuncDriver, ExecFrame, ExecStep
+from ghostos.core.aifunc.interfaces import (
+    AIFuncExecutor, AIFuncCtx, AIFuncDriver, ExecFrame, ExecStep, ExecDagRun,
+    AIFuncCanceledError, AIFuncResultCache, AIFuncRepository,
+)
 from ghostos.core.aifunc.driver import DefaultAIFuncDriverImpl
 from ghostos.core.messages import Stream, MessageType
 
-__all__ = ['DefaultAIFuncExecutorImpl', 'DefaultAIFuncExecutorProvider']
+__all__ = ['DefaultAIFuncExecutorImpl', 'DefaultAIFuncExecutorProvider', 'AIFuncParallelism']
+
+
+class AIFuncParallelism:
+    """
+    bound the AIFuncs running in parallel on a shared pool, shared by the executors of a whole AIFunc tree.
+    the caller runs a task itself when the bound is reached or the pool has not started the task yet,
+    so the nested parallel runs never wait for the blocked workers.
+    """
+
+    steal_interval: float = 0.05
+    """seconds to wait for the running tasks before the caller steals a task not started by the pool"""
+
+    def __init__(self, max_concurrency: int = 8):
+        """
+        :param max_concurrency: max number of the AIFuncs running in the pool at the same time.
+        """
+        self.max_concurrency = max_concurrency
+        self._semaphore = BoundedSemaphore(max_concurrency)
+        self._default_pool: Optional[Pool] = None
+        self._lock = Lock()
+
+    def default_pool(self) -> Pool:
+        """
+        the pool used when no pool is bound to the container.
+        """
+        with self._lock:
+            if self._default_pool is None:
+                self._default_pool = DefaultPool(self.max_concurrency)
+            return self._default_pool
+
+    def run_all(self, pool: Pool, tasks: Dict[str, Callable[[], Any]], cancel: Event) -> Dict[str, Any]:
+        """
+        run the tasks in parallel, the first error sets the cancel event and is raised after all tasks stopped.
+        :param pool: the pool to submit the tasks.
+        :param tasks: key to the task function.
+        :param cancel: the cancel event of the tasks.
+        :return: key to the task returns.
+        """
+        graph_tasks = {key: partial(_call_without_inputs, task) for key, task in tasks.items()}
+        return self.run_graph(pool, graph_tasks, {}, cancel)
+
+    def run_graph(
+            self,
+            pool: Pool,
+            tasks: Dict[str, Callable[[Dict[str, Any]], Any]],
+            depends: Dict[str, List[str]],
+            cancel: Event,
+    ) -> Dict[str, Any]:
+        """
+        run the tasks as soon as the tasks they depend on are done.
+        :param pool: the pool to submit the tasks.
+        :param tasks: key to the task function, which receives the returns of its dependencies by key.
+        :param depends: key to the keys of the tasks it depends on.
+        :param cancel: the cancel event of the tasks.
+        :return: key to the task returns.
+        :exception ValueError: unknown dependency or dependency cycle.
+        """
+        check_dependencies(tasks.keys(), depends)
+        waiting = {key: set(depends.get(key, [])) for key in tasks}
+        results: Dict[str, Any] = {}
+        errors: List[Exception] = []
+        running: Dict[Future, str] = {}
+
+        def inputs_of(k: str) -> Dict[str, Any]:
+            return {dep: results[dep] for dep in depends.get(k, [])}
+
+        def on_done(k: str, value: Any) -> None:
+            results[k] = value
+            for deps in waiting.values():
+                deps.discard(k)
+
+        def on_error(err: Exception) -> None:
+            cancel.set()
+            errors.append(err)
+
+        def run_inline(k: str) -> None:
+            try:
+                if cancel.is_set():
+                    raise AIFuncCanceledError(f"aifunc `{k}` is canceled")
+                on_done(k, tasks[k](inputs_of(k)))
+            except Exception as err:
+                on_error(err)
+
+        while waiting or running:
+            if cancel.is_set():
+                # do not start the waiting tasks any more.
+                waiting.clear()
+            ready = [key for key, deps in waiting.items() if not deps]
+            for key in ready:
+                del waiting[key]
+            if not ready and not running:
+                break
+
+            # the last ready task is run by the caller, which is waiting anyway.
+            inline = ready[-1:]
+            for key in ready[:-1]:
+                if self._semaphore.acquire(blocking=False):
+                    future = pool.submit(self._run_acquired, tasks[key], inputs_of(key), cancel)
+                    running[future] = key
+                else:
+                    inline.append(key)
+            for key in inline:
+                run_inline(key)
+            if not running:
+                continue
+
+            finished, _ = wait(
+                running.keys(),
+                timeout=0 if inline else self.steal_interval,
+                return_when=FIRST_COMPLETED,
+            )
+            if not finished and not inline:
+                for future in list(running.keys()):
+                    if future.cancel():
+                        # not started by the pool yet, steal it.
+                        key = running.pop(future)
+                        self._semaphore.release()
+                        run_inline(key)
+                        break
+            for future in finished:
+                key = running.pop(future)
+                try:
+                    on_done(key, future.result())
+                except Exception as e:
+                    on_error(e)
+
+        if errors:
+            # raise the error that caused the cancellation rather than the canceled ones.
+            for e in errors:
+                if not isinstance(e, AIFuncCanceledError):
+                    raise e
+            raise errors[0]
+        if len(results) < len(tasks):
+            raise AIFuncCanceledError(f"aifuncs {sorted(set(tasks) - set(results))} are canceled")
+        return results
+
+    def _run_acquired(self, task: Callable[[Dict[str, Any]], Any], inputs: Dict[str, Any], cancel: Event) -> Any:
+        try:
+            if cancel.is_set():
+                raise AIFuncCanceledError("aifunc is canceled")
+            return task(inputs)
+        finally:
+            self._semaphore.release()
+
+
+def _call_without_inputs(task: Callable[[], Any], inputs: Dict[str, Any]) -> Any:
+    return task()
+
+
+def check_dependencies(keys: Iterable[str], depends: Dict[str, List[str]]) -> None:
+    """
+    :exception ValueError: unknown dependency or dependency cycle.
+    """
+    keys = set(keys)
+    for key, deps in depends.items():
+        if key not in keys:
+            raise ValueError(f"dependencies of unknown aifunc `{key}`")
+        for dep in deps:
+            if dep not in keys:
+                raise ValueError(f"aifunc `{key}` depends on unknown aifunc `{dep}`")
+    waiting = {key: set(depends.get(key, [])) for key in keys}
+    while waiting:
+        ready = [key for key, deps in waiting.items() if not deps]
+        if not ready:
+            raise ValueError(f"dependency cycle among aifuncs {sorted(waiting.keys())}")
+        for key in ready:
+            del waiting[key]
+        for deps in waiting.values():
+            deps.difference_update(ready)
 
 
 class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
@@ -25,6 +200,8 @@ class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
             llm_api_name: str = "",
             max_depth: int = 10,
             max_step: int = 10,
+            parallelism: Optional[AIFuncParallelism] = None,
+            cancel_events: Tuple[Event, ...] = (),
     ):
         # manager do not create submanager
         # but the container of MossCompiler from this manager
@@ -39,11 +216,25 @@ class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
         if step and step.depth > self._max_depth:
             raise RuntimeError(f"AiFunc depth {step.depth} > {self._max_depth}, stackoverflow")
         self._default_driver_type = default_driver if default_driver else DefaultAIFuncDriverImpl
+        self._parallelism = parallelism if parallelism else AIFuncParallelism()
+        # canceled if any of the parallel runs above this executor is canceled.
+        self._cancel_events = cancel_events
         self._destroyed = False
 
     def sub_executor(self, step: ExecStep, upstream: Optional[Stream] = None) -> "AIFuncExecutor":
+        return self._sub_executor(step, upstream)
+
+    def _sub_executor(
+            self,
+            step: ExecStep,
+            upstream: Optional[Stream] = None,
+            cancel: Optional[Event] = None,
+    ) -> "DefaultAIFuncExecutorImpl":
         # sub manager's upstream may be None
         # parent manager do not pass upstream to submanager
+        cancel_events = self._cancel_events
+        if cancel is not None:
+            cancel_events = cancel_events + (cancel,)
         manager = DefaultAIFuncExecutorImpl(
             container=self._container,
             step=step,
@@ -51,6 +242,8 @@ class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
             default_driver=self._default_driver_type,
             llm_api_name=self._llm_api_name,
             max_depth=self._max_depth,
+            parallelism=self._parallelism,
+            cancel_events=cancel_events,
         )
         # register submanager, destroy them together
         return manager
@@ -95,12 +288,22 @@ class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
         try:
             if frame is None:
                 frame = ExecFrame.from_func(fn)
+            frame.started_at = time.time()
+            cache = self._get_result_cache(fn)
+            if cache is not None:
+                cached = cache.get(fn)
+                if cached is not None:
+                    frame.cached = True
+                    frame.set_result(cached)
+                    return cached
             driver = self.get_driver(fn)
             thread = driver.initialize(self.container(), frame)
             step = 0
             finished = False
             result = None
             while not finished:
+                if self.canceled():
+                    raise AIFuncCanceledError(f"aifunc {fn.func_name()} is canceled")
                 step += 1
                 # each step generate a new exec step
                 exec_step = frame.new_step()
@@ -116,11 +319,25 @@ class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
                 raise RuntimeError(f"result is invalid AIFuncResult {type(result)}, expecting {result_type}")
 
             frame.set_result(result)
+            if cache is not None and result is not None:
+                cache.save(fn, result)
             # if frame is the root, send final message as protocol
             return result
         except Exception as e:
             frame.error = MessageType.ERROR.new(content=str(e))
             raise
+        finally:
+            if frame is not None:
+                frame.finished_at = time.time()
+                # save the result of the frame, the steps are saved by the driver on each step.
+                repo = self._container.get(AIFuncRepository)
+                if repo is not None:
+                    repo.save_exec_frame(frame)
+
+    def _get_result_cache(self, fn: AIFunc) -> Optional[AIFuncResultCache]:
+        if not fn.__aifunc_memoize__:
+            return None
+        return self._container.get(AIFuncResultCache)
 
     def get_driver(
             self,
@@ -133,13 +350,30 @@ class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
             driver = self._default_driver_type
         return driver(fn)
 
+    def canceled(self) -> bool:
+        for event in self._cancel_events:
+            if event.is_set():
+                return True
+        return False
+
     def run(self, key: str, fn: AIFunc) -> AIFuncResult:
+        return self._run(key, fn)
+
+    def _run(
+            self,
+            key: str,
+            fn: AIFunc,
+            cancel: Optional[Event] = None,
+            frames: Optional[Dict[str, ExecFrame]] = None,
+    ) -> AIFuncResult:
         if self._exec_step is not None:
             frame = self._exec_step.new_frame(fn)
         else:
             frame = ExecFrame.from_func(fn)
+        if frames is not None:
+            frames[key] = frame
         sub_step = frame.new_step()
-        sub_manager = self.sub_executor(sub_step)
+        sub_manager = self._sub_executor(sub_step, cancel=cancel)
         try:
             result = sub_manager.execute(fn, frame=frame, upstream=self._upstream)
             # thread safe? python dict is thread safe
@@ -151,18 +385,45 @@ class DefaultAIFuncExecutorImpl(AIFuncExecutor, AIFuncCtx):
             sub_manager.destroy()
 
     def parallel_run(self, fn_dict: Dict[str, AIFunc]) -> Dict[str, AIFuncResult]:
-        def execute_task(key: str, fn: AIFunc):
-            r = self.run(key, fn)
-            return key, r
-
-        results = {}
-        with ThreadPoolExecutor(max_workers=len(fn_dict)) as executor:
-            futures = [executor.submit(execute_task, key, fn) for key, fn in fn_dict.items()]
-            for future in as_completed(futures):
-                key, result = future.result()
-                results[key] = result
-                self._values[key] = result
+        if not fn_dict:
+            return {}
+        # cancel the siblings of this parallel run only, if any of them failed.
+        cancel = Event()
+        tasks = {key: partial(self._run, key, fn, cancel) for key, fn in fn_dict.items()}
+        pool = self._container.get(Pool)
+        if pool is None:
+            pool = self._parallelism.default_pool()
+        results = self._parallelism.run_all(pool, tasks, cancel)
+        self._values.update(results)
+        return results
 
+    def dag_run(
+            self,
+            fn_dict: Dict[str, Union[AIFunc, Callable[..., AIFunc]]],
+            depends: Optional[Dict[str, List[str]]] = None,
+    ) -> Dict[str, AIFuncResult]:
+        if not fn_dict:
+            return {}
+        depends = depends or {}
+        cancel = Event()
+        frames: Dict[str, ExecFrame] = {}
+
+        def dag_task(key: str, fn: Union[AIFunc, Callable[..., AIFunc]], inputs: Dict[str, AIFuncResult]):
+            if not isinstance(fn, AIFunc):
+                fn = fn(**inputs)
+            return self._run(key, fn, cancel, frames)
+
+        tasks = {key: partial(dag_task, key, fn) for key, fn in fn_dict.items()}
+        pool = self._container.get(Pool)
+        if pool is None:
+            pool = self._parallelism.default_pool()
+        start = time.time()
+        try:
+            results = self._parallelism.run_graph(pool, tasks, depends, cancel)
+        finally:
+            if self._exec_step is not None and frames:
+                self._exec_step.dag_runs.append(ExecDagRun.new(frames, depends, time.time() - start))
+        self._values.update(results)
         return results
 
     def get(self, key: str) -> Optional[Any]:
@@ -192,8 +453,14 @@ class DefaultAIFuncExecutorProvider(Provider[AIFuncExecutor]):
     def __init__(
             self,
             llm_api_name: str = "",
+            max_concurrency: int = 8,
     ):
+        """
+        :param llm_api_name: the default llm api of the AIFuncs.
+        :param max_concurrency: max AIFuncs running in parallel, shared by all the executors of the provider.
+        """
         self._llm_api_name = llm_api_name
+        self._parallelism = AIFuncParallelism(max_concurrency)
 
     def singleton(self) -> bool:
         # !! AIFuncManager shall not be
@@ -206,4 +473,5 @@ class DefaultAIFuncExecutorProvider(Provider[AIFuncExecutor]):
         return DefaultAIFuncExecutorImpl(
             container=con,
             llm_api_name=self._llm_api_name,
+            parallelism=self._parallelism,
         )
@@ -31,6 +31,15 @@ class AIFunc(PromptAbleClass, BaseModel, ABC):
     __aifunc_driver__: Optional[Type[AIFuncDriver]] = None
     """可以指定自己的 driver. 不指定的话, 使用系统默认提供的 driver"""
 
+    __aifunc_memoize__: bool = False
+    """reuse the cached result of the identical request, if an AIFuncResultCache is bound to the container"""
+
+    __aifunc_reuse_code__: bool = False
+    """
+    reuse the code that succeeded before for the new requests, if an AIFuncCodeStore is bound to the container.
+    only for the AIFuncs whose code depends on the request fields only.
+    """
+
     @classmethod
     def __class_prompt__(cls) -> str:
         if cls is AIFunc:
@@ -1,4 +1,4 @@
-from typing import Any, Optional, Tuple, Dict, Type, List, Iterable, Callable
+from typing import Any, Optional, Tuple, Dict, Type, List, Iterable, Callable, Union
 from abc import ABC, abstractmethod
 from ghostos.core.aifunc.func import AIFunc, AIFuncResult
 from ghostos.core.moss.decorators import cls_source_code
@@ -15,9 +15,9 @@ from pydantic import BaseModel, Field
 __all__ = [
     'AIFunc', 'AIFuncResult',
     'AIFuncExecutor', 'AIFuncCtx', 'AIFuncDriver',
-    'AIFuncRepository',
-    'ExecFrame', 'ExecStep',
-    'TooManyFailureError',
+    'AIFuncRepository', 'AIFuncResultCache', 'AIFuncCodeStore',
+    'ExecFrame', 'ExecStep', 'ExecDagRun',
+    'TooManyFailureError', 'AIFuncCanceledError',
 ]
 
 
@@ -25,6 +25,13 @@ class TooManyFailureError(RuntimeError):
     pass
 
 
+class AIFuncCanceledError(RuntimeError):
+    """
+    the AIFunc is canceled, for example a sibling AIFunc of the parallel run failed.
+    """
+    pass
+
+
 @cls_source_code()
 class AIFuncCtx(ABC):
     """
@@ -56,6 +63,34 @@ class AIFuncCtx(ABC):
         """
         pass
 
+    @abstractmethod
+    def dag_run(
+            self,
+            fn_dict: Dict[str, Union[AIFunc, Callable[..., AIFunc]]],
+            depends: Optional[Dict[str, List[str]]] = None,
+    ) -> Dict[str, AIFuncResult]:
+        """
+        Run AIFunc instances that take inputs from the results of each other, with maximal parallelism.
+        Each AIFunc starts as soon as the AIFuncs it depends on are done, and its result is saved into its key.
+
+        :param fn_dict: key to an AIFunc instance, or to a function that receives the results of its dependencies
+            as keyword arguments named by their keys, and returns the AIFunc instance.
+        :param depends: key to the keys it depends on. the keys without dependencies start at once.
+        :return: key to the AIFuncResult of all the AIFuncs.
+        :exception ValueError: unknown dependency or dependency cycle.
+
+        example:
+        >>> results = ctx.dag_run(
+        ...     {
+        ...         "weather": WeatherSearch(city="Beijing"),
+        ...         "news": NewsSearch(topic="Beijing"),
+        ...         "plan": lambda weather, news: TripPlan(weather=weather.summary, news=news.summary),
+        ...     },
+        ...     depends={"plan": ["weather", "news"]},
+        ... )
+        """
+        pass
+
     @abstractmethod
     def get(self, key: str) -> Optional[Any]:
         """
@@ -85,6 +120,39 @@ class ExecStepPayload(Payload):
     step_id: str = Field(description="step id")
 
 
+class ExecDagRun(BaseModel):
+    """
+    timings of a dag run of the sub AIFuncs, for the critical path analysis.
+    """
+    frames: Dict[str, str] = Field(default_factory=dict, description="key to the frame id of each AIFunc")
+    depends: Dict[str, List[str]] = Field(default_factory=dict, description="key to the keys it depends on")
+    durations: Dict[str, float] = Field(default_factory=dict, description="key to the seconds of each AIFunc")
+    critical_path: List[str] = Field(default_factory=list, description="keys of the longest dependency chain")
+    critical_path_time: float = Field(default=0.0, description="seconds of the critical path")
+    wall_time: float = Field(default=0.0, description="seconds of the whole dag run")
+
+    @classmethod
+    def new(cls, frames: Dict[str, "ExecFrame"], depends: Dict[str, List[str]], wall_time: float) -> "ExecDagRun":
+        durations = {key: frame.duration() for key, frame in frames.items()}
+        # the longest chain ending at each key, visited in the order of the frames started.
+        chains: Dict[str, Tuple[float, List[str]]] = {}
+        for key in sorted(frames.keys(), key=lambda k: frames[k].started_at):
+            prev_time, prev_path = 0.0, []
+            for dep in depends.get(key, []):
+                if dep in chains and chains[dep][0] > prev_time:
+                    prev_time, prev_path = chains[dep]
+            chains[key] = (prev_time + durations[key], prev_path + [key])
+        critical_time, critical_path = max(chains.values(), default=(0.0, []))
+        return cls(
+            frames={key: frame.frame_id for key, frame in frames.items()},
+            depends={key: list(deps) for key, deps in depends.items()},
+            durations=durations,
+            critical_path=critical_path,
+            critical_path_time=critical_time,
+            wall_time=wall_time,
+        )
+
+
 class ExecStep(BaseModel):
     """
     AIFunc execute in multi-turn thinking. Each turn is a step.
@@ -100,6 +168,7 @@ class ExecStep(BaseModel):
     pycontext: Optional[PyContext] = Field(default=None, description="pycontext of the step")
     error: Optional[Message] = Field(default=None, description="the error message")
     frames: List = Field(default_factory=list, description="list of ExecFrame")
+    dag_runs: List[ExecDagRun] = Field(default_factory=list, description="timings of the dag runs in the step")
 
     def iter_messages(self) -> Iterable[Message]:
         if self.generate:
@@ -140,6 +209,9 @@ class ExecFrame(BaseModel):
     depth: int = Field(default=0, description="the depth of the stack")
     steps: List[ExecStep] = Field(default_factory=list, description="the execution steps")
     error: Optional[Message] = Field(default=None, description="the error message")
+    cached: bool = Field(default=False, description="the result is from the AIFuncResultCache")
+    started_at: float = Field(default=0.0, description="timestamp of the execution start")
+    finished_at: float = Field(default=0.0, description="timestamp of the execution end")
 
     @classmethod
     def from_func(cls, fn: AIFunc, depth: int = 0, parent_step_id: Optional[str] = None) -> "ExecFrame":
@@ -172,6 +244,14 @@ class ExecFrame(BaseModel):
         self.steps.append(step)
         return step
 
+    def duration(self) -> float:
+        """
+        :return: seconds of the execution, 0 if not finished.
+        """
+        if not self.started_at or not self.finished_at:
+            return 0.0
+        return self.finished_at - self.started_at
+
     def last_step(self) -> Optional[ExecStep]:
         if len(self.steps) == 0:
             return None
@@ -338,6 +418,76 @@ class AIFuncRepository(ABC):
 
     @abstractmethod
     def save_exec_frame(self, frame: ExecFrame) -> None:
+        """
+        save the frame incrementally, called on each finished step and at the end of the execution.
+        the head, the steps not saved yet and the result of the frame are appended only once.
+        """
+        pass
+
+    @abstractmethod
+    def load_exec_frame(self, func_name: str, frame_id: str, depth: int = -1) -> Optional[ExecFrame]:
+        """
+        reconstruct a saved frame.
+        :param func_name: the import path of the AIFunc
+        :param frame_id: the frame id
+        :param depth: the depth of the sub frames loaded with their steps, negative means all.
+            the sub frames beyond the depth only have the head, load them again to expand.
+        :return: None if the frame is not saved.
+        """
+        pass
+
+    @abstractmethod
+    def list_exec_frames(self, func_name: str, limit: int = 20) -> List[str]:
+        """
+        :return: the ids of the saved frames of the AIFunc, the latest first.
+        """
+        pass
+
+
+class AIFuncResultCache(ABC):
+    """
+    memoize the results of the AIFuncs that opt in by `__aifunc_memoize__`.
+    the identical requests (same class, same field values and same source code) share the result.
+    """
+
+    @abstractmethod
+    def get(self, fn: AIFunc) -> Optional[AIFuncResult]:
+        """
+        :return: the cached result of the identical request, None if missing or expired.
+        """
+        pass
+
+    @abstractmethod
+    def save(self, fn: AIFunc, result: AIFuncResult) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class AIFuncCodeStore(ABC):
+    """
+    store the generated code that succeeded, for the AIFuncs that opt in by `__aifunc_reuse_code__`.
+    the code is executed directly for the new requests, until the source code of the AIFunc changes.
+    """
+
+    @abstractmethod
+    def get_code(self, fn: Type[AIFunc]) -> Optional[str]:
+        """
+        :return: the code of the current version of the AIFunc, None if missing.
+        """
+        pass
+
+    @abstractmethod
+    def save_code(self, fn: Type[AIFunc], code: str) -> None:
+        pass
+
+    @abstractmethod
+    def discard_code(self, fn: Type[AIFunc]) -> None:
+        """
+        discard the stored code of the AIFunc, when it fails on a request.
+        """
         pass
 
 
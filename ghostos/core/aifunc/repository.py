@@ -1,19 +1,24 @@
 import inspect
 from typing import List, Type, Dict, Set, Iterable, Optional
 from types import ModuleType
+from collections import OrderedDict
 
 from ghostos.identifier import Identifier, identify_class
-from ghostos.core.aifunc import AIFunc, ExecFrame
+from ghostos.core.aifunc import AIFunc, ExecFrame, ExecStep
 from ghostos.core.aifunc.interfaces import AIFuncRepository
 from ghostos.contracts.configs import YamlConfig, Configs
 from ghostos.contracts.modules import Modules
-from ghostos.contracts.storage import Storage
+from ghostos.contracts.storage import Storage, FileStorage
 from ghostos.contracts.workspace import Workspace
 from ghostos.helpers import generate_module_and_attr_name
 from ghostos.container import Provider, Container
 from pydantic import Field
 from os.path import join
+import threading
+import json
+import gzip
 import time
+import os
 
 
 class AIFuncsConf(YamlConfig):
@@ -39,13 +44,24 @@ class AIFuncRepoByConfigs(AIFuncRepository):
             configs: Configs,
             modules: Modules,
             frame_storage: Optional[Storage] = None,
+            compress_frames: bool = False,
     ):
+        """
+        :param frame_storage: the storage of the exec frames, not saving them if None.
+        :param compress_frames: append each record of the frame files as a gzip member.
+        """
         self.conf = conf
         self.configs = configs
         self.modules = modules
         if self.conf.is_overdue():
             self.validate()
         self.frame_storage = frame_storage
+        self.compress_frames = compress_frames
+        # frame id to the number of the saved steps, of the frames not finished yet.
+        self._saved_steps: Dict[str, int] = {}
+        # ids of the recently finished frames, which shall not be saved again.
+        self._finished_frames: OrderedDict = OrderedDict()
+        self._frames_lock = threading.RLock()
 
     def register(self, *fns: Type[AIFunc]) -> None:
         saving = []
@@ -112,13 +128,173 @@ class AIFuncRepoByConfigs(AIFuncRepository):
         self.conf.identifiers = identifiers
         self.configs.save(self.conf)
 
+    max_finished_frames: int = 10000
+
     def save_exec_frame(self, frame: ExecFrame) -> None:
-        if self.frame_storage is not None:
-            filename = self._frame_filepath(frame.func_name(), frame.frame_id + ".json")
-            value = frame.model_dump_json(exclude_defaults=True, indent=2)
-            self.frame_storage.put(filename, value.encode())
+        if self.frame_storage is None:
+            return None
+        with self._frames_lock:
+            self._save_exec_frame(frame)
+        return None
+
+    def _save_exec_frame(self, frame: ExecFrame) -> None:
+        if frame.frame_id in self._finished_frames:
+            return
+        records = []
+        saved = self._saved_steps.get(frame.frame_id, None)
+        if saved is None:
+            saved = 0
+            head = frame.model_dump(exclude_defaults=True, exclude={"steps", "result", "error"})
+            records.append({"type": "head", "frame": head})
+
+        finished = frame.finished_at > 0 or frame.result is not None or frame.error is not None
+        # saved after each step is done, so all the steps are done.
+        steps = frame.steps
+        for step in steps[saved:]:
+            for sub_frame in step.frames:
+                # the sub frames are finished with the step, make sure they are saved.
+                self._save_exec_frame(sub_frame)
+            records.append(self._step_record(step))
+        if finished:
+            tail = frame.model_dump(
+                exclude_defaults=True,
+                include={"result", "error", "cached", "started_at", "finished_at"},
+            )
+            records.append({"type": "tail", "frame": tail})
+            self._saved_steps.pop(frame.frame_id, None)
+            self._finished_frames[frame.frame_id] = True
+            while len(self._finished_frames) > self.max_finished_frames:
+                self._finished_frames.popitem(last=False)
+        else:
+            self._saved_steps[frame.frame_id] = max(saved, len(steps))
+        if records:
+            self._append_records(frame.func_name(), frame.frame_id, records)
+
+    @staticmethod
+    def _step_record(step: ExecStep) -> Dict:
+        data = step.model_dump(exclude_defaults=True, exclude={"frames"})
+        refs = [[sub.func_name(), sub.frame_id] for sub in step.frames]
+        return {"type": "step", "step": data, "frames": refs}
+
+    def _frame_filename(self, func_name: str, frame_id: str) -> str:
+        ext = ".jsonl.gz" if self.compress_frames else ".jsonl"
+        return self._frame_filepath(func_name, frame_id, ext)
+
+    def _append_records(self, func_name: str, frame_id: str, records: List[Dict]) -> None:
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode()
+        if self.compress_frames:
+            # the concatenated gzip members are read as one stream.
+            lines = gzip.compress(lines)
+        filename = self._frame_filename(func_name, frame_id)
+        storage = self.frame_storage
+        if isinstance(storage, FileStorage):
+            filepath = join(storage.abspath(), filename)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "ab") as f:
+                f.write(lines)
+        else:
+            # the storage can not append, each save rewrites the whole file.
+            # a frame with n steps costs O(n^2) bytes written, use a FileStorage for the long-running frames.
+            origin = storage.get(filename) if storage.exists(filename) else b""
+            storage.put(filename, origin + lines)
+
+    def _iter_records(self, func_name: str, frame_id: str) -> Optional[Iterable[Dict]]:
+        storage = self.frame_storage
+        for compressed in (self.compress_frames, not self.compress_frames):
+            ext = ".jsonl.gz" if compressed else ".jsonl"
+            filename = self._frame_filepath(func_name, frame_id, ext)
+            if not storage.exists(filename):
+                continue
+            if isinstance(storage, FileStorage):
+                filepath = join(storage.abspath(), filename)
+                return self._read_lines(filepath, compressed)
+            content = storage.get(filename)
+            if compressed:
+                content = gzip.decompress(content)
+            return (json.loads(line) for line in content.splitlines() if line.strip())
         return None
 
+    @staticmethod
+    def _read_lines(filepath: str, compressed: bool) -> Iterable[Dict]:
+        opener = gzip.open if compressed else open
+        with opener(filepath, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def load_exec_frame(self, func_name: str, frame_id: str, depth: int = -1) -> Optional[ExecFrame]:
+        if self.frame_storage is None:
+            return None
+        records = self._iter_records(func_name, frame_id)
+        if records is None:
+            # the frame saved as a whole json file in the early versions.
+            filename = self._frame_filepath(func_name, frame_id)
+            if self.frame_storage.exists(filename):
+                return ExecFrame.model_validate_json(self.frame_storage.get(filename))
+            return None
+
+        data = {}
+        steps: Dict[str, ExecStep] = {}
+        for record in records:
+            kind = record["type"]
+            if kind == "head" or kind == "tail":
+                data.update(record["frame"])
+            elif kind == "step":
+                step = ExecStep(**record["step"])
+                for sub_func, sub_id in record["frames"]:
+                    if depth != 0:
+                        sub = self.load_exec_frame(sub_func, sub_id, depth - 1)
+                    else:
+                        # beyond the depth only the head is read, the steps are loaded on demand.
+                        sub = self._load_exec_frame_head(sub_func, sub_id)
+                    if sub is not None:
+                        step.frames.append(sub)
+                # the same step saved again is replaced.
+                steps[step.step_id] = step
+        if not data:
+            return None
+        frame = ExecFrame(**data)
+        frame.steps = list(steps.values())
+        return frame
+
+    def _load_exec_frame_head(self, func_name: str, frame_id: str) -> Optional[ExecFrame]:
+        records = self._iter_records(func_name, frame_id)
+        if records is None:
+            return self.load_exec_frame(func_name, frame_id, 0)
+        try:
+            for record in records:
+                if record["type"] == "head":
+                    return ExecFrame(**record["frame"])
+                break
+            return None
+        finally:
+            # stop reading the file after the first line.
+            if hasattr(records, "close"):
+                records.close()
+
+    def list_exec_frames(self, func_name: str, limit: int = 20) -> List[str]:
+        storage = self.frame_storage
+        if storage is None:
+            return []
+        sub_storage = storage.sub_storage(func_name)
+        if isinstance(sub_storage, FileStorage):
+            directory = sub_storage.abspath()
+            entries = list(os.scandir(directory)) if os.path.isdir(directory) else []
+            entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            names = [entry.name for entry in entries if entry.is_file()]
+        else:
+            names = list(sub_storage.dir("", False))
+        filenames = [
+            name for name in names
+            if name.endswith(".jsonl") or name.endswith(".jsonl.gz") or name.endswith(".json")
+        ]
+        frame_ids = []
+        for name in filenames:
+            frame_id = name.split(".", 1)[0]
+            if frame_id not in frame_ids:
+                frame_ids.append(frame_id)
+        return frame_ids[:limit] if limit > 0 else frame_ids
+
     @classmethod
     def _frame_filepath(cls, func_name: str, frame_id: str, ext: str = ".json") -> str:
         return join(func_name, frame_id + ext)
@@ -126,8 +302,9 @@ class AIFuncRepoByConfigs(AIFuncRepository):
 
 class AIFuncRepoByConfigsProvider(Provider[AIFuncRepository]):
 
-    def __init__(self, runtime_frame_dir: str = "aifunc_frames"):
+    def __init__(self, runtime_frame_dir: str = "aifunc_frames", compress_frames: bool = False):
         self._runtime_frame_dir = runtime_frame_dir
+        self._compress_frames = compress_frames
 
     def singleton(self) -> bool:
         return True
@@ -141,4 +318,4 @@ class AIFuncRepoByConfigsProvider(Provider[AIFuncRepository]):
         if self._runtime_frame_dir:
             workspace = con.force_fetch(Workspace)
             runtime_storage = workspace.runtime().sub_storage(self._runtime_frame_dir)
-        return AIFuncRepoByConfigs(conf, configs, modules, runtime_storage)
+        return AIFuncRepoByConfigs(conf, configs, modules, runtime_storage, self._compress_frames)
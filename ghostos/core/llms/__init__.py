@@ -7,4 +7,5 @@ from ghostos.core.llms.prompt import (
     Prompt, PromptPipe, run_prompt_pipeline, PromptStorage, PromptPayload,
 )
 from ghostos.core.llms.tools import LLMFunc, FunctionalToken
-from ghostos.core.llms.prompt_pipes import AssistantNamePipe
+from ghostos.core.llms.prompt_pipes import AssistantNamePipe, TokenBudgetPipe
+from ghostos.core.llms.tokenizer import Tokenizer, get_tokenizer, count_messages_tokens
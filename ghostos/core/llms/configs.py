@@ -48,6 +48,17 @@ class ModelConf(Payload):
     temperature: float = Field(default=0.7, description="temperature")
     n: int = Field(default=1, description="number of iterations")
     max_tokens: int = Field(default=2000, description="max tokens")
+    context_window: Optional[int] = Field(
+        default=None,
+        description="the context window tokens of the model. "
+                    "if set, the oldest history messages are dropped to fit prompt tokens in "
+                    "`context_window - max_tokens`",
+    )
+    tokenizer: Optional[str] = Field(
+        default=None,
+        description="tiktoken encoding name to count prompt tokens offline, like `o200k_base`. "
+                    "None means a heuristic tokenizer",
+    )
     timeout: float = Field(default=30, description="timeout")
     request_timeout: float = Field(default=40, description="request timeout")
     kwargs: Dict[str, Any] = Field(default_factory=dict, description="kwargs")
@@ -2,21 +2,22 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 
-from typing import List, Iterable, Optional, Union, Callable, Set
+from typing import List, Iterable, Optional, Union, Callable, Set, TYPE_CHECKING
 from typing_extensions import Self
-from openai.types.chat.completion_create_params import Function, FunctionCall
-from openai import NotGiven, NOT_GIVEN
-from openai.types.chat.chat_completion_function_call_option_param import ChatCompletionFunctionCallOptionParam
-from openai.types.shared_params.function_definition import FunctionDefinition
-from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from ghostos import helpers
 from ghostos.core.messages import Message, Role, Payload
 from ghostos.helpers import timestamp
 from ghostos.core.llms.configs import ModelConf
 from ghostos.core.llms.tools import LLMFunc, FunctionalToken
 
+if TYPE_CHECKING:
+    # openai is slow to import, only the openai methods of the prompt import it.
+    from openai.types.chat.completion_create_params import Function, FunctionCall
+    from openai import NotGiven
+    from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
+
 __all__ = [
     'Prompt', 'PromptPipe',
     'run_prompt_pipeline',
@@ -53,6 +54,17 @@ class Prompt(BaseModel):
     first_token: float = Field(default=0.0, description="first token")
     run_end: float = Field(default=0.0, description="end time")
 
+    _parsed_by: Optional[int] = PrivateAttr(default=None)
+
+    def mark_parsed(self, api: object) -> None:
+        """
+        mark the prompt is parsed by the llm api, so the api sends it as it is instead of parsing it again.
+        """
+        self._parsed_by = id(api)
+
+    def is_parsed_by(self, api: object) -> bool:
+        return self._parsed_by == id(api)
+
     def system_prompt(self) -> str:
         contents = []
         if self.system:
@@ -102,6 +114,8 @@ class Prompt(BaseModel):
         return result
 
     def get_openai_functions(self) -> Union[List[Function], NotGiven]:
+        from openai import NOT_GIVEN
+        from openai.types.chat.completion_create_params import Function
         if not self.functions:
             return NOT_GIVEN
         functions = []
@@ -117,6 +131,9 @@ class Prompt(BaseModel):
         return functions
 
     def get_openai_tools(self) -> Union[List[ChatCompletionToolParam], NotGiven]:
+        from openai import NOT_GIVEN
+        from openai.types.shared_params.function_definition import FunctionDefinition
+        from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
         if not self.functions:
             return NOT_GIVEN
         tools = []
@@ -133,6 +150,8 @@ class Prompt(BaseModel):
         return tools
 
     def get_openai_function_call(self) -> Union[FunctionCall, NotGiven]:
+        from openai import NOT_GIVEN
+        from openai.types.chat.chat_completion_function_call_option_param import ChatCompletionFunctionCallOptionParam
         if not self.functions:
             return NOT_GIVEN
         if self.function_call is None:
@@ -1,8 +1,10 @@
+import json
 from typing import Optional
-from ghostos.core.messages import Message, Role
-from ghostos.core.llms import PromptPipe, Prompt
+from ghostos.core.messages import Message, Role, MessageType
+from ghostos.core.llms.prompt import PromptPipe, Prompt
+from ghostos.core.llms.tokenizer import Tokenizer, get_tokenizer
 
-__all__ = ['AssistantNamePipe']
+__all__ = ['AssistantNamePipe', 'TokenBudgetPipe']
 
 
 class AssistantNamePipe(PromptPipe):
@@ -27,3 +29,58 @@ class AssistantNamePipe(PromptPipe):
 
         prompt.filter_messages(filter_fn)
         return prompt
+
+
+class TokenBudgetPipe(PromptPipe):
+    """
+    drop the oldest history messages until the prompt fits the tokens budget.
+    the system messages, functions, inputs and added messages are always kept.
+    """
+
+    OMITTED_NOTICE = "{count} earlier messages of the conversation are omitted to fit the context window."
+
+    def __init__(self, max_tokens: int, tokenizer: Optional[Tokenizer] = None, notice: bool = True):
+        """
+        :param max_tokens: the tokens budget of the whole prompt
+        :param tokenizer: default is the heuristic tokenizer
+        :param notice: add a system message to tell the model how many messages are omitted.
+        """
+        self._max_tokens = max_tokens
+        self._tokenizer = tokenizer or get_tokenizer()
+        self._notice = notice
+
+    def update_prompt(self, prompt: Prompt) -> Prompt:
+        if not prompt.history:
+            return prompt
+        tokenizer = self._tokenizer
+        fixed = tokenizer.count_text(prompt.system_prompt())
+        for message in prompt.inputs:
+            fixed += tokenizer.count_message(message)
+        for message in prompt.added:
+            fixed += tokenizer.count_message(message)
+        for func in prompt.functions:
+            fixed += tokenizer.count_text(func.name) + tokenizer.count_text(func.description)
+            fixed += tokenizer.count_text(json.dumps(func.parameters))
+
+        history_tokens = [tokenizer.count_message(message) for message in prompt.history]
+        if fixed + sum(history_tokens) <= self._max_tokens:
+            return prompt
+
+        budget = self._max_tokens - fixed
+        if self._notice:
+            budget -= tokenizer.count_message(Role.SYSTEM.new(content=self.OMITTED_NOTICE))
+        # keep the newest messages
+        keep_from = len(prompt.history)
+        while keep_from > 0 and history_tokens[keep_from - 1] <= budget:
+            keep_from -= 1
+            budget -= history_tokens[keep_from]
+        kept = prompt.history[keep_from:]
+        # the outputs of dropped function calls are meaningless to the model
+        while kept and kept[0].type == MessageType.FUNCTION_OUTPUT.value:
+            kept = kept[1:]
+
+        omitted = len(prompt.history) - len(kept)
+        if self._notice:
+            kept.insert(0, Role.SYSTEM.new(content=self.OMITTED_NOTICE.format(count=omitted)))
+        prompt.history = kept
+        return prompt
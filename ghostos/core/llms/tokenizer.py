@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Iterable, Dict, Tuple
+from ghostos.core.messages import Message
+
+__all__ = [
+    'Tokenizer', 'HeuristicTokenizer', 'TiktokenTokenizer',
+    'get_tokenizer', 'count_messages_tokens',
+]
+
+MESSAGE_TOKENS_OVERHEAD = 4
+"""tokens of the role / separator wrapping of each chat message, as the openai cookbook suggests"""
+
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+
+
+class Tokenizer(ABC):
+    """
+    count tokens offline, used to keep the prompt in the model context window.
+    the counting does not need to be exact, but shall never underestimate too much.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """
+        name of the tokenizer, also part of the message token cache key.
+        """
+        pass
+
+    @abstractmethod
+    def count_text(self, text: str) -> int:
+        pass
+
+    def count_message(self, message: Message) -> int:
+        """
+        count tokens of a message as it will be sent to the model.
+        the result is cached by message id and contents.
+        """
+        key = self._message_cache_key(message)
+        if key is not None:
+            cached = _message_tokens_cache.get(key)
+            if cached is not None:
+                return cached
+        count = MESSAGE_TOKENS_OVERHEAD
+        count += self.count_text(message.get_content())
+        if message.name:
+            count += self.count_text(message.name)
+        for caller in message.callers:
+            count += self.count_text(caller.name) + self.count_text(caller.arguments)
+        if key is not None:
+            _message_tokens_cache.set(key, count)
+        return count
+
+    def _message_cache_key(self, message: Message) -> Optional[Tuple]:
+        if not message.msg_id or not message.is_complete():
+            return None
+        return (
+            self.name,
+            message.msg_id,
+            hash(message.content),
+            hash(message.memory),
+            len(message.callers),
+        )
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    dependency free tokenizer.
+    about 4 characters per token for latin text, and about one token per CJK character.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self._chars_per_token = chars_per_token
+
+    @property
+    def name(self) -> str:
+        return f"heuristic:{self._chars_per_token}"
+
+    def count_text(self, text: str) -> int:
+        if not text:
+            return 0
+        cjk = len(_CJK_PATTERN.findall(text))
+        others = len(text) - cjk
+        return cjk + int(others / self._chars_per_token + 0.999)
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    tokenizer by tiktoken encodings.
+    tiktoken loads encodings from `TIKTOKEN_CACHE_DIR`, ship the encoding files there to work offline.
+    """
+
+    def __init__(self, encoding: str):
+        import tiktoken
+        self._encoding_name = encoding
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    @property
+    def name(self) -> str:
+        return f"tiktoken:{self._encoding_name}"
+
+    def count_text(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class _MessageTokensCache:
+    """
+    process-wide bounded lru cache of message token counts.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self._max_size = max_size
+        self._data: OrderedDict[Tuple, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[int]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Tuple, value: int) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+
+_message_tokens_cache = _MessageTokensCache()
+
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def get_tokenizer(encoding: Optional[str] = None) -> Tokenizer:
+    """
+    get a shared tokenizer by encoding name.
+    :param encoding: tiktoken encoding name such as `o200k_base`. None or `heuristic` means the heuristic tokenizer.
+                     fallback to the heuristic tokenizer if tiktoken or the encoding file is unavailable.
+    """
+    key = encoding or "heuristic"
+    if key in _tokenizers:
+        return _tokenizers[key]
+    tokenizer: Optional[Tokenizer] = None
+    if key != "heuristic":
+        try:
+            tokenizer = TiktokenTokenizer(key)
+        except Exception:
+            tokenizer = None
+    if tokenizer is None:
+        tokenizer = HeuristicTokenizer()
+    _tokenizers[key] = tokenizer
+    return tokenizer
+
+
+def count_messages_tokens(messages: Iterable[Message], tokenizer: Optional[Tokenizer] = None) -> int:
+    if tokenizer is None:
+        tokenizer = get_tokenizer()
+    return sum(tokenizer.count_message(message) for message in messages)
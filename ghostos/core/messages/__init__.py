@@ -11,11 +11,21 @@ from ghostos.core.messages.message_classes import (
 
 )
 from ghostos.core.messages.payload import Payload
-from ghostos.core.messages.openai import (
-    OpenAIMessageParser, DefaultOpenAIMessageParser, DefaultOpenAIParserProvider,
-    CompletionUsagePayload,
-)
 from ghostos.core.messages.buffers import Buffer, Flushed
 from ghostos.core.messages.utils import copy_messages
 from ghostos.core.messages.transport import Stream, Receiver, new_basic_connection, ReceiverBuffer
 from ghostos.core.messages.pipeline import SequencePipe, run_pipeline
+
+# the openai parsers import the `openai` package, which is slow to import,
+# so they are loaded at the first access.
+_lazy_openai_attrs = {
+    'OpenAIMessageParser', 'DefaultOpenAIMessageParser', 'DefaultOpenAIParserProvider',
+    'CompletionUsagePayload',
+}
+
+
+def __getattr__(name: str):
+    if name in _lazy_openai_attrs:
+        from ghostos.core.messages import openai
+        return getattr(openai, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
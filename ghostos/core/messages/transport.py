@@ -161,6 +161,7 @@ class ArrayReceiver(Receiver):
         self._streaming = deque()
         self._closed = False
         self._done = False
+        self._canceled = False
         self._error: Optional[Message] = None
         self._complete_only = complete_only
 
@@ -202,6 +203,13 @@ class ArrayReceiver(Receiver):
 
     def cancel(self):
         self._done = True
+        self._canceled = True
+
+    def canceled(self) -> bool:
+        """
+        the receiver is canceled or closed, the stream shall stop producing messages.
+        """
+        return self._canceled or self._closed
 
     def fail(self, error: str) -> bool:
         if self._error is not None:
@@ -278,7 +286,7 @@ class ArrayStream(Stream):
     def alive(self) -> bool:
         if not self._alive:
             return False
-        if self._receiver.closed():
+        if self._receiver.canceled():
             self._alive = False
         return self._alive
 
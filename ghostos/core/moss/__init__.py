@@ -5,7 +5,8 @@ from ghostos.core.moss.abcd import (
     MOSS_VALUE_NAME, MOSS_TYPE_NAME, MOSS_HIDDEN_MARK, MOSS_HIDDEN_UNMARK,
 )
 from ghostos.core.moss.impl import DefaultMOSSProvider
-from ghostos.core.moss.testsuite import MossTestSuite
+from ghostos.core.moss.sandbox import MossSandbox, MossSandboxPool, MossSandboxProvider
+from ghostos.core.moss.testsuite import MossTestSuite, MossTestResult, MossTestReport
 from ghostos.core.moss.pycontext import PyContext
 
 __all__ = [
@@ -17,9 +18,11 @@ __all__ = [
     AttrPrompts,
     # pycontext related
     PyContext,
+    # out of process execution
+    MossSandbox, MossSandboxPool, MossSandboxProvider,
     # testing
     DefaultMOSSProvider,
-    MossTestSuite,
+    MossTestSuite, MossTestResult, MossTestReport,
     'moss_container',
     'moss_test_suite',
 
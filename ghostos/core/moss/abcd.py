@@ -436,6 +436,21 @@ class MossRuntime(ABC):
         """
         pass
 
+    @abstractmethod
+    def stream_std_output(self, callback: Optional[Callable[[str], None]]) -> None:
+        """
+        forward the std output chunks to the callback as soon as they are printed, besides capturing them.
+        :param callback: if None, stop streaming.
+        """
+        pass
+
+    @abstractmethod
+    def clear_std_output(self) -> None:
+        """
+        drop the captured std output, each execution only returns its own output.
+        """
+        pass
+
     @abstractmethod
     def redirect_stdout(self):
         """
@@ -474,6 +489,7 @@ class MossRuntime(ABC):
             raise RuntimeError(f"Moss already executing")
         try:
             self.__executing__ = True
+            self.clear_std_output()
             compiled = self.module()
             fn = None
             with self.redirect_stdout():
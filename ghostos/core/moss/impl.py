@@ -1,8 +1,10 @@
+import os
 import importlib
 import inspect
-from types import ModuleType
-from typing import Optional, Any, Dict, get_type_hints, Type, List, Callable, ClassVar
-import io
+import threading
+from collections import OrderedDict
+from types import ModuleType, CodeType
+from typing import Optional, Any, Dict, get_type_hints, Type, List, Callable, ClassVar, Tuple
 
 from ghostos.container import Container, Provider
 from ghostos.contracts.modules import Modules, ImportWrapper
@@ -14,7 +16,7 @@ from ghostos.core.moss.abcd import (
 )
 from ghostos.core.moss.pycontext import PyContext
 from ghostos.prompter import Prompter, TextPrmt
-from ghostos.helpers import generate_module_and_attr_name, code_syntax_check
+from ghostos.helpers import generate_module_and_attr_name, IncrementalTreeParser, BoundedOutput, sha1
 from contextlib import contextmanager, redirect_stdout
 
 IMPORT_FUTURE = "from __future__ import annotations"
@@ -25,6 +27,9 @@ __all__ = [
     'MossRuntimeImpl',
     'DefaultMOSSProvider',
     'MossTempModuleType',
+    'MossCompileCache',
+    'moss_compile_cache',
+    'moss_exec_cache',
 ]
 
 
@@ -37,6 +42,88 @@ class MossTempModuleType(ModuleType):
         MossTempModuleType.__instance_count__ -= 1
 
 
+DEFAULT_MAX_STD_OUTPUT = 20000
+"""the max chars of the captured std output kept by the moss runtime, the middle part beyond is dropped"""
+
+
+class MossCompileCache:
+    """
+    process-wide cache of the moss compiling results:
+    1. the source code of the origin modules, keyed by module name and file mtime.
+    2. the compiled code objects, keyed by module name and source hash.
+    3. the reflected attrs of the origin modules, keyed by module name and file mtime.
+    so a repeated compile costs a dict lookup plus exec of the cached bytecode.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._sources: OrderedDict[Tuple, str] = OrderedDict()
+        self._codes: OrderedDict[Tuple, CodeType] = OrderedDict()
+        self._origin_attrs: OrderedDict[Tuple, Dict[str, Any]] = OrderedDict()
+
+    @staticmethod
+    def _module_version(module: ModuleType) -> Tuple:
+        filename = getattr(module, "__file__", None)
+        mtime = 0.0
+        if filename and os.path.exists(filename):
+            mtime = os.path.getmtime(filename)
+        # the module object changes when it is reloaded or rewritten.
+        return module.__name__, id(module), filename, mtime
+
+    def _get(self, cache: OrderedDict, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            value = cache.get(key, None)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _set(self, cache: OrderedDict, key: Tuple, value: Any) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self._max_size:
+                cache.popitem(last=False)
+
+    def get_source(self, module: ModuleType) -> str:
+        key = self._module_version(module)
+        source = self._get(self._sources, key)
+        if source is None:
+            source = inspect.getsource(module)
+            self._set(self._sources, key, source)
+        return source
+
+    def get_code(self, modulename: str, source: str) -> CodeType:
+        key = (modulename, sha1(source))
+        code = self._get(self._codes, key)
+        if code is None:
+            code = compile(source, modulename, "exec")
+            self._set(self._codes, key, code)
+        return code
+
+    def get_origin_attrs(self, origin: ModuleType, reflect: Callable[[ModuleType], Dict[str, Any]]) -> Dict[str, Any]:
+        key = self._module_version(origin)
+        attrs = self._get(self._origin_attrs, key)
+        if attrs is None:
+            attrs = reflect(origin)
+            self._set(self._origin_attrs, key, attrs)
+        return attrs
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sources.clear()
+            self._codes.clear()
+            self._origin_attrs.clear()
+
+
+moss_compile_cache = MossCompileCache()
+"""the default compile cache shared by moss compilers"""
+
+moss_exec_cache = MossCompileCache(max_size=64)
+"""the compile cache of the code executed by the moss runtimes, mostly one-off generated code,
+kept apart so it never evicts the compiled modules from the moss_compile_cache"""
+
+
 class MossCompilerImpl(MossCompiler):
     def __init__(self, *, container: Container, pycontext: Optional[PyContext] = None):
         self._container = Container(parent=container, name="moss")
@@ -93,10 +180,10 @@ class MossCompilerImpl(MossCompiler):
         MossTempModuleType.__instance_count__ += 1
         module.__dict__.update(self._predefined_locals)
         module.__file__ = filename
-        compiled = compile(code, modulename, "exec")
+        compiled = moss_compile_cache.get_code(modulename, code)
         exec(compiled, module.__dict__)
         if origin is not None:
-            updating = self._filter_origin(origin)
+            updating = moss_compile_cache.get_origin_attrs(origin, self._filter_origin)
             module.__dict__.update(updating)
         return module
 
@@ -133,7 +220,7 @@ class MossCompilerImpl(MossCompiler):
             if module is None:
                 return ""
             module = self._modules.import_module(self._pycontext.module)
-            code = inspect.getsource(module)
+            code = moss_compile_cache.get_source(module)
         if not code.lstrip().startswith(IMPORT_FUTURE):
             code = IMPORT_FUTURE + "\n\n" + code.lstrip("\n")
         return code if code else ""
@@ -211,6 +298,7 @@ class MossRuntimeImpl(MossRuntime, MossPrompter):
             compiled: ModuleType,
             injections: Dict[str, Any],
             attr_prompts: Dict[str, str],
+            max_std_output: int = DEFAULT_MAX_STD_OUTPUT,
     ):
         self._container = container
         self._modules: Modules = container.force_fetch(Modules)
@@ -218,13 +306,14 @@ class MossRuntimeImpl(MossRuntime, MossPrompter):
         self._source_code = source_code
         self._pycontext = pycontext
         self._injections = injections
-        self._runtime_std_output = ""
+        self._runtime_std_output = BoundedOutput(max_std_output)
         # 初始化之后不应该为 None 的值.
         self._built: bool = False
         self._moss_prompt: Optional[str] = None
         self._attr_prompts: Dict[str, str] = attr_prompts
         self._closed: bool = False
         self._injected = set()
+        self._linter: Optional[IncrementalTreeParser] = None
         self._moss: Moss = self._compile_moss()
         self._initialize_moss()
         MossRuntime.instance_count += 1
@@ -292,7 +381,10 @@ class MossRuntimeImpl(MossRuntime, MossPrompter):
     def lint_exec_code(self, code: str) -> Optional[str]:
         source_code = self._source_code
         new_code = source_code + "\n\n" + code.strip()
-        return code_syntax_check(new_code)
+        if self._linter is None:
+            self._linter = IncrementalTreeParser(source_code)
+        # the source code part is not re-parsed for each code block.
+        return self._linter.syntax_check(new_code)
 
     def module(self) -> ModuleType:
         return self._compiled
@@ -307,21 +399,22 @@ class MossRuntimeImpl(MossRuntime, MossPrompter):
         return self._pycontext
 
     def dump_std_output(self) -> str:
-        return self._runtime_std_output
+        return self._runtime_std_output.getvalue()
+
+    def stream_std_output(self, callback: Optional[Callable[[str], None]]) -> None:
+        self._runtime_std_output.on_write = callback
+
+    def clear_std_output(self) -> None:
+        self._runtime_std_output.clear()
 
     def pprint(self, *args: Any, **kwargs: Any) -> None:
         from pprint import pprint
-        out = io.StringIO()
-        with redirect_stdout(out):
-            pprint(*args, **kwargs)
-        self._runtime_std_output += str(out.getvalue())
+        pprint(*args, stream=self._runtime_std_output, **kwargs)
 
     @contextmanager
     def redirect_stdout(self):
-        buffer = io.StringIO()
-        with redirect_stdout(buffer):
+        with redirect_stdout(self._runtime_std_output):
             yield
-            self._runtime_std_output += str(buffer.getvalue())
 
     def pycontext_code(
             self,
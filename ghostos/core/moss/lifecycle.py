@@ -123,7 +123,9 @@ def __moss_exec__(
     # 注意使用 runtime.exec_ctx 包裹有副作用的调用.
     if code:
         filename = pycontext.module if pycontext.module is not None else "<MOSS>"
-        compiled = compile(code, filename=filename, mode='exec')
+        # the code object is cached by the source, so the repeatedly executed code compiles once.
+        from ghostos.core.moss.impl import moss_exec_cache
+        compiled = moss_exec_cache.get_code(filename, code)
         exec(compiled, local_values)
 
     if target not in local_values:
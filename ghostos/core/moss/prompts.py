@@ -2,6 +2,7 @@ from typing import Any, Optional, Dict, Tuple, Iterable
 from ghostos.core.moss.utils import (
     get_modulename,
     get_callable_definition,
+    reflection_cache,
 )
 from ghostos.prompter import get_defined_prompt
 from pydantic import BaseModel
@@ -93,6 +94,10 @@ def reflect_class_with_methods(cls: type) -> str:
     """
     reflect class with all its method signatures.
     """
+    return reflection_cache.get("class_with_methods", cls, lambda: _reflect_class_with_methods(cls))
+
+
+def _reflect_class_with_methods(cls: type) -> str:
     from inspect import getsource
     from .utils import make_class_prompt, get_callable_definition
     source = getsource(cls)
@@ -151,7 +156,7 @@ def get_prompt(value: Any) -> Optional[str]:
     if inspect.isclass(value):
         # only reflect abstract class
         if inspect.isabstract(value) or issubclass(value, BaseModel) or is_dataclass(value):
-            source = inspect.getsource(value)
+            source = reflection_cache.get("source", value, lambda: inspect.getsource(value))
             if source:
                 return source
     elif inspect.isfunction(value) or inspect.ismethod(value):
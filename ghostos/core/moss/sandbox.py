@@ -0,0 +1,321 @@
+from typing import Optional, List, Dict, Any, Callable, Type, Set
+from abc import ABC, abstractmethod
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from threading import Condition
+import pickle
+
+from ghostos.container import Container, BootstrapProvider
+from ghostos.core.moss.abcd import MossCompiler, Execution
+from ghostos.core.moss.pycontext import PyContext
+
+__all__ = [
+    'MossSandbox', 'MossSandboxPool', 'MossSandboxProvider',
+]
+
+
+class MossSandbox(ABC):
+    """
+    execute moss code out of the current process.
+    the pycontext is compiled again in the sandbox with the sandbox container,
+    so the session level injections are not available to the executed code.
+    """
+
+    @abstractmethod
+    def execute(
+            self,
+            pycontext: PyContext,
+            *,
+            target: str,
+            code: Optional[str] = None,
+            local_args: Optional[List[str]] = None,
+            local_kwargs: Optional[Dict[str, str]] = None,
+            args: Optional[List[Any]] = None,
+            kwargs: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None,
+    ) -> Execution:
+        """
+        same as MossRuntime.execute, but the args, kwargs and returns shall be picklable.
+        :param pycontext: the pycontext to compile the moss runtime in the sandbox.
+        :param timeout: seconds to wait for the execution, the runaway worker is killed after it.
+        :exception TimeoutError: execution timeout
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+
+_worker_container: Optional[Container] = None
+
+
+def _init_worker(container_factory: Callable[[], Container], max_memory: int) -> None:
+    global _worker_container
+    if max_memory > 0:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+        except (ImportError, ValueError, OSError):
+            pass
+    _worker_container = container_factory()
+    _worker_container.bootstrap()
+
+
+def _execute_in_worker(pycontext_data: Dict, execute_kwargs: Dict) -> Dict:
+    compiler = _worker_container.force_fetch(MossCompiler)
+    compiler = compiler.join_context(PyContext(**pycontext_data))
+    with compiler:
+        runtime = compiler.compile(None)
+    with runtime:
+        result = runtime.execute(**execute_kwargs)
+        returns = result.returns
+        try:
+            pickle.dumps(returns)
+        except Exception:
+            raise TypeError(f"returns of the sandbox execution is not picklable: {returns!r}")
+        return dict(
+            returns=returns,
+            std_output=result.std_output,
+            pycontext=result.pycontext.model_dump(exclude_defaults=True),
+        )
+
+
+def _worker_main(
+        conn: Connection,
+        container_factory: Callable[[], Container],
+        max_memory: int,
+        max_tasks: Optional[int],
+) -> None:
+    """
+    the loop of a worker process, receives (pycontext, execute kwargs) and sends back (ok, data or error).
+    """
+    _init_worker(container_factory, max_memory)
+    done = 0
+    while max_tasks is None or done < max_tasks:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            data = _execute_in_worker(*task)
+            reply = (True, data)
+        except BaseException as e:
+            try:
+                pickle.dumps(e)
+                reply = (False, e)
+            except Exception:
+                reply = (False, RuntimeError(repr(e)))
+        conn.send(reply)
+        done += 1
+
+
+class _Worker:
+
+    def __init__(self, process: BaseProcess, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.tasks = 0
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+def _default_container() -> Container:
+    """
+    the worker container only provides the moss providers, the application level services are not shared.
+    """
+    from ghostos.core.moss.impl import DefaultMOSSProvider
+    from ghostos.contracts.modules import DefaultModulesProvider
+    container = Container(name="moss_sandbox_worker")
+    container.register(DefaultMOSSProvider())
+    container.register(DefaultModulesProvider())
+    return container
+
+
+class MossSandboxPool(MossSandbox):
+    """
+    a pool of worker processes that execute moss code, each execution runs in one worker with its own deadline.
+    the workers are started on demand. a timed-out worker is killed alone,
+    so the executions of the other workers are not affected.
+    """
+
+    def __init__(
+            self,
+            processes: int = 2,
+            *,
+            timeout: float = 30.0,
+            max_memory: int = 0,
+            max_tasks_per_child: Optional[int] = None,
+            container_factory: Callable[[], Container] = _default_container,
+            mp_context: Optional[str] = None,
+    ):
+        """
+        :param processes: max number of the worker processes.
+        :param timeout: default timeout in seconds of each execution.
+        :param max_memory: address space limit in bytes of each worker, 0 means no limit. unix only.
+        :param max_tasks_per_child: restart the worker after the number of executions.
+        :param container_factory: module level function that makes the container of the workers.
+        :param mp_context: multiprocessing start method, fork / spawn / forkserver.
+        """
+        self._processes = processes
+        self._timeout = timeout
+        self._max_memory = max_memory
+        self._max_tasks_per_child = max_tasks_per_child
+        self._container_factory = container_factory
+        self._mp_context = get_context(mp_context)
+        self._cond = Condition()
+        self._idle: List[_Worker] = []
+        self._workers: Set[_Worker] = set()
+        self._closed = False
+
+    def _start_worker(self) -> _Worker:
+        conn, child_conn = self._mp_context.Pipe()
+        process = self._mp_context.Process(
+            target=_worker_main,
+            args=(child_conn, self._container_factory, self._max_memory, self._max_tasks_per_child),
+            daemon=True,
+        )
+        process.start()
+        # only the worker holds the child end, so its exit is seen as EOF.
+        child_conn.close()
+        return _Worker(process, conn)
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("moss sandbox is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if len(self._workers) < self._processes:
+                    break
+                self._cond.wait()
+            worker = self._start_worker()
+            self._workers.add(worker)
+            return worker
+
+    def _release(self, worker: _Worker, reusable: bool) -> None:
+        with self._cond:
+            max_tasks = self._max_tasks_per_child
+            if max_tasks is not None and worker.tasks >= max_tasks:
+                reusable = False
+            if reusable and not self._closed and worker in self._workers:
+                self._idle.append(worker)
+            else:
+                self._workers.discard(worker)
+                reusable = False
+            self._cond.notify()
+        if not reusable:
+            worker.kill()
+
+    def execute(
+            self,
+            pycontext: PyContext,
+            *,
+            target: str,
+            code: Optional[str] = None,
+            local_args: Optional[List[str]] = None,
+            local_kwargs: Optional[Dict[str, str]] = None,
+            args: Optional[List[Any]] = None,
+            kwargs: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None,
+    ) -> Execution:
+        timeout = self._timeout if timeout is None else timeout
+        execute_kwargs = dict(
+            target=target,
+            code=code,
+            local_args=local_args,
+            local_kwargs=local_kwargs,
+            args=args,
+            kwargs=kwargs,
+        )
+        worker = self._acquire()
+        reusable = False
+        try:
+            worker.conn.send((pycontext.model_dump(exclude_defaults=True), execute_kwargs))
+            worker.tasks += 1
+            # the deadline starts when the worker receives the execution.
+            ready = worker.conn.poll(timeout if timeout > 0 else None)
+            if ready:
+                ok, data = worker.conn.recv()
+                reusable = True
+        except (EOFError, OSError):
+            # the worker is killed by close, or crashed.
+            raise RuntimeError("moss sandbox worker exited during the execution")
+        finally:
+            # the runaway worker is killed alone.
+            self._release(worker, reusable)
+        if not ready:
+            raise TimeoutError(f"moss sandbox execution timeout after {timeout} seconds")
+        if not ok:
+            raise data
+        return Execution(
+            returns=data["returns"],
+            std_output=data["std_output"],
+            pycontext=PyContext(**data["pycontext"]),
+        )
+
+    def close(self) -> None:
+        """
+        kill all the workers, the running executions fail with RuntimeError.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+            self._idle = []
+            self._cond.notify_all()
+        for worker in workers:
+            worker.kill()
+
+
+class MossSandboxProvider(BootstrapProvider[MossSandbox]):
+    """
+    register the moss sandbox pool, the workers are started lazily and terminated at shutdown.
+    """
+
+    def __init__(
+            self,
+            processes: int = 2,
+            *,
+            timeout: float = 30.0,
+            max_memory: int = 0,
+            max_tasks_per_child: Optional[int] = None,
+            container_factory: Callable[[], Container] = _default_container,
+    ):
+        self._processes = processes
+        self._timeout = timeout
+        self._max_memory = max_memory
+        self._max_tasks_per_child = max_tasks_per_child
+        self._container_factory = container_factory
+
+    def singleton(self) -> bool:
+        return True
+
+    def contract(self) -> Type[MossSandbox]:
+        return MossSandbox
+
+    def factory(self, con: Container) -> Optional[MossSandbox]:
+        return MossSandboxPool(
+            self._processes,
+            timeout=self._timeout,
+            max_memory=self._max_memory,
+            max_tasks_per_child=self._max_tasks_per_child,
+            container_factory=self._container_factory,
+        )
+
+    def bootstrap(self, container: Container) -> None:
+        from ghostos.contracts.shutdown import Shutdown
+        shutdown = container.get(Shutdown)
+        if shutdown is not None:
+            sandbox = container.force_fetch(MossSandbox)
+            shutdown.register(sandbox.close)
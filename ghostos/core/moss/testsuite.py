@@ -1,9 +1,85 @@
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, Optional, Callable, Iterable
 from ghostos.core.moss.abcd import MossCompiler, Execution
 from ghostos.core.moss.pycontext import PyContext
 from ghostos.container import Container
+from pydantic import BaseModel, Field
+from multiprocessing import get_context
 from queue import Queue
 from threading import Thread
+from xml.etree import ElementTree
+import time
+
+__all__ = ['MossTestSuite', 'MossTestResult', 'MossTestReport']
+
+
+class MossTestResult(BaseModel):
+    """
+    result of a moss test case, with the time costs in seconds.
+    """
+    modulename: str = Field(description="the tested moss module")
+    name: str = Field(description="the test case function name")
+    passed: bool = Field(default=True)
+    returns: str = Field(default="", description="repr of the returns")
+    std_output: str = Field(default="")
+    error: str = Field(default="")
+    compile_time: float = Field(default=0.0)
+    prompt_time: float = Field(default=0.0)
+    exec_time: float = Field(default=0.0)
+
+
+class MossTestReport(BaseModel):
+    results: List[MossTestResult] = Field(default_factory=list)
+    total_time: float = Field(default=0.0)
+
+    def failures(self) -> List[MossTestResult]:
+        return [r for r in self.results if not r.passed]
+
+    def to_json(self) -> str:
+        return self.model_dump_json(indent=2)
+
+    def to_junit_xml(self, suite_name: str = "moss") -> str:
+        suite = ElementTree.Element(
+            "testsuite",
+            name=suite_name,
+            tests=str(len(self.results)),
+            failures=str(len(self.failures())),
+            time=f"{self.total_time:.4f}",
+        )
+        for result in self.results:
+            case = ElementTree.SubElement(
+                suite,
+                "testcase",
+                classname=result.modulename,
+                name=result.name,
+                time=f"{result.compile_time + result.prompt_time + result.exec_time:.4f}",
+            )
+            ElementTree.SubElement(case, "properties").extend([
+                ElementTree.Element("property", name="compile_time", value=f"{result.compile_time:.4f}"),
+                ElementTree.Element("property", name="prompt_time", value=f"{result.prompt_time:.4f}"),
+                ElementTree.Element("property", name="exec_time", value=f"{result.exec_time:.4f}"),
+            ])
+            if not result.passed:
+                failure = ElementTree.SubElement(case, "failure", message=result.error.split("\n")[0])
+                failure.text = result.error
+            if result.std_output:
+                ElementTree.SubElement(case, "system-out").text = result.std_output
+        return ElementTree.tostring(suite, encoding="unicode")
+
+
+def _default_container() -> Container:
+    from ghostos.core.moss import moss_container
+    return moss_container()
+
+
+def _run_case_in_process(
+        container_factory: Callable[[], Container],
+        modulename: str,
+        target: str,
+        test_module_name: str,
+) -> MossTestResult:
+    container = container_factory()
+    container.bootstrap()
+    return MossTestSuite(container).run_case(modulename=modulename, target=target, test_module_name=test_module_name)
 
 
 class MossTestSuite:
@@ -131,3 +207,87 @@ class MossTestSuite:
         queue.task_done()
         for t in threads:
             t.join()
+
+    def get_test_cases(self, modulename: str, test_module_name: str = "__test__") -> List[str]:
+        """
+        get the test case names from `__moss_test_cases__` of the compiled moss module.
+        """
+        compiler = self._container.force_fetch(MossCompiler)
+        compiler.join_context(PyContext(module=modulename))
+        with compiler.compile(test_module_name) as runtime:
+            targets = runtime.module().__dict__.get(self.MAGIC_TEST_CASES_ATTR_NAME, None)
+            if not isinstance(targets, List):
+                return []
+            return list(targets)
+
+    def run_case(
+            self, *,
+            modulename: str,
+            target: str,
+            test_module_name: str = "__test__",
+    ) -> MossTestResult:
+        """
+        run a test case with moss as the argument, and record the time costs of each stage.
+        """
+        result = MossTestResult(modulename=modulename, name=target)
+        try:
+            start = time.perf_counter()
+            compiler = self._container.force_fetch(MossCompiler)
+            compiler.join_context(PyContext(module=modulename))
+            runtime = compiler.compile(test_module_name)
+            result.compile_time = time.perf_counter() - start
+
+            with runtime:
+                start = time.perf_counter()
+                runtime.prompter().dump_module_prompt()
+                result.prompt_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                executed = runtime.execute(target=target, local_args=['moss'])
+                result.exec_time = time.perf_counter() - start
+                result.returns = repr(executed.returns)
+                result.std_output = executed.std_output
+        except Exception as e:
+            result.passed = False
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    def run_tests(
+            self,
+            modulenames: Iterable[str],
+            *,
+            processes: int = 0,
+            test_module_name: str = "__test__",
+            container_factory: Callable[[], Container] = _default_container,
+    ) -> MossTestReport:
+        """
+        run all the test cases of the moss modules.
+        :param modulenames: the moss modules that define `__moss_test_cases__`.
+        :param processes: if positive, run each test case in a fresh worker process of a pool,
+                          so cpu-bound tests scale and the global states never leak between the cases.
+        :param test_module_name: the modulename that MossCompiler shall build.
+        :param container_factory: module level function that makes the container of the worker processes.
+        """
+        start = time.perf_counter()
+        cases = []
+        for modulename in modulenames:
+            for target in self.get_test_cases(modulename, test_module_name):
+                cases.append((modulename, target))
+
+        if processes > 0:
+            pool = get_context().Pool(processes, maxtasksperchild=1)
+            try:
+                tasks = [
+                    pool.apply_async(_run_case_in_process, (container_factory, modulename, target, test_module_name))
+                    for modulename, target in cases
+                ]
+                results = [task.get() for task in tasks]
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [
+                self.run_case(modulename=modulename, target=target, test_module_name=test_module_name)
+                for modulename, target in cases
+            ]
+        return MossTestReport(results=results, total_time=time.perf_counter() - start)
@@ -1,6 +1,10 @@
 import inspect
+import os
 import re
-from typing import Any, Callable, Optional, List, Iterable
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, List, Iterable, Tuple, TypeVar
 from typing_extensions import TypedDict, is_typeddict
 from pydantic import BaseModel
 
@@ -23,8 +27,80 @@ __all__ = [
     'is_code_same_as_print',
     'is_name_public',
     'add_comment_mark',
+    'ReflectionCache', 'reflection_cache',
 ]
 
+R = TypeVar("R")
+
+
+class ReflectionCache:
+    """
+    process-wide cache of the reflected prompts of classes and functions,
+    keyed by the qualified name and the mtime of the defining file,
+    so the prompts are regenerated only when the source changes.
+    """
+
+    def __init__(self, max_size: int = 2048):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[Tuple, Any] = OrderedDict()
+
+    @staticmethod
+    def _version(value: Any) -> Optional[Tuple]:
+        target = getattr(value, "__func__", value)
+        modulename = getattr(target, "__module__", None)
+        qualname = getattr(target, "__qualname__", None)
+        if not isinstance(modulename, str) or not isinstance(qualname, str) or "<" in qualname:
+            return None
+        module = sys.modules.get(modulename, None)
+        filename = getattr(module, "__file__", None)
+        if not filename:
+            return None
+        # the value shall be the one defined in the module, not a temp one with the same name.
+        resolved = module
+        for name in qualname.split("."):
+            resolved = getattr(resolved, name, None)
+            if resolved is None:
+                return None
+        if resolved is not target and getattr(resolved, "__func__", None) is not target:
+            return None
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            return None
+        return modulename, qualname, filename, mtime
+
+    def get(self, kind: str, value: Any, reflect: Callable[[], R], *args: Any) -> R:
+        """
+        :param kind: kind of the reflection, different kinds of one value are cached separately.
+        :param value: the reflected class or function.
+        :param reflect: generate the prompt if not cached.
+        :param args: other hashable arguments of the reflection.
+        """
+        version = self._version(value)
+        if version is None:
+            return reflect()
+        key = (kind, version, args)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = reflect()
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+reflection_cache = ReflectionCache()
+"""the default reflection cache shared by the moss prompters"""
+
 
 def get_import_comment(module: Optional[str], module_spec: Optional[str], alias: Optional[str]) -> Optional[str]:
     if module:
@@ -195,6 +271,20 @@ def get_callable_definition(
     将一个 callable 对象的源码剥离方法和描述.
     # todo: 用 tree-sitter 重做.
     """
+    return reflection_cache.get(
+        "callable_definition",
+        caller,
+        lambda: _get_callable_definition(caller, alias, doc),
+        alias,
+        doc,
+    )
+
+
+def _get_callable_definition(
+        caller: Callable,
+        alias: Optional[str] = None,
+        doc: Optional[str] = None,
+) -> str:
     if doc:
         doc = doc.strip()
     if not inspect.isfunction(caller) and not inspect.ismethod(caller):
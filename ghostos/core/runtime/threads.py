@@ -4,7 +4,7 @@ from abc import ABC, abstractmethod
 from pydantic import BaseModel, Field
 from ghostos.core.messages import Message, copy_messages, Role, MessageType, MessageStage
 from ghostos.core.moss.pycontext import PyContext
-from ghostos.core.llms import Prompt
+from ghostos.core.llms import Prompt, Tokenizer, TokenBudgetPipe
 from ghostos.core.runtime.events import Event, EventTypes
 from ghostos.helpers import uuid, timestamp
 from contextlib import contextmanager
@@ -332,11 +332,15 @@ class GoThreadInfo(BaseModel):
             system: List[Message],
             stages: Optional[List[str]] = None,
             truncate: bool = True,
+            max_tokens: Optional[int] = None,
+            tokenizer: Optional[Tokenizer] = None,
     ) -> Prompt:
         """
         :param system: the system instructions for the prompt
         :param stages: the allowed stages of the messages that allowed in the prompt. if empty, means "" is only allowed
         :param truncate: if pass truncated history to the prompt. use thread default truncate logic.
+        :param max_tokens: if given, drop the oldest history messages to fit the prompt in the tokens budget.
+        :param tokenizer: the tokenizer to count tokens, default is heuristic.
         :return:
         """
         turn_id = self.last_turn().turn_id
@@ -358,6 +362,8 @@ class GoThreadInfo(BaseModel):
             inputs=copy_messages(inputs, stages),
             added=copy_messages(appending, stages),
         )
+        if max_tokens is not None:
+            prompt = TokenBudgetPipe(max_tokens, tokenizer).update_prompt(prompt)
         return prompt
 
 
@@ -365,10 +371,14 @@ def thread_to_prompt(
         prompt_id: str,
         system: List[Message],
         thread: GoThreadInfo,
-        stages: Optional[List[str]] = None
+        stages: Optional[List[str]] = None,
+        max_tokens: Optional[int] = None,
+        tokenizer: Optional[Tokenizer] = None,
 ) -> Prompt:
     """
     将 thread 转换成基准的 chat.
+    :param max_tokens: if given, drop the oldest history messages to fit the prompt in the tokens budget.
+    :param tokenizer: the tokenizer to count tokens, default is heuristic.
     """
     if stages is None:
         stages = [""]
@@ -387,6 +397,8 @@ def thread_to_prompt(
         inputs=copy_messages(inputs, stages),
         added=copy_messages(appending, stages),
     )
+    if max_tokens is not None:
+        prompt = TokenBudgetPipe(max_tokens, tokenizer).update_prompt(prompt)
     return prompt
 
 
@@ -102,6 +102,53 @@ def from_entity_model_meta(value: ModelEntityMeta) -> BaseModel:
     return cls(**value['data'])
 
 
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _is_json_value(value: Any) -> bool:
+    """
+    whether the value is kept the same after the json round trip.
+    the dict keys must be str, and the subclasses like enums are not allowed.
+    """
+    t = type(value)
+    if t in _JSON_SCALARS:
+        return True
+    elif t is list:
+        for item in value:
+            if not _is_json_value(item):
+                return False
+        return True
+    elif t is dict:
+        for key, item in value.items():
+            if type(key) is not str or not _is_json_value(item):
+                return False
+        return True
+    return False
+
+
+def _dump_container(value: Union[list, dict]) -> str:
+    """
+    dump the list or dict to json if it is safe, otherwise yaml as before.
+    json is also valid yaml, so the readers of the yaml content still work.
+    """
+    try:
+        if _is_json_value(value):
+            return json.dumps(value, ensure_ascii=False)
+    except RecursionError:
+        pass
+    return yaml.safe_dump(value)
+
+
+def _load_container(content: str) -> Any:
+    # the yaml content dumped in block style never starts with a bracket.
+    if content[:1] in ("[", "{"):
+        try:
+            return json.loads(content)
+        except ValueError:
+            pass
+    return yaml.safe_load(content)
+
+
 def to_entity_meta(value: Union[EntityType, Any]) -> EntityMeta:
     if value is None:
         return EntityMeta(
@@ -114,11 +161,13 @@ def to_entity_meta(value: Union[EntityType, Any]) -> EntityMeta:
         return EntityMeta(type="int", content=str(value))
     elif isinstance(value, float):
         return EntityMeta(type="float", content=str(value))
+    elif type(value) is str:
+        return EntityMeta(type="str", content=value)
     elif isinstance(value, list):
-        content = yaml.safe_dump(value)
+        content = _dump_container(value)
         return EntityMeta(type="list", content=content)
     elif isinstance(value, dict):
-        content = yaml.safe_dump(value)
+        content = _dump_container(value)
         return EntityMeta(type="dict", content=content)
     elif hasattr(value, '__to_entity_meta__'):
         return getattr(value, '__to_entity_meta__')()
@@ -132,13 +181,9 @@ def to_entity_meta(value: Union[EntityType, Any]) -> EntityMeta:
             type=generate_import_path(value),
             content="",
         )
-    elif isinstance(value, BaseModel):
-        type_ = generate_import_path(value.__class__)
-        content = value.model_dump_json(exclude_defaults=True)
-        return EntityMeta(type=type_, content=content)
     else:
-        content_bytes = pickle.dumps(value)
-        content = base64.encodebytes(content_bytes)
+        content_bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        content = base64.b64encode(content_bytes)
         return EntityMeta(
             type="pickle",
             content=content.decode(),
@@ -167,8 +212,10 @@ def from_entity_meta(meta: EntityMeta, module: Optional[ModuleType] = None) -> A
         return meta['content'] == "True"
     elif unmarshal_type == "float":
         return float(meta['content'])
+    elif unmarshal_type == "str":
+        return meta['content']
     elif unmarshal_type == "list" or unmarshal_type == "dict":
-        return yaml.safe_load(meta['content'])
+        return _load_container(meta['content'])
     elif unmarshal_type == 'pickle':
         content = meta['content']
         content_bytes = base64.decodebytes(content.encode())
@@ -99,7 +99,8 @@ class ConversationImpl(Conversation[G]):
         self._container.set(Conversation, self)
         for provider in providers:
             self._container.register(provider)
-        self._container.bootstrap()
+        # the template of the session containers created for each event.
+        self._container.freeze()
 
     def container(self) -> Container:
         self._validate_closed()
@@ -281,19 +281,45 @@ class SessionImpl(Session[Ghost]):
 
     def respond(self, messages: Iterable[MessageKind], stage: str = "") -> Tuple[List[Message], List[FunctionCaller]]:
         self._validate_alive()
-        messages = self._message_parser.parse(messages)
+        source = messages
+        messages = self._message_parser.parse(self._until_not_alive(source))
         with self._respond_lock:
             messenger = self.messenger(stage)
+            error = None
             try:
                 messenger.send(messages)
             except StreamingError as e:
-                raise SessionError(f"session failed during streaming: {e}")
+                error = e
+            finally:
+                # close the source, like the llm stream, when the upstream is canceled or failed.
+                if hasattr(source, "close"):
+                    source.close()
 
             buffer, callers = messenger.flush()
             self.logger.debug("append messages to thread: %s", buffer)
             self.thread.append(*buffer)
+            if error is not None or not self.alive():
+                # persist the partial messages, the session can not be saved after the upstream is gone.
+                self._save_thread_on_stop()
+                raise SessionError(f"session stopped during streaming: {error or 'upstream is not alive'}")
             return buffer, callers
 
+    def _until_not_alive(self, messages: Iterable[MessageKind]) -> Iterable[MessageKind]:
+        for item in messages:
+            if not self.alive():
+                self.logger.info("session stop streaming messages, since it is not alive")
+                return
+            yield item
+
+    def _save_thread_on_stop(self) -> None:
+        if self._destroyed:
+            return
+        try:
+            threads = self.container.force_fetch(GoThreads)
+            threads.save_thread(self.thread)
+        except Exception as e:
+            self.logger.exception("failed to save thread on session stop: %s", e)
+
     def respond_buffer(self, messages: Iterable[MessageKind], stage: str = "") -> None:
         self._validate_alive()
         messages = self._message_parser.parse(messages)
@@ -1,5 +1,6 @@
 import time
-from typing import Union, Optional, Iterable, List, Tuple, TypeVar, Callable
+from typing import Union, Optional, Iterable, List, Tuple, TypeVar, Callable, Dict
+from concurrent.futures import Future, wait
 from ghostos.contracts.logger import LoggerItf, get_ghostos_logger
 from ghostos.contracts.pool import Pool, DefaultPool
 from ghostos.container import Container, Provider
@@ -11,6 +12,8 @@ from ghostos.core.runtime import (
     GoTasks, TaskState, GoTaskStruct,
 )
 from ghostos.core.messages import Stream
+from ghostos.core.moss import MossCompiler, PyContext
+from ghostos.core.llms import LLMs
 from ghostos.helpers import uuid, Timeleft, import_from_path
 from ghostos.identifier import get_identifier
 from ghostos.entity import to_entity_meta
@@ -34,6 +37,18 @@ class ShellConf(BaseModel):
         default=10.0
     )
     providers: List[str] = []
+    prewarm_ghosts: List[str] = Field(
+        default_factory=list,
+        description="import paths of the ghosts to prewarm at the shell startup",
+    )
+    prewarm_modules: List[str] = Field(
+        default_factory=list,
+        description="moss modules to compile at the shell startup",
+    )
+    prewarm_llm_apis: List[str] = Field(
+        default_factory=list,
+        description="llm api names to build at the shell startup, empty string means the default api",
+    )
 
 
 G = TypeVar("G", bound=Ghost)
@@ -81,6 +96,15 @@ class ShellImpl(Shell):
         self._container.set(ShellConf, config)
         self._container.bootstrap()
         self._conversations: List[Conversation] = []
+        self._prewarm_lock = Lock()
+        self._prewarm_status: Dict[str, str] = {}
+        self._prewarm_futures: List[Future] = []
+        if config.prewarm_ghosts or config.prewarm_modules or config.prewarm_llm_apis:
+            self.prewarm(
+                ghosts=config.prewarm_ghosts,
+                modules=config.prewarm_modules,
+                llm_apis=config.prewarm_llm_apis,
+            )
 
     @property
     def logger(self) -> LoggerItf:
@@ -282,6 +306,72 @@ class ShellImpl(Shell):
         pool = self.container().force_fetch(Pool)
         pool.submit(caller, *args, **kwargs)
 
+    def prewarm(
+            self,
+            *,
+            ghosts: Iterable[Union[Ghost, str]] = (),
+            modules: Iterable[str] = (),
+            llm_apis: Iterable[str] = (),
+    ) -> None:
+        self._validate_closed()
+        for ghost in ghosts:
+            name = ghost if isinstance(ghost, str) else get_identifier(ghost).id
+            self._submit_prewarm(f"ghost:{name}", self._prewarm_ghost, ghost)
+        for modulename in modules:
+            self._submit_prewarm(f"module:{modulename}", self._prewarm_module, modulename)
+        for api_name in llm_apis:
+            self._submit_prewarm(f"llm_api:{api_name}", self._prewarm_llm_api, api_name)
+
+    def prewarm_status(self, timeout: float = 0.0) -> Dict[str, str]:
+        if timeout > 0:
+            with self._prewarm_lock:
+                futures = list(self._prewarm_futures)
+            wait(futures, timeout=timeout)
+        with self._prewarm_lock:
+            return dict(self._prewarm_status)
+
+    def _submit_prewarm(self, target: str, fn: Callable, *args) -> None:
+        with self._prewarm_lock:
+            self._prewarm_status[target] = "pending"
+            future = self._pool.submit(self._run_prewarm, target, fn, *args)
+            self._prewarm_futures.append(future)
+
+    def _run_prewarm(self, target: str, fn: Callable, *args) -> None:
+        start = time.time()
+        try:
+            fn(*args)
+            status = "ready"
+            self.logger.info("prewarm %s in %.3f seconds", target, time.time() - start)
+        except Exception as e:
+            status = f"failed: {e}"
+            self.logger.warning("prewarm %s failed: %s", target, e)
+        with self._prewarm_lock:
+            self._prewarm_status[target] = status
+
+    def _prewarm_ghost(self, ghost: Union[Ghost, str]) -> None:
+        if isinstance(ghost, str):
+            ghost = import_from_path(ghost)
+        get_ghost_driver(ghost)
+        # the ghosts defined by moss modules, such as MossAgent
+        moss_module = getattr(ghost, "moss_module", None)
+        if moss_module:
+            self._prewarm_module(moss_module)
+        llm_api = getattr(ghost, "llm_api", None)
+        if isinstance(llm_api, str):
+            self._prewarm_llm_api(llm_api)
+
+    def _prewarm_module(self, modulename: str) -> None:
+        compiler = self._container.force_fetch(MossCompiler)
+        compiler.join_context(PyContext(module=modulename))
+        with compiler:
+            runtime = compiler.compile(None)
+        with runtime:
+            runtime.prompter().dump_module_prompt()
+
+    def _prewarm_llm_api(self, api_name: str) -> None:
+        llms = self._container.force_fetch(LLMs)
+        llms.get_api(api_name)
+
     def background_run(self, worker: int = 4, background: Optional[Background] = None) -> None:
         self._validate_closed()
         if self._background_started:
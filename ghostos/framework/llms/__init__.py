@@ -2,5 +2,10 @@ from ghostos.core.llms import LLMs, Prompt, PromptStorage
 from ghostos.framework.llms.llms import LLMsImpl
 from ghostos.framework.llms.openai_driver import OpenAIDriver, OpenAIAdapter
 from ghostos.framework.llms.lite_llm_driver import LitellmAdapter
-from ghostos.framework.llms.providers import ConfigBasedLLMsProvider, PromptStorageInWorkspaceProvider, LLMsYamlConfig
-from ghostos.framework.llms.prompt_storage_impl import PromptStorageImpl
+from ghostos.framework.llms.providers import (
+    ConfigBasedLLMsProvider, ReplayLLMsProvider, PromptStorageInWorkspaceProvider, LLMsYamlConfig,
+)
+from ghostos.framework.llms.replay_driver import (
+    ReplayLLMDriver, ReplayLLMApi, LLMRecordStore, FileLLMRecordStore, LLMRecord,
+)
+from ghostos.framework.llms.prompt_storage_impl import PromptStorageImpl, WriteBehindPromptStorage
@@ -4,7 +4,7 @@ from ghostos.core.llms.abcd import LLMApi
 from ghostos.core.llms.prompt import Prompt, PromptPayload
 from ghostos.core.messages import Message, MessageStage
 from ghostos.helpers.timeutils import timestamp_ms
-from ghostos.framework.llms.openai_driver import OpenAIDriver, OpenAIAdapter
+from ghostos.framework.llms.openai_driver import OpenAIDriver, OpenAIAdapter, close_stream
 from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 from openai.types.chat import ChatCompletion
 
@@ -20,12 +20,13 @@ class DeepseekAdapter(OpenAIAdapter):
         yield self._parser.from_chat_completion(cc_item)
 
     def reasoning_completion_stream(self, prompt: Prompt) -> Iterable[ChatCompletionChunk]:
+        chunks = None
+        output = []
         try:
             prompt = self.parse_prompt(prompt)
             chunks: Iterable[ChatCompletionChunk] = self._reasoning_completion_stream(prompt)
             messages = self._from_openai_chat_completion_chunks(chunks)
             prompt_payload = PromptPayload.from_prompt(prompt)
-            output = []
             for chunk in messages:
                 if not prompt.first_token:
                     prompt.first_token = timestamp_ms()
@@ -35,10 +36,15 @@ class DeepseekAdapter(OpenAIAdapter):
                     prompt_payload.set_payload(chunk)
                     output.append(chunk)
             prompt.added = output
+        except GeneratorExit:
+            prompt.added = output
+            prompt.error = "canceled"
+            raise
         except Exception as e:
             prompt.error = str(e)
             raise
         finally:
+            close_stream(chunks)
             self._storage.save(prompt)
 
 
@@ -22,7 +22,8 @@ from ghostos.core.llms import (
     ModelConf, ServiceConf, Compatible,
     OPENAI_DRIVER_NAME,
     FunctionalToken,
-    Prompt, PromptPayload, PromptStorage
+    Prompt, PromptPayload, PromptStorage,
+    TokenBudgetPipe, get_tokenizer,
 )
 
 __all__ = ['OpenAIDriver', 'OpenAIAdapter']
@@ -71,6 +72,14 @@ You shall embrace the parameter tokens by xml. For example:
 """
 
 
+def close_stream(chunks: Optional[Iterable]) -> None:
+    """
+    close the http response of a streaming completion, if it is not consumed to the end.
+    """
+    if chunks is not None and hasattr(chunks, "close"):
+        chunks.close()
+
+
 class OpenAIAdapter(LLMApi):
     """
     adapter class wrap openai api to ghostos.blueprint.kernel.llms.LLMApi
@@ -411,28 +420,41 @@ class OpenAIAdapter(LLMApi):
         yield from self.reasoning_completion(prompt)
 
     def chat_completion_chunks(self, prompt: Prompt) -> Iterable[Message]:
+        chunks = None
+        output = []
+        count = 0
         try:
             prompt = self.parse_prompt(prompt)
             chunks: Iterable[ChatCompletionChunk] = self._chat_completion(prompt, stream=True)
             messages = self._from_openai_chat_completion_chunks(chunks)
             prompt_payload = PromptPayload.from_prompt(prompt)
-            output = []
             for chunk in messages:
                 if not prompt.first_token:
                     prompt.first_token = timestamp_ms()
+                count += 1
                 yield chunk
                 if chunk.is_complete():
                     self.model.set_payload(chunk)
                     prompt_payload.set_payload(chunk)
                     output.append(chunk)
             prompt.added = output
+        except GeneratorExit:
+            # the consumer canceled the streaming, close the http stream to stop generating tokens.
+            prompt.added = output
+            prompt.error = f"canceled after {count} chunks"
+            self._logger.info("chat completion stream of prompt %s is canceled after %d chunks", prompt.id, count)
+            raise
         except Exception as e:
             prompt.error = str(e)
             raise
         finally:
+            close_stream(chunks)
             self._storage.save(prompt)
 
     def parse_prompt(self, prompt: Prompt) -> Prompt:
+        if prompt.is_parsed_by(self):
+            # parsed by the wrapper of this api already.
+            return prompt
         # always deep copy prompt.
         prompt = prompt.model_copy(deep=True)
         prompt.model = self.model
@@ -440,6 +462,12 @@ class OpenAIAdapter(LLMApi):
         if support_functional_tokens and prompt.functional_tokens:
             prompt = self._generate_functional_token_prompt(prompt)
 
+        # keep the prompt within the context window of the model
+        if self.model.context_window:
+            budget = self.model.context_window - self.model.max_tokens
+            tokenizer = get_tokenizer(self.model.tokenizer)
+            prompt = TokenBudgetPipe(budget, tokenizer).update_prompt(prompt)
+        prompt.mark_parsed(self)
         return prompt
 
     def _generate_functional_token_prompt(self, prompt: Prompt) -> Prompt:
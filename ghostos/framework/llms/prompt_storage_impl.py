@@ -1,32 +1,248 @@
-from typing import Optional
+from typing import Optional, Dict, List
+from typing_extensions import Literal
+from collections import deque
+from queue import Queue, Full
+from threading import Thread, Lock
+import os
 
-from ghostos.contracts.storage import Storage
+from ghostos.contracts.storage import Storage, FileStorage
+from ghostos.contracts.logger import LoggerItf, get_ghostos_logger
 from ghostos.core.llms import Prompt
 from ghostos.core.llms.prompt import PromptStorage
-from ghostos.helpers import yaml_pretty_dump
+from ghostos.helpers import yaml_pretty_dump, sha1
 import yaml
 
+__all__ = ['PromptStorageImpl', 'WriteBehindPromptStorage', 'PromptSampling']
+
+PromptSampling = Literal["all", "errors", "none"]
+
 
 class PromptStorageImpl(PromptStorage):
 
-    def __init__(self, storage: Storage):
+    def __init__(self, storage: Storage, dedup: bool = False, max_prompts: int = 0):
+        """
+        :param storage: the storage to save prompt files
+        :param dedup: save system messages and functions as content-addressed blobs, shared by the prompts.
+        :param max_prompts: if positive, remove the oldest prompt files beyond it, and the blobs they only refer to.
+            the prompt files saved before are counted only if the storage is a FileStorage,
+            other storages can not be listed, so only the files saved by this instance are counted.
+        """
         self._storage = storage
+        self._dedup = dedup
+        self._max_prompts = max_prompts
+        # the saved prompt files from the oldest, with the blobs each one refers to.
+        self._saved: Optional[deque] = None
+        # the blob id to the count of the retained prompts refer to it.
+        self._refs: Dict[str, int] = {}
+        self._lock = Lock()
 
     @staticmethod
     def _get_filename(prompt_id: str) -> str:
         filename = f"{prompt_id}.prompt.yml"
         return filename
 
+    @staticmethod
+    def _get_blob_filename(blob_id: str) -> str:
+        return f"blobs/{blob_id}.yml"
+
     def save(self, prompt: Prompt) -> None:
         data = prompt.model_dump(exclude_defaults=True)
         filename = self._get_filename(prompt.id)
-        content = yaml_pretty_dump(data)
-        self._storage.put(filename, content.encode())
+        with self._lock:
+            # scan the existing files before saving the new one.
+            saved = self._get_saved() if self._max_prompts > 0 else None
+            refs = []
+            if self._dedup:
+                if "system" in data:
+                    # system messages are recreated every time, keep their ids out of the shared blob.
+                    system = data.pop("system")
+                    data["system_ids"] = [[item.pop("msg_id", ""), item.pop("created", 0.0)] for item in system]
+                    data["system_ref"] = self._save_blob(system)
+                    refs.append(data["system_ref"])
+                if "functions" in data:
+                    data["functions_ref"] = self._save_blob(data.pop("functions"))
+                    refs.append(data["functions_ref"])
+            content = yaml_pretty_dump(data)
+            self._storage.put(filename, content.encode())
+            if saved is not None:
+                saved.append((filename, refs))
+                while len(saved) > self._max_prompts:
+                    expired, expired_refs = saved.popleft()
+                    if self._storage.exists(expired):
+                        self._storage.remove(expired)
+                    self._release_blobs(expired_refs)
+
+    @staticmethod
+    def _get_refs(data: Dict) -> List[str]:
+        return [data[key] for key in ("system_ref", "functions_ref") if data.get(key, None)]
+
+    def _get_saved(self) -> deque:
+        """
+        the saved prompt files from the oldest, scan the existing ones at first.
+        """
+        if self._saved is None:
+            existing = []
+            if isinstance(self._storage, FileStorage):
+                directory = self._storage.abspath()
+                if os.path.isdir(directory):
+                    for entry in os.scandir(directory):
+                        if entry.is_file() and entry.name.endswith(".prompt.yml"):
+                            existing.append((entry.stat().st_mtime, entry.name))
+            self._saved = deque()
+            for _, name in sorted(existing):
+                refs = []
+                if self._dedup:
+                    refs = self._get_refs(yaml.safe_load(self._storage.get(name)) or {})
+                    for ref in refs:
+                        self._refs[ref] = self._refs.get(ref, 0) + 1
+                self._saved.append((name, refs))
+            if self._dedup:
+                self._remove_unreferenced_blobs()
+        return self._saved
+
+    def _remove_unreferenced_blobs(self) -> None:
+        """
+        remove the blobs of the prompts expired before, only a FileStorage can list them.
+        """
+        if not isinstance(self._storage, FileStorage):
+            return
+        directory = os.path.join(self._storage.abspath(), "blobs")
+        if not os.path.isdir(directory):
+            return
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(".yml"):
+                blob_id = entry.name[:-len(".yml")]
+                if blob_id not in self._refs:
+                    self._storage.remove(self._get_blob_filename(blob_id))
+
+    def _release_blobs(self, refs: List[str]) -> None:
+        for ref in refs:
+            count = self._refs.get(ref, 0) - 1
+            if count > 0:
+                self._refs[ref] = count
+                continue
+            self._refs.pop(ref, None)
+            filename = self._get_blob_filename(ref)
+            if self._storage.exists(filename):
+                self._storage.remove(filename)
+
+    def _save_blob(self, value: List) -> str:
+        content = yaml_pretty_dump(value)
+        blob_id = sha1(content)
+        if blob_id not in self._refs:
+            filename = self._get_blob_filename(blob_id)
+            if not self._storage.exists(filename):
+                self._storage.put(filename, content.encode())
+            self._refs[blob_id] = 0
+        if self._max_prompts > 0:
+            self._refs[blob_id] += 1
+        return blob_id
 
     def get(self, prompt_id: str) -> Optional[Prompt]:
         filename = self._get_filename(prompt_id)
         if self._storage.exists(filename):
             content = self._storage.get(filename)
             data = yaml.safe_load(content)
+            for field in ("system", "functions"):
+                ref = data.pop(f"{field}_ref", None)
+                if ref is not None:
+                    data[field] = yaml.safe_load(self._storage.get(self._get_blob_filename(ref)))
+            system_ids = data.pop("system_ids", None)
+            if system_ids:
+                for item, (msg_id, created) in zip(data["system"], system_ids):
+                    item["msg_id"] = msg_id
+                    item["created"] = created
             return Prompt(**data)
         return None
+
+
+class WriteBehindPromptStorage(PromptStorage):
+    """
+    save prompts by a background writer thread, keep the llm calls out of the disk writes.
+    """
+
+    def __init__(
+            self,
+            storage: PromptStorage,
+            *,
+            sampling: PromptSampling = "all",
+            sample_every: int = 1,
+            queue_size: int = 1000,
+            logger: Optional[LoggerItf] = None,
+    ):
+        """
+        :param storage: the storage that actually saves the prompts.
+        :param sampling: all: save sampled prompts and all the failed ones; errors: only the failed ones; none: nothing.
+        :param sample_every: save 1 of every N prompts, the failed prompts are always saved.
+        :param queue_size: the prompts beyond the queue size are dropped instead of blocking the caller.
+        """
+        self._storage = storage
+        self._sampling = sampling
+        self._sample_every = max(sample_every, 1)
+        self._logger = logger or get_ghostos_logger()
+        self._queue: Queue[Optional[Prompt]] = Queue(maxsize=queue_size)
+        self._pending: Dict[str, Prompt] = {}
+        self._lock = Lock()
+        self._count = 0
+        self._closed = False
+        self._writer = Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _sampled(self, prompt: Prompt) -> bool:
+        if self._sampling == "none":
+            return False
+        if prompt.error:
+            return True
+        if self._sampling == "errors":
+            return False
+        with self._lock:
+            self._count += 1
+            return self._count % self._sample_every == 0
+
+    def save(self, prompt: Prompt) -> None:
+        if self._closed or not self._sampled(prompt):
+            return
+        with self._lock:
+            self._pending[prompt.id] = prompt
+        try:
+            self._queue.put_nowait(prompt)
+        except Full:
+            with self._lock:
+                self._pending.pop(prompt.id, None)
+            self._logger.warning("prompt storage queue is full, drop prompt %s", prompt.id)
+
+    def get(self, prompt_id: str) -> Optional[Prompt]:
+        with self._lock:
+            prompt = self._pending.get(prompt_id)
+        if prompt is not None:
+            return prompt
+        return self._storage.get(prompt_id)
+
+    def _write_loop(self) -> None:
+        while True:
+            prompt = self._queue.get()
+            try:
+                if prompt is None:
+                    return
+                self._storage.save(prompt)
+            except Exception as e:
+                self._logger.exception("failed to save prompt %s: %s", prompt.id, e)
+            finally:
+                if prompt is not None:
+                    with self._lock:
+                        if self._pending.get(prompt.id) is prompt:
+                            del self._pending[prompt.id]
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """
+        block until all the queued prompts are saved.
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
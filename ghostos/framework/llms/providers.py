@@ -1,17 +1,23 @@
-from typing import Type, Optional
+from typing import Type, Optional, List
 from ghostos.contracts.configs import YamlConfig, Configs
-from ghostos.container import Provider, Container
+from ghostos.container import Provider, Container, BootstrapProvider
+from ghostos.contracts.shutdown import Shutdown
 from ghostos.core.llms import LLMs, LLMsConfig, PromptStorage
 from ghostos.core.messages.openai import OpenAIMessageParser
 from ghostos.framework.llms.llms import LLMsImpl
 from ghostos.framework.llms.openai_driver import OpenAIDriver
 from ghostos.framework.llms.lite_llm_driver import LiteLLMDriver
 from ghostos.framework.llms.deepseek_driver import DeepseekDriver
-from ghostos.framework.llms.prompt_storage_impl import PromptStorageImpl
+from ghostos.framework.llms.prompt_storage_impl import PromptStorageImpl, WriteBehindPromptStorage, PromptSampling
+from ghostos.framework.llms.replay_driver import ReplayLLMDriver, FileLLMRecordStore, ReplayMode
+from ghostos.core.llms import LLMDriver
 from ghostos.contracts.workspace import Workspace
 from ghostos.contracts.logger import LoggerItf
 
-__all__ = ['ConfigBasedLLMsProvider', 'PromptStorageInWorkspaceProvider', 'LLMsYamlConfig']
+__all__ = [
+    'ConfigBasedLLMsProvider', 'ReplayLLMsProvider',
+    'PromptStorageInWorkspaceProvider', 'LLMsYamlConfig',
+]
 
 
 class LLMsYamlConfig(YamlConfig, LLMsConfig):
@@ -34,32 +40,105 @@ class ConfigBasedLLMsProvider(Provider[LLMs]):
 
     def factory(self, con: Container) -> Optional[LLMs]:
         configs = con.force_fetch(Configs)
+        conf = configs.get(LLMsYamlConfig)
+        drivers = self._new_drivers(con)
+
+        # register default drivers. the first one is the default driver.
+        llms = LLMsImpl(conf=conf, default_driver=drivers[0])
+        for driver in drivers:
+            llms.register_driver(driver)
+        return llms
+
+    def _new_drivers(self, con: Container) -> List[LLMDriver]:
         storage = con.force_fetch(PromptStorage)
         parser = con.get(OpenAIMessageParser)
         logger: LoggerItf = con.force_fetch(LoggerItf)
+        return [
+            OpenAIDriver(storage, logger, parser),
+            LiteLLMDriver(storage, logger, parser),
+            DeepseekDriver(storage, logger, parser),
+        ]
 
-        conf = configs.get(LLMsYamlConfig)
-        openai_driver = OpenAIDriver(storage, logger, parser)
-        lite_llm_driver = LiteLLMDriver(storage, logger, parser)
-        deepseek_driver = DeepseekDriver(storage, logger, parser)
 
-        # register default drivers.
-        llms = LLMsImpl(conf=conf, default_driver=openai_driver)
-        llms.register_driver(openai_driver)
-        llms.register_driver(lite_llm_driver)
-        llms.register_driver(deepseek_driver)
+class ReplayLLMsProvider(ConfigBasedLLMsProvider):
+    """
+    the llms that record the llm responses in the workspace runtime cache, and replay them for identical prompts.
+    """
 
-        return llms
+    def __init__(
+            self,
+            mode: ReplayMode = "auto",
+            relative_path: str = "llm_records",
+            max_bytes: int = 512 * 1024 * 1024,
+            speed: float = 0.0,
+    ):
+        self._mode = mode
+        self._relative_path = relative_path
+        self._max_bytes = max_bytes
+        self._speed = speed
+
+    def _new_drivers(self, con: Container) -> List[LLMDriver]:
+        ws = con.force_fetch(Workspace)
+        logger = con.force_fetch(LoggerItf)
+        prompt_storage = con.force_fetch(PromptStorage)
+        store = FileLLMRecordStore(ws.runtime_cache().sub_storage(self._relative_path), self._max_bytes)
+        return [
+            ReplayLLMDriver(driver, store, self._mode, self._speed, logger, prompt_storage)
+            for driver in super()._new_drivers(con)
+        ]
 
 
-class PromptStorageInWorkspaceProvider(Provider[PromptStorage]):
-    def __init__(self, relative_path: str = "prompts"):
+class PromptStorageInWorkspaceProvider(BootstrapProvider[PromptStorage]):
+    def __init__(
+            self,
+            relative_path: str = "prompts",
+            *,
+            write_behind: bool = False,
+            sampling: PromptSampling = "all",
+            sample_every: int = 1,
+            dedup: bool = False,
+            max_prompts: int = 0,
+    ):
+        """
+        :param relative_path: the prompts directory in the workspace runtime.
+        :param write_behind: save prompts by a background writer thread out of the llm calls.
+        :param sampling: all, errors or none. see WriteBehindPromptStorage
+        :param sample_every: save 1 of every N prompts when write behind.
+        :param dedup: save system messages and functions as shared blobs, changes the format of the prompt files.
+        :param max_prompts: retention limit of the prompt files, 0 means no limit.
+        """
         self._relative_path = relative_path
+        self._write_behind = write_behind
+        self._sampling = sampling
+        self._sample_every = sample_every
+        self._dedup = dedup
+        self._max_prompts = max_prompts
 
     def singleton(self) -> bool:
         return True
 
+    def contract(self) -> Type[PromptStorage]:
+        return PromptStorage
+
     def factory(self, con: Container) -> Optional[PromptStorage]:
         ws = con.force_fetch(Workspace)
         storage = ws.runtime().sub_storage(self._relative_path)
-        return PromptStorageImpl(storage)
+        prompts = PromptStorageImpl(storage, dedup=self._dedup, max_prompts=self._max_prompts)
+        if not self._write_behind:
+            return prompts
+        logger = con.get(LoggerItf)
+        return WriteBehindPromptStorage(
+            prompts,
+            sampling=self._sampling,
+            sample_every=self._sample_every,
+            logger=logger,
+        )
+
+    def bootstrap(self, container: Container) -> None:
+        if not self._write_behind:
+            return
+        shutdown = container.get(Shutdown)
+        if shutdown is not None:
+            prompts = container.force_fetch(PromptStorage)
+            if isinstance(prompts, WriteBehindPromptStorage):
+                shutdown.register(prompts.close)
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import List, Iterable, Optional
+from typing_extensions import Literal
+from pydantic import BaseModel, Field
+from ghostos.contracts.storage import FileStorage, LRUFileStore
+from ghostos.contracts.logger import LoggerItf, get_ghostos_logger
+from ghostos.core.llms import LLMApi, LLMDriver, ServiceConf, ModelConf, Prompt, PromptStorage
+from ghostos.core.messages import Message
+from ghostos.helpers import sha256, timestamp, timestamp_ms
+
+__all__ = [
+    'ReplayMode', 'LLMRecord', 'LLMRecordItem',
+    'LLMRecordStore', 'FileLLMRecordStore',
+    'ReplayLLMDriver', 'ReplayLLMApi',
+    'prompt_cache_key',
+]
+
+ReplayMode = Literal["record", "replay", "auto"]
+"""
+record: always call the llm and record the response.
+replay: only serve recorded responses, raise LookupError when missing.
+auto: serve recorded responses, call the llm and record them when missing.
+"""
+
+
+class LLMRecordItem(BaseModel):
+    message: Message = Field(description="the recorded message or chunk")
+    delay: float = Field(default=0.0, description="seconds since the previous item was delivered")
+
+
+class LLMRecord(BaseModel):
+    """
+    the recorded response of a prompt.
+    """
+    key: str = Field(description="the cache key of the normalized prompt")
+    api: str = Field(default="", description="the api name that recorded the response")
+    method: str = Field(description="the LLMApi method that produced the items")
+    items: List[LLMRecordItem] = Field(default_factory=list)
+    created: int = Field(default_factory=timestamp)
+
+
+def prompt_cache_key(prompt: Prompt, model: ModelConf, method: str) -> str:
+    """
+    hash the prompt by the content sent to the llm, ignore message ids, timestamps and trace info.
+    """
+    messages = []
+    for message in prompt.get_messages():
+        messages.append(message.model_dump(
+            include={"type", "stage", "role", "name", "content", "memory", "call_id", "attrs", "callers"},
+            exclude_none=True,
+        ))
+    data = {
+        "method": method,
+        "messages": messages,
+        "functions": [func.model_dump(exclude_none=True) for func in prompt.functions],
+        "function_call": prompt.function_call,
+        "model": model.model_dump(exclude={"payloads"}, exclude_none=True),
+    }
+    return sha256(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str))
+
+
+class LLMRecordStore(ABC):
+    """
+    the store of the llm records.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[LLMRecord]:
+        pass
+
+    @abstractmethod
+    def save(self, record: LLMRecord) -> None:
+        pass
+
+
+class FileLLMRecordStore(LLMRecordStore):
+    """
+    save each record as a json file, evict the least recently used files when the total size exceeds.
+    """
+
+    def __init__(self, storage: FileStorage, max_bytes: int = 512 * 1024 * 1024):
+        self._store = LRUFileStore(storage, ".llm_record.json", max_bytes)
+
+    def get(self, key: str) -> Optional[LLMRecord]:
+        content = self._store.get(key)
+        if content is None:
+            return None
+        return LLMRecord.model_validate_json(content)
+
+    def save(self, record: LLMRecord) -> None:
+        content = record.model_dump_json(exclude_defaults=True).encode()
+        self._store.put(record.key, content)
+
+
+class ReplayLLMApi(LLMApi):
+    """
+    wrap a LLMApi, record its responses and replay them for the identical prompts.
+    """
+
+    def __init__(
+            self,
+            api: LLMApi,
+            store: LLMRecordStore,
+            mode: ReplayMode,
+            speed: float = 0.0,
+            logger: Optional[LoggerItf] = None,
+            prompt_storage: Optional[PromptStorage] = None,
+    ):
+        """
+        :param api: the real api
+        :param store: the record store
+        :param mode: record, replay or auto
+        :param speed: replay chunks with the original timing divided by the speed. 0 means no delay.
+        :param prompt_storage: save the replayed prompts like the real api saves the prompts it calls.
+        """
+        self._api = api
+        self._store = store
+        self._mode = mode
+        self._speed = speed
+        self._logger = logger or get_ghostos_logger()
+        self._prompt_storage = prompt_storage
+        self.service = api.service
+        self.model = api.model
+
+    @property
+    def name(self) -> str:
+        return self._api.name
+
+    def get_service(self) -> ServiceConf:
+        return self._api.get_service()
+
+    def get_model(self) -> ModelConf:
+        return self._api.get_model()
+
+    def parse_prompt(self, prompt: Prompt) -> Prompt:
+        return self._api.parse_prompt(prompt)
+
+    def text_completion(self, prompt: str) -> str:
+        return self._api.text_completion(prompt)
+
+    def chat_completion(self, prompt: Prompt) -> Message:
+        items = list(self._run("chat_completion", prompt, lambda parsed: [self._api.chat_completion(parsed)]))
+        return items[-1]
+
+    def chat_completion_chunks(self, prompt: Prompt) -> Iterable[Message]:
+        yield from self._run("chat_completion_chunks", prompt, self._api.chat_completion_chunks)
+
+    def reasoning_completion(self, prompt: Prompt) -> Iterable[Message]:
+        yield from self._run("reasoning_completion", prompt, self._api.reasoning_completion)
+
+    def reasoning_completion_stream(self, prompt: Prompt) -> Iterable[Message]:
+        yield from self._run("reasoning_completion_stream", prompt, self._api.reasoning_completion_stream)
+
+    def _parse_delivering_items(self, prompt: Prompt, stream: bool, items: Iterable[Message]) -> Iterable[Message]:
+        return self._api._parse_delivering_items(prompt, stream, items)
+
+    def _run(self, method: str, prompt: Prompt, call) -> Iterable[Message]:
+        """
+        :param call: call the real api with the parsed prompt, which the real api sends without parsing again.
+        """
+        # hash the prompt as the real api will send it.
+        parsed = self._api.parse_prompt(prompt)
+        key = prompt_cache_key(parsed, self.model, method)
+        if self._mode != "record":
+            record = self._store.get(key)
+            if record is not None:
+                self._logger.debug("replay llm record %s for prompt %s", key, prompt.id)
+                yield from self._replay(parsed, record)
+                return
+            if self._mode == "replay":
+                raise LookupError(f"llm record of prompt {prompt.id} not found, key {key}")
+
+        record = LLMRecord(key=key, api=self.name, method=method)
+        last = time.time()
+        items = call(parsed)
+        try:
+            for item in items:
+                now = time.time()
+                record.items.append(LLMRecordItem(message=item.get_copy(), delay=round(now - last, 4)))
+                last = now
+                yield item
+        finally:
+            # propagate the cancellation to the real api.
+            if hasattr(items, "close"):
+                items.close()
+        self._store.save(record)
+
+    def _replay(self, parsed: Prompt, record: LLMRecord) -> Iterable[Message]:
+        parsed.run_start = timestamp_ms()
+        try:
+            for item in record.items:
+                if self._speed > 0 and item.delay > 0:
+                    time.sleep(item.delay / self._speed)
+                message = item.message.get_copy()
+                if not parsed.first_token:
+                    parsed.first_token = timestamp_ms()
+                if message.is_complete():
+                    parsed.added.append(message)
+                yield message
+        except GeneratorExit:
+            parsed.error = f"canceled after {len(parsed.added)} messages"
+            raise
+        finally:
+            parsed.run_end = timestamp_ms()
+            if self._prompt_storage is not None:
+                self._prompt_storage.save(parsed)
+
+
+class ReplayLLMDriver(LLMDriver):
+    """
+    wrap a LLMDriver, so all the apis it creates record and replay the responses.
+    useful for regression tests, load tests and repeated runs of the same prompts.
+    """
+
+    def __init__(
+            self,
+            driver: LLMDriver,
+            store: LLMRecordStore,
+            mode: ReplayMode = "auto",
+            speed: float = 0.0,
+            logger: Optional[LoggerItf] = None,
+            prompt_storage: Optional[PromptStorage] = None,
+    ):
+        self._driver = driver
+        self._store = store
+        self._mode = mode
+        self._speed = speed
+        self._logger = logger
+        self._prompt_storage = prompt_storage
+
+    def driver_name(self) -> str:
+        return self._driver.driver_name()
+
+    def new(self, service: ServiceConf, model: ModelConf, api_name: str = "") -> LLMApi:
+        api = self._driver.new(service, model, api_name=api_name)
+        return ReplayLLMApi(api, self._store, self._mode, self._speed, self._logger, self._prompt_storage)
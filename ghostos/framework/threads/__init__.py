@@ -1,2 +1,4 @@
 from ghostos.core.runtime import GoThreads, GoThreadInfo
-from ghostos.framework.threads.storage_threads import MsgThreadRepoByStorageProvider, MsgThreadsRepoByWorkSpaceProvider
+from ghostos.framework.threads.storage_threads import (
+    GoThreadsByStorage, MsgThreadRepoByStorageProvider, MsgThreadsRepoByWorkSpaceProvider,
+)
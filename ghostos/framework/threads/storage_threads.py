@@ -1,12 +1,13 @@
-from typing import Optional, Type
+from typing import Optional, Type, Dict, List, Iterable
 from ghostos.core.runtime import GoThreadInfo, GoThreads, ThreadHistory
 from ghostos.contracts.workspace import Workspace
-from ghostos.contracts.storage import Storage
+from ghostos.contracts.storage import Storage, FileStorage
 from ghostos.contracts.logger import LoggerItf
-from ghostos.helpers import yaml_pretty_dump
+from ghostos.helpers import yaml_pretty_dump, sha1
 from ghostos.container import Provider, Container
 import yaml
 import os
+import time
 
 __all__ = ['GoThreadsByStorage', 'MsgThreadRepoByStorageProvider', 'MsgThreadsRepoByWorkSpaceProvider']
 
@@ -17,11 +18,19 @@ class GoThreadsByStorage(GoThreads):
             self, *,
             storage: Storage,
             logger: LoggerItf,
-            allow_saving_file: bool = True
+            allow_saving_file: bool = True,
+            compact: bool = False,
     ):
+        """
+        :param compact: save the pycontext code as content-addressed blobs shared by the threads,
+                        and save the pycontext of each turn as the delta to the previous turn.
+                        opt-in, the threads saved compactly can only be read by this class.
+                        the threads saved in either format are always readable.
+        """
         self._storage = storage
         self._logger = logger
         self._allow_saving_file = allow_saving_file
+        self._compact = compact
 
     def get_thread(self, thread_id: str, create: bool = False) -> Optional[GoThreadInfo]:
         path = self._get_thread_filename(thread_id)
@@ -33,11 +42,14 @@ class GoThreadsByStorage(GoThreads):
             return None
         content = self._storage.get(path)
         data = yaml.safe_load(content)
+        self._decode_pycontexts(data)
         thread = GoThreadInfo(**data)
         return thread
 
     def save_thread(self, thread: GoThreadInfo) -> None:
         data = thread.model_dump(exclude_defaults=True)
+        if self._compact:
+            self._encode_pycontexts(data)
         data_content = yaml_pretty_dump(data)
         path = self._get_thread_filename(thread.id)
         saving = data_content.encode('utf-8')
@@ -47,6 +59,140 @@ class GoThreadsByStorage(GoThreads):
     def _get_thread_filename(thread_id: str) -> str:
         return thread_id + ".thread.yml"
 
+    @staticmethod
+    def _get_blob_filename(blob_id: str) -> str:
+        return f"blobs/{blob_id}.py"
+
+    @staticmethod
+    def _iter_turns(data: Dict) -> Iterable[Dict]:
+        """
+        the turns in order, each pycontext is encoded relative to the previous one.
+        """
+        if data.get("on_created"):
+            yield data["on_created"]
+        yield from data.get("history", [])
+        if data.get("current"):
+            yield data["current"]
+
+    def _encode_pycontexts(self, data: Dict) -> None:
+        previous: Dict = {}
+        for turn in self._iter_turns(data):
+            pycontext = turn.pop("pycontext", {})
+            code = pycontext.pop("code", None)
+            if code is not None:
+                pycontext["code_ref"] = self._save_blob(code)
+            turn["pycontext_delta"] = self._diff(previous, pycontext)
+            previous = pycontext
+
+    def _decode_pycontexts(self, data: Dict) -> None:
+        previous: Dict = {}
+        for turn in self._iter_turns(data):
+            if "pycontext_delta" in turn:
+                pycontext = self._patch(previous, turn.pop("pycontext_delta"))
+            else:
+                # saved without compact.
+                pycontext = turn.get("pycontext", {})
+            previous = pycontext
+            pycontext = dict(pycontext)
+            code_ref = pycontext.pop("code_ref", None)
+            if code_ref is not None:
+                pycontext["code"] = self._storage.get(self._get_blob_filename(code_ref)).decode("utf-8")
+            turn["pycontext"] = pycontext
+
+    @staticmethod
+    def _diff(previous: Dict, current: Dict) -> Dict:
+        delta = {}
+        for key in set(previous.keys()) | set(current.keys()):
+            if key == "properties":
+                continue
+            if key not in current:
+                delta.setdefault("unset", []).append(key)
+            elif previous.get(key, None) != current[key]:
+                delta.setdefault("set", {})[key] = current[key]
+        previous_props = previous.get("properties", {})
+        current_props = current.get("properties", {})
+        for name, value in current_props.items():
+            if previous_props.get(name, None) != value:
+                delta.setdefault("props_set", {})[name] = value
+        for name in previous_props:
+            if name not in current_props:
+                delta.setdefault("props_unset", []).append(name)
+        return delta
+
+    @staticmethod
+    def _patch(previous: Dict, delta: Dict) -> Dict:
+        current = {k: v for k, v in previous.items() if k != "properties"}
+        for key in delta.get("unset", []):
+            current.pop(key, None)
+        current.update(delta.get("set", {}))
+        properties = dict(previous.get("properties", {}))
+        for name in delta.get("props_unset", []):
+            properties.pop(name, None)
+        properties.update(delta.get("props_set", {}))
+        if properties:
+            current["properties"] = properties
+        return current
+
+    def _save_blob(self, content: str) -> str:
+        blob_id = sha1(content)
+        filename = self._get_blob_filename(blob_id)
+        # always check the file, the blobs may be removed by clearing the runtime files.
+        if not self._storage.exists(filename):
+            self._storage.put(filename, content.encode("utf-8"))
+        return blob_id
+
+    def _list_files(self, directory: str, suffix: str) -> List[str]:
+        """
+        :return: the filenames relative to the storage, in the directory only.
+        """
+        storage = self._storage
+        if isinstance(storage, FileStorage):
+            abspath = os.path.join(storage.abspath(), directory)
+            if not os.path.isdir(abspath):
+                return []
+            return [
+                os.path.join(directory, entry.name) if directory else entry.name
+                for entry in os.scandir(abspath)
+                if entry.is_file() and entry.name.endswith(suffix)
+            ]
+        prefix = directory + "/" if directory else ""
+        return [
+            filename for filename in storage.dir("", True)
+            if filename.startswith(prefix) and "/" not in filename[len(prefix):] and filename.endswith(suffix)
+        ]
+
+    def remove_unreferenced_blobs(self, min_age: float = 3600.0) -> int:
+        """
+        remove the code blobs that no saved thread refers to.
+        :param min_age: seconds, the newer blobs of a FileStorage are kept,
+                        since a thread being saved writes its blobs before the thread file.
+        :return: number of the removed blobs
+        """
+        referenced = set()
+        for filename in self._list_files("", ".thread.yml"):
+            data = yaml.safe_load(self._storage.get(filename))
+            if not isinstance(data, dict):
+                continue
+            for turn in self._iter_turns(data):
+                # the delta of each turn sets the code ref when it changed.
+                code_ref = turn.get("pycontext_delta", {}).get("set", {}).get("code_ref", None)
+                if code_ref is not None:
+                    referenced.add(code_ref)
+
+        removed = 0
+        now = time.time()
+        for filename in self._list_files("blobs", ".py"):
+            blob_id = os.path.basename(filename)[:-len(".py")]
+            if blob_id in referenced:
+                continue
+            if isinstance(self._storage, FileStorage):
+                abspath = os.path.join(self._storage.abspath(), filename)
+                if now - os.path.getmtime(abspath) < min_age:
+                    continue
+            self._storage.remove(filename)
+            removed += 1
+        return removed
+
     def fork_thread(self, thread: GoThreadInfo) -> GoThreadInfo:
         fork = thread.fork()
         self.save_thread(fork)
@@ -55,8 +201,9 @@ class GoThreadsByStorage(GoThreads):
 
 class MsgThreadRepoByStorageProvider(Provider[GoThreads]):
 
-    def __init__(self, threads_dir: str = "runtime/threads"):
+    def __init__(self, threads_dir: str = "runtime/threads", compact: bool = False):
         self._threads_dir = threads_dir
+        self._compact = compact
 
     def singleton(self) -> bool:
         return True
@@ -68,13 +215,17 @@ class MsgThreadRepoByStorageProvider(Provider[GoThreads]):
         storage = con.force_fetch(Storage)
         threads_storage = storage.sub_storage(self._threads_dir)
         logger = con.force_fetch(LoggerItf)
-        return GoThreadsByStorage(storage=threads_storage, logger=logger)
+        return GoThreadsByStorage(storage=threads_storage, logger=logger, compact=self._compact)
 
 
 class MsgThreadsRepoByWorkSpaceProvider(Provider[GoThreads]):
 
-    def __init__(self, namespace: str = "threads"):
+    def __init__(self, namespace: str = "threads", compact: bool = False):
+        """
+        :param compact: save the pycontext code as shared blobs, the unreferenced blobs are removed at start.
+        """
         self._namespace = namespace
+        self._compact = compact
 
     def singleton(self) -> bool:
         return True
@@ -86,4 +237,9 @@ class MsgThreadsRepoByWorkSpaceProvider(Provider[GoThreads]):
         workspace = con.force_fetch(Workspace)
         logger = con.force_fetch(LoggerItf)
         threads_storage = workspace.runtime().sub_storage(self._namespace)
-        return GoThreadsByStorage(storage=threads_storage, logger=logger)
+        threads = GoThreadsByStorage(storage=threads_storage, logger=logger, compact=self._compact)
+        if self._compact:
+            removed = threads.remove_unreferenced_blobs()
+            if removed:
+                logger.info("removed %d unreferenced thread code blobs", removed)
+        return threads
@@ -5,13 +5,13 @@ from types import ModuleType
 from ghostos.identifier import Identifier
 from pydantic import BaseModel, Field
 
-from ghostos.helpers import import_from_path
+from ghostos.helpers import import_from_path, uuid
 from ghostos.prompter import TextPrmt, Prompter
 from ghostos.abcd import GhostDriver, Operator, Agent, Session, StateValue, Action, Thought, Ghost
 from ghostos.core.runtime import Event, GoThreadInfo
-from ghostos.core.moss import MossCompiler, PyContext, MossRuntime
+from ghostos.core.moss import MossCompiler, PyContext, MossRuntime, MossSandbox, MOSS_VALUE_NAME
 from ghostos.entity import ModelEntity
-from ghostos.core.messages import FunctionCaller, Role
+from ghostos.core.messages import FunctionCaller, Role, Message, MessageType
 from ghostos.core.llms import (
     Prompt, PromptPipe, AssistantNamePipe, run_prompt_pipeline,
     LLMFunc, FunctionalToken,
@@ -24,7 +24,7 @@ import json
 
 from ghostos.container import Provider
 
-__all__ = ['MossAgent', 'MossAgentDriver', 'MossAction']
+__all__ = ['MossAgent', 'MossAgentDriver', 'MossAction', 'SessionMossRuntimes']
 
 
 class MossAgent(ModelEntity, Agent):
@@ -46,6 +46,15 @@ class MossAgent(ModelEntity, Agent):
     llm_api: str = Field(default="", description="name of the llm api, if none, use default one")
     truncate_at_turns: int = Field(default=40, description="when history turns reach the point, truncate")
     truncate_to_turns: int = Field(default=20, description="when truncate the history, left turns")
+    sandbox: bool = Field(
+        default=False,
+        description="execute the moss code in the sandbox worker processes, "
+                    "the session level injections are not available there",
+    )
+    stream_output: bool = Field(
+        default=False,
+        description="stream the std output of the moss code to the upstream while it is running",
+    )
 
     def __identifier__(self) -> Identifier:
         name = self.name if self.name else self.moss_module
@@ -99,26 +108,19 @@ class MossAgentDriver(GhostDriver[MossAgent]):
         if __moss_agent_artifact__.__name__ not in m.__dict__:
             return None
         fn = getattr(m, __moss_agent_artifact__.__name__)
-        compiler = self._get_moss_compiler(session)
-        with compiler:
-            runtime = compiler.compile(self.ghost.moss_module)
-            with runtime:
-                moss = runtime.moss()
-                return fn(self.ghost, moss)
+        # the artifact is produced by the moss module itself, not the compile module.
+        runtime = self.get_moss_runtime(session, self.ghost.moss_module)
+        moss = runtime.moss()
+        return fn(self.ghost, moss)
 
     def get_instructions(self, session: Session) -> str:
-        compiler = self._get_moss_compiler(session)
-        with compiler:
-            rtm = compiler.compile(self.ghost.compile_module)
-            with rtm:
-                return self._get_instructions(session, rtm)
+        rtm = self.get_moss_runtime(session)
+        return self._get_instructions(session, rtm)
 
     def actions(self, session: Session) -> List[Action]:
-        compiler = self._get_moss_compiler(session)
-        with compiler:
-            runtime = compiler.compile(self.ghost.moss_module)
-            actions = self.get_actions(session, runtime)
-            return list(actions)
+        runtime = self.get_moss_runtime(session)
+        actions = self.get_actions(session, runtime)
+        return list(actions)
 
     def thought(self, session: Session, runtime: MossRuntime) -> Thought:
         from .for_meta_ai import __moss_agent_thought__ as fn
@@ -137,7 +139,8 @@ class MossAgentDriver(GhostDriver[MossAgent]):
             fn = compiled.__dict__[fn.__name__]
         yield from fn(self.ghost, runtime.moss())
         # moss action at last
-        moss_action = MossAction(runtime)
+        sandbox = session.container.force_fetch(MossSandbox) if self.ghost.sandbox else None
+        moss_action = MossAction(runtime, sandbox=sandbox, stream_output=self.ghost.stream_output)
         yield moss_action
 
     def on_creating(self, session: Session) -> None:
@@ -149,31 +152,28 @@ class MossAgentDriver(GhostDriver[MossAgent]):
         return
 
     def on_event(self, session: Session, event: Event) -> Union[Operator, None]:
-        compiler = self._get_moss_compiler(session)
-        with compiler:
-            rtm = compiler.compile(self.ghost.compile_module)
-            with rtm:
-                # prepare instructions.
-                op, ok = self._on_custom_event_handler(session, rtm, event)
-                if ok:
-                    return op or session.taskflow().wait()
-
-                # prepare thread
-                thread = session.thread
-                thread.new_turn(event)
-
-                # prepare prompt
-                instructions = self._get_instructions(session, rtm)
-                prompt = thread.to_prompt([Role.SYSTEM.new(content=instructions)], truncate=True)
-                pipes = self._get_prompt_pipes(session, rtm)
-                prompt = run_prompt_pipeline(prompt, pipes)
-
-                # prepare actions
-                thought = self.thought(session, rtm)
-                prompt, op = thought.think(session, prompt)
-                if op is not None:
-                    return op
-                return session.taskflow().wait()
+        rtm = self.get_moss_runtime(session)
+        # prepare instructions.
+        op, ok = self._on_custom_event_handler(session, rtm, event)
+        if ok:
+            return op or session.taskflow().wait()
+
+        # prepare thread
+        thread = session.thread
+        thread.new_turn(event)
+
+        # prepare prompt
+        instructions = self._get_instructions(session, rtm)
+        prompt = thread.to_prompt([Role.SYSTEM.new(content=instructions)], truncate=True)
+        pipes = self._get_prompt_pipes(session, rtm)
+        prompt = run_prompt_pipeline(prompt, pipes)
+
+        # prepare actions
+        thought = self.thought(session, rtm)
+        prompt, op = thought.think(session, prompt)
+        if op is not None:
+            return op
+        return session.taskflow().wait()
 
     def _on_custom_event_handler(
             self,
@@ -197,6 +197,7 @@ class MossAgentDriver(GhostDriver[MossAgent]):
         """
         prompter = self._get_instruction_prompter(session, runtime)
         instruction = prompter.get_prompt(session.container, depth=0)
+        session.logger.debug("moss agent instruction render times: %s", prompter.get_render_times())
         return instruction
 
     def _get_instruction_prompter(self, session: Session, runtime: MossRuntime) -> Prompter:
@@ -255,6 +256,29 @@ class MossAgentDriver(GhostDriver[MossAgent]):
     def _get_prompt_pipes(self, session: Session, runtime: MossRuntime) -> Iterable[PromptPipe]:
         yield AssistantNamePipe(self.ghost.name)
 
+    def get_moss_runtime(self, session: Session, modulename: Optional[str] = None) -> MossRuntime:
+        """
+        get the moss runtime shared by the driver calls of the session.
+        the runtime is compiled again only if the session pycontext changed (e.g. moss code executed),
+        and is closed when the session container shutdown.
+        :param modulename: the module name to compile, default is the compile module of the ghost.
+        """
+        if modulename is None:
+            modulename = self.ghost.compile_module
+        runtimes = session.container.get(SessionMossRuntimes)
+        if runtimes is None:
+            runtimes = SessionMossRuntimes()
+            session.container.set(SessionMossRuntimes, runtimes)
+            session.container.add_shutdown(runtimes.close)
+        pycontext = self.get_pycontext(session)
+        runtime = runtimes.get(modulename, pycontext)
+        if runtime is None:
+            compiler = self._get_moss_compiler(session)
+            with compiler:
+                runtime = compiler.compile(modulename)
+            runtimes.set(modulename, pycontext, runtime)
+        return runtime
+
     def _get_moss_compiler(self, session: Session) -> MossCompiler:
         from ghostos.ghosts.moss_agent.for_developer import __moss_agent_injections__
         pycontext = self.get_pycontext(session)
@@ -295,6 +319,50 @@ class MossAgentDriver(GhostDriver[MossAgent]):
         return pycontext.get_or_bind(session)
 
 
+class SessionMossRuntimes:
+    """
+    the moss runtimes compiled in one session, keyed by the compile module name.
+    """
+
+    def __init__(self):
+        self._runtimes: Dict[Optional[str], Tuple[PyContext, MossRuntime]] = {}
+        self._outdated: List[MossRuntime] = []
+
+    def get(self, modulename: Optional[str], pycontext: PyContext) -> Optional[MossRuntime]:
+        got = self._runtimes.get(modulename, None)
+        if got is None:
+            return None
+        compiled_pycontext, runtime = got
+        if compiled_pycontext != pycontext:
+            # the pycontext changed, the runtime is outdated.
+            # the actions created by it may still be running, so close it with the session.
+            del self._runtimes[modulename]
+            self._outdated.append(runtime)
+            return None
+        return runtime
+
+    def discard(self, runtime: MossRuntime) -> None:
+        """
+        discard the runtime, the next get compiles a new one.
+        the runtime is closed with the session, since the actions created by it may still be running.
+        """
+        for modulename, (_, cached) in list(self._runtimes.items()):
+            if cached is runtime:
+                del self._runtimes[modulename]
+                self._outdated.append(runtime)
+
+    def set(self, modulename: Optional[str], pycontext: PyContext, runtime: MossRuntime) -> None:
+        self._runtimes[modulename] = (pycontext.model_copy(deep=True), runtime)
+
+    def close(self) -> None:
+        runtimes = [runtime for _, runtime in self._runtimes.values()]
+        runtimes.extend(self._outdated)
+        self._runtimes = {}
+        self._outdated = []
+        for runtime in runtimes:
+            runtime.close()
+
+
 class SessionPyContext(PyContext, StateValue):
     """
     bind pycontext to session.state
@@ -319,8 +387,16 @@ class MossAction(Action, PromptPipe):
     class Argument(BaseModel):
         code: str = Field(description="the python code you want to execute. never quote them with ```")
 
-    def __init__(self, runtime: MossRuntime, name: str = DEFAULT_NAME):
+    def __init__(
+            self,
+            runtime: MossRuntime,
+            name: str = DEFAULT_NAME,
+            sandbox: Optional[MossSandbox] = None,
+            stream_output: bool = False,
+    ):
         self.runtime: MossRuntime = runtime
+        self.sandbox: Optional[MossSandbox] = sandbox
+        self.stream_output = stream_output
         self._name = name
 
     def name(self) -> str:
@@ -394,9 +470,22 @@ class MossAction(Action, PromptPipe):
         if error:
             return self.fire_error(session, caller, f"the moss code has syntax errors:\n{error}")
 
-        moss = self.runtime.moss()
+        stream_id = None
         try:
-            result = self.runtime.execute(target="run", code=code, args=[moss])
+            if self.sandbox is not None:
+                pycontext = self.runtime.dump_pycontext()
+                result = self.sandbox.execute(pycontext, target="run", code=code, local_args=[MOSS_VALUE_NAME])
+            else:
+                moss = self.runtime.moss()
+                stream_id = self._stream_std_output(session, caller)
+                try:
+                    result = self.runtime.execute(target="run", code=code, args=[moss])
+                except Exception:
+                    # the failed code may leave globals or output in the runtime, never reuse it.
+                    self._discard_runtime(session)
+                    raise
+                finally:
+                    self.runtime.stream_std_output(None)
             op = result.returns
             if op is not None and not isinstance(op, Operator):
                 return self.fire_error(session, caller, "result of moss code is not None or Operator")
@@ -411,6 +500,9 @@ class MossAction(Action, PromptPipe):
             if std_output:
                 output = f"Moss output:\n{std_output}"
                 message = caller.new_output(output)
+                if stream_id:
+                    # the complete output replaces the streamed chunks.
+                    message.msg_id = stream_id
                 session.respond([message])
                 if op is None:
                     # if std output is not empty, and op is none, observe the output as default.
@@ -424,6 +516,34 @@ class MossAction(Action, PromptPipe):
             session.logger.exception(e)
             return self.fire_error(session, caller, f"error during executing moss code: {e}")
 
+    def _discard_runtime(self, session: Session) -> None:
+        runtimes = session.container.get(SessionMossRuntimes)
+        if runtimes is not None:
+            runtimes.discard(self.runtime)
+
+    def _stream_std_output(self, session: Session, caller: FunctionCaller) -> Optional[str]:
+        """
+        send the std output chunks to the upstream while the moss code is running.
+        :return: the msg id of the streaming output
+        """
+        upstream = session.upstream
+        if not self.stream_output or upstream is None or not upstream.alive() or upstream.completes_only():
+            return None
+        msg_id = uuid()
+
+        def forward(chunk: str) -> None:
+            if upstream.alive():
+                upstream.send([Message.new_chunk(
+                    typ_=MessageType.FUNCTION_OUTPUT.value,
+                    content=chunk,
+                    call_id=caller.id,
+                    name=caller.name,
+                    msg_id=msg_id,
+                )])
+
+        self.runtime.stream_std_output(forward)
+        return msg_id
+
     @staticmethod
     def fire_error(session: Session, caller: FunctionCaller, error: str) -> Operator:
         message = caller.new_output(error)
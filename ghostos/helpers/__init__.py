@@ -17,15 +17,17 @@ from ghostos.helpers.modules import (
     rewrite_module_by_path,
     create_module,
     create_and_bind_module,
+    ImportPathRegistry,
+    import_path_registry,
 )
-from ghostos.helpers.io import BufferPrint
+from ghostos.helpers.io import BufferPrint, BoundedOutput
 from ghostos.helpers.timeutils import Timeleft, timestamp_datetime, timestamp, timestamp_ms
 from ghostos.helpers.hashes import md5, sha1, sha256
 from ghostos.helpers.trans import gettext, ngettext, get_current_locale, GHOSTOS_DOMAIN
 
 from ghostos.helpers.coding import reflect_module_code, unwrap
 from ghostos.helpers.openai import get_openai_key
-from ghostos.helpers.tree_sitter import tree_sitter_parse, code_syntax_check
+from ghostos.helpers.tree_sitter import tree_sitter_parse, code_syntax_check, IncrementalTreeParser
 
 if TYPE_CHECKING:
     from typing import Callable
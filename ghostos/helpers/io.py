@@ -1,17 +1,107 @@
+from typing import Optional, Callable
+from collections import deque
 from contextlib import redirect_stdout
 import io
 
+__all__ = ['BufferPrint', 'BoundedOutput']
+
+
+class BoundedOutput(io.TextIOBase):
+    """
+    a capped text buffer for the std output.
+    keep the head and the tail of the written text, and drop the middle part beyond the limit.
+    """
+
+    def __init__(
+            self,
+            max_chars: int = 20000,
+            head_chars: Optional[int] = None,
+            on_write: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        :param max_chars: max chars of the kept text. if not positive, keep everything.
+        :param head_chars: chars kept from the head, default is half of the max chars.
+        :param on_write: callback on each written chunk, for streaming the output.
+        """
+        super().__init__()
+        self._max_chars = max_chars
+        self._head_chars = head_chars if head_chars is not None else max_chars // 2
+        self._tail_chars = max(max_chars - self._head_chars, 0)
+        self._head = io.StringIO()
+        self._head_size = 0
+        self._tail = deque()
+        self._tail_size = 0
+        self._dropped = 0
+        self.on_write = on_write
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not s:
+            return 0
+        if self.on_write is not None:
+            self.on_write(s)
+        size = len(s)
+        if self._max_chars <= 0:
+            self._head.write(s)
+            self._head_size += size
+            return size
+
+        rest = s
+        if self._head_size < self._head_chars:
+            head = rest[:self._head_chars - self._head_size]
+            self._head.write(head)
+            self._head_size += len(head)
+            rest = rest[len(head):]
+        if rest:
+            self._tail.append(rest)
+            self._tail_size += len(rest)
+            while self._tail_size > self._tail_chars:
+                first = self._tail.popleft()
+                over = self._tail_size - self._tail_chars
+                if len(first) > over:
+                    self._tail.appendleft(first[over:])
+                    self._dropped += over
+                    self._tail_size -= over
+                else:
+                    self._dropped += len(first)
+                    self._tail_size -= len(first)
+        return size
+
+    def dropped(self) -> int:
+        """
+        :return: number of the dropped chars
+        """
+        return self._dropped
+
+    def clear(self) -> None:
+        """
+        drop the written text, the on_write callback is kept.
+        """
+        self._head = io.StringIO()
+        self._head_size = 0
+        self._tail.clear()
+        self._tail_size = 0
+        self._dropped = 0
+
+    def getvalue(self) -> str:
+        tail = "".join(self._tail)
+        if self._dropped:
+            return f"{self._head.getvalue()}\n... [{self._dropped} chars omitted] ...\n{tail}"
+        return self._head.getvalue() + tail
+
 
 class BufferPrint:
     """
     print 方法的替代.
     """
 
-    def __init__(self):
-        self._buffer = io.StringIO()
+    def __init__(self, max_chars: int = 0):
+        self._buffer = BoundedOutput(max_chars)
 
     def print(self, *args, **kwargs):
-        with self._buffer as buffer, redirect_stdout(buffer):
+        with redirect_stdout(self._buffer):
             print(*args, **kwargs)
 
     def buffer(self) -> str:
@@ -1,5 +1,8 @@
 import inspect
-from typing import Any, Tuple, Optional, Dict, Callable, Type, TypeVar
+import sys
+import threading
+import weakref
+from typing import Any, Tuple, Optional, Dict, Callable, Type, TypeVar, List
 from types import ModuleType
 
 __all__ = [
@@ -17,6 +20,8 @@ __all__ = [
     'rewrite_module_by_path',
     'create_module',
     'create_and_bind_module',
+    'ImportPathRegistry',
+    'import_path_registry',
 ]
 
 Importer = Callable[[str], ModuleType]
@@ -31,7 +36,99 @@ def import_class_from_path(path: str, parent: Optional[T]) -> T:
     return imported
 
 
+class ImportPathRegistry:
+    """
+    process-wide cache of the resolved import paths, and of the import paths generated from the values.
+    a resolved import path is valid while the module in sys.modules and its top level attribute are the same,
+    so the reloaded modules are followed.
+    only the modules and their top level attributes are cached, the nested attributes like `mod:Foo.bar`
+    may be reassigned without changing the top level one, so they are resolved each time.
+    call `invalidate` after rewriting a module, the hooks invalidate the caches built on the import paths.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # import path => (module, top level attr name or None, value)
+        self._imported: Dict[str, Tuple[ModuleType, Optional[str], Any]] = {}
+        # value => (modulename, qualname, import path)
+        self._generated: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._hooks: List[Callable[[Optional[str]], None]] = []
+
+    def import_from_path(self, module_spec: str) -> Any:
+        cached = self._imported.get(module_spec, None)
+        if cached is not None:
+            module, attr_name, value = cached
+            if sys.modules.get(module.__name__, None) is module and (
+                    attr_name is None or module.__dict__.get(attr_name, None) is value
+            ):
+                return value
+        value = _import_from_path(module_spec, None)
+        modulename, spec = parse_import_path_module_and_attr_name(module_spec)
+        if spec and "." in spec:
+            return value
+        module = sys.modules.get(modulename, None)
+        if module is not None and value is not None:
+            with self._lock:
+                self._imported[module_spec] = (module, spec or None, value)
+        return value
+
+    def generate_import_path(self, value: Any) -> str:
+        modulename = getattr(value, '__module__', None)
+        qualname = getattr(value, '__qualname__', None)
+        try:
+            cached = self._generated.get(value, None)
+        except TypeError:
+            # not weak referable or not hashable.
+            return _generate_import_path(value)
+        if cached is not None and cached[0] == modulename and cached[1] == qualname:
+            return cached[2]
+        path = _generate_import_path(value)
+        with self._lock:
+            self._generated[value] = (modulename, qualname, path)
+        return path
+
+    def add_invalidation_hook(self, hook: Callable[[Optional[str]], None]) -> None:
+        """
+        :param hook: called with the invalidated module name, or None if all are invalidated.
+        """
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_invalidation_hook(self, hook: Callable[[Optional[str]], None]) -> None:
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def invalidate(self, modulename: Optional[str] = None) -> None:
+        """
+        :param modulename: invalidate the import paths of the module and its submodules, default is all.
+        the generated import paths are checked by the attributes of the values, never need to be invalidated.
+        """
+        with self._lock:
+            if modulename is None:
+                self._imported.clear()
+                self._generated.clear()
+            else:
+                prefix = modulename + "."
+                for key in list(self._imported.keys()):
+                    name = key.split(':', 1)[0]
+                    if name == modulename or name.startswith(prefix):
+                        del self._imported[key]
+            hooks = list(self._hooks)
+        for hook in hooks:
+            hook(modulename)
+
+
+import_path_registry = ImportPathRegistry()
+
+
 def import_from_path(module_spec: str, importer: Optional[Importer] = None) -> Any:
+    if importer is None:
+        return import_path_registry.import_from_path(module_spec)
+    return _import_from_path(module_spec, importer)
+
+
+def _import_from_path(module_spec: str, importer: Optional[Importer] = None) -> Any:
     if importer is None:
         from importlib import import_module
         importer = import_module
@@ -105,6 +202,10 @@ def create_and_bind_module(modulename: str, filename: str, force: bool = False):
 
 
 def generate_import_path(value: Any) -> str:
+    return import_path_registry.generate_import_path(value)
+
+
+def _generate_import_path(value: Any) -> str:
     module, spec = generate_module_and_attr_name(value)
     return join_import_module_and_spec(module, spec)
 
@@ -160,3 +261,4 @@ def rewrite_module(module: ModuleType, code: str) -> None:
     filename = inspect.getfile(module)
     with open(filename, 'w') as f:
         f.write(code)
+    import_path_registry.invalidate(module.__name__)
@@ -1,21 +1,53 @@
-from typing import Optional, Iterable, List, Set, Dict, Type, ClassVar, Generator
+from typing import Optional, Iterable, List, Set, Dict, Type, ClassVar, Generator, Tuple
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from hashlib import sha1
+from threading import local, Lock
 from tree_sitter_languages import get_parser
 from tree_sitter import (
-    Tree, Node as TreeSitterNode,
+    Tree, Parser, Node as TreeSitterNode,
 )
 from enum import Enum
 
-_PythonParser = None
+__all__ = [
+    'tree_sitter_parse', 'code_syntax_check',
+    'IncrementalTreeParser', 'iter_error_nodes',
+]
 
-__all__ = ['tree_sitter_parse', 'code_syntax_check']
+_parsers = local()
+"""tree-sitter parsers are not thread-safe, each thread has its own"""
+
+_parsed_trees: OrderedDict[str, Tree] = OrderedDict()
+_parsed_trees_lock = Lock()
+_parsed_trees_max_size = 256
+
+
+def get_python_parser() -> Parser:
+    parser = getattr(_parsers, "python", None)
+    if parser is None:
+        parser = get_parser('python')
+        _parsers.python = parser
+    return parser
 
 
 def tree_sitter_parse(code: str) -> Tree:
-    global _PythonParser
-    if _PythonParser is None:
-        _PythonParser = get_parser('python')
-    return _PythonParser.parse(code.encode())
+    """
+    parse python code, the trees are cached by the source hash.
+    the returned tree is shared, never edit it. use IncrementalTreeParser instead.
+    """
+    source = code.encode()
+    key = sha1(source).hexdigest()
+    with _parsed_trees_lock:
+        tree = _parsed_trees.get(key, None)
+        if tree is not None:
+            _parsed_trees.move_to_end(key)
+            return tree
+    tree = get_python_parser().parse(source)
+    with _parsed_trees_lock:
+        _parsed_trees[key] = tree
+        while len(_parsed_trees) > _parsed_trees_max_size:
+            _parsed_trees.popitem(last=False)
+    return tree
 
 
 def code_syntax_check(code: str) -> Optional[str]:
@@ -23,14 +55,112 @@ def code_syntax_check(code: str) -> Optional[str]:
         tree = tree_sitter_parse(code)
     except Exception as e:
         return f"parse code failed: {e}"
+    return tree_syntax_errors(code, tree)
 
+
+def tree_syntax_errors(code: str, tree: Tree) -> Optional[str]:
     errors = []
-    travel_node_error(code, tree.root_node, errors)
+    lines = None
+    for node in iter_error_nodes(tree.root_node):
+        if lines is None:
+            lines = code.splitlines()
+        errors.append(_node_error_message(lines, node))
     if errors:
         return "- " + "\n- ".join(errors)
     return None
 
 
+class IncrementalTreeParser:
+    """
+    keep the tree of an editing source, re-parse only the edited range by the tree-sitter edit api.
+    """
+
+    def __init__(self, code: str = ""):
+        self._source = code.encode()
+        self._code = code
+        self._tree = get_python_parser().parse(self._source)
+
+    def tree(self) -> Tree:
+        return self._tree
+
+    def code(self) -> str:
+        return self._code
+
+    def update(self, code: str) -> Tree:
+        """
+        update the source and re-parse the edited range.
+        """
+        source = code.encode()
+        old = self._source
+        if source == old:
+            return self._tree
+        start, old_end, new_end = _diff_range(old, source)
+        self._tree.edit(
+            start_byte=start,
+            old_end_byte=old_end,
+            new_end_byte=new_end,
+            start_point=_byte_point(old, start),
+            old_end_point=_byte_point(old, old_end),
+            new_end_point=_byte_point(source, new_end),
+        )
+        self._tree = get_python_parser().parse(source, self._tree)
+        self._source = source
+        self._code = code
+        return self._tree
+
+    def syntax_check(self, code: Optional[str] = None) -> Optional[str]:
+        """
+        :param code: if given, update the source before check.
+        :return: the syntax errors or None
+        """
+        if code is not None:
+            try:
+                self.update(code)
+            except Exception as e:
+                return f"parse code failed: {e}"
+        return tree_syntax_errors(self._code, self._tree)
+
+
+def _diff_range(old: bytes, new: bytes) -> Tuple[int, int, int]:
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, len(old) - suffix, len(new) - suffix
+
+
+def _byte_point(source: bytes, offset: int) -> Tuple[int, int]:
+    row = source.count(b"\n", 0, offset)
+    line_start = source.rfind(b"\n", 0, offset) + 1
+    return row, offset - line_start
+
+
+def iter_error_nodes(node: TreeSitterNode) -> Iterable[TreeSitterNode]:
+    """
+    walk the nodes by cursor, yield the outermost error nodes and skip the subtrees without errors.
+    """
+    cursor = node.walk()
+    while True:
+        current = cursor.node
+        if current.is_error:
+            yield current
+        elif current.has_error and cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
+
+
+def _node_error_message(lines: List[str], node: TreeSitterNode) -> str:
+    start_point_row, col = node.start_point
+    line_number = start_point_row + 1
+    line_content = lines[line_number - 1] if line_number <= len(lines) else ""
+    return f"Syntax Error at line {line_number}: `{line_content}`"
+
+
 def traverse_tree(tree: Tree) -> Generator[TreeSitterNode, None, None]:
     cursor = tree.walk()
 
@@ -124,7 +254,7 @@ class PyNode(ABC):
 
     def tree_sitter_node(self) -> TreeSitterNode:
         if self._tree_sitter_node is None:
-            parsed = parse(self._source)
+            parsed = tree_sitter_parse(self._source)
             self._tree_sitter_node = parsed.root_node
         return self._tree_sitter_node
 
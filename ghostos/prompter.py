@@ -2,17 +2,22 @@ from __future__ import annotations
 
 import inspect
 from typing import (
-    List, Union, Callable, Any, Protocol, Optional, Dict, TypeVar, Type, Generic,
+    List, Union, Callable, Any, Protocol, Optional, Dict, TypeVar, Type, Generic, ClassVar, Tuple,
 )
 from typing_extensions import Self
 from abc import ABC, abstractmethod
 from types import ModuleType
+from collections import OrderedDict
+from concurrent.futures import Future
 from ghostos.container import Container
-from ghostos.helpers import generate_import_path, import_class_from_path, import_from_path
+from ghostos.helpers import generate_import_path, import_class_from_path, import_from_path, sha1
 from pydantic import BaseModel, Field
 from ghostos.entity import EntityMeta, from_entity_meta, to_entity_meta
 
 import json
+import os
+import threading
+import time
 
 __all__ = [
     'get_defined_prompt',
@@ -21,6 +26,7 @@ __all__ = [
     'TextPrmt',
     'InspectPrmt',
     'PromptAbleObj', 'PromptAbleClass',
+    'PromptCache', 'prompt_cache',
 ]
 
 
@@ -77,6 +83,74 @@ def set_class_prompt(cls: type, prompter: Union[Callable[[], str], str], force:
 
 # ---- prompter ---- #
 
+def _get_mtime(filename: str) -> float:
+    try:
+        return os.path.getmtime(filename)
+    except OSError:
+        return 0.0
+
+
+class PromptCache:
+    """
+    process-wide cache of the title and the self prompt of the prompters, keyed by the content hash of them.
+    the prompters are rebuilt at each event, but the same contents render the same prompts.
+    an entry is expired once any file it depends on is modified.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # key => (dependency files with their mtime, title, self prompt)
+        self._entries: OrderedDict[str, Tuple[Tuple[Tuple[str, float], ...], str, str]] = OrderedDict()
+
+    @staticmethod
+    def dependency_versions(dependencies: List[str]) -> Tuple[Tuple[str, float], ...]:
+        return tuple((filename, _get_mtime(filename)) for filename in dependencies)
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        :return: (title, self prompt) or None if not cached or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            return None
+        versions, title, prompt = entry
+        for filename, mtime in versions:
+            if _get_mtime(filename) != mtime:
+                with self._lock:
+                    self._entries.pop(key, None)
+                return None
+        return title, prompt
+
+    def set(self, key: str, versions: Tuple[Tuple[str, float], ...], title: str, prompt: str) -> None:
+        """
+        :param versions: the dependency versions taken before rendering.
+        """
+        with self._lock:
+            self._entries[key] = (versions, title, prompt)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+prompt_cache = PromptCache()
+
+
+def _get_render_pool(container: Container) -> Any:
+    """
+    :return: the Pool bound to the container, None if not bound, then the children are rendered sequentially.
+    """
+    from ghostos.contracts.pool import Pool
+    return container.get(Pool) if container.bound(Pool) else None
+
+
 class Prompter(ABC):
     """
     is strong-typed model for runtime alternative properties of a ghost.
@@ -89,6 +163,15 @@ class Prompter(ABC):
 
     __self_prompt__: Optional[str] = None
 
+    __render_time__: Optional[float] = None
+    """ seconds of the last rendering of the prompter and its children, for profiling """
+
+    __prompt_cacheable__: ClassVar[bool] = False
+    """
+    if True, the title and the self prompt are cached in the prompt cache by the content hash.
+    only for the expensive prompters, hashing the content costs more than rendering a plain text.
+    """
+
     def with_children(self, *children: Prompter) -> Self:
         children = list(children)
         if len(children) > 0:
@@ -124,32 +207,68 @@ class Prompter(ABC):
     def get_priority(self) -> int:
         return self.priority
 
-    def get_prompt(self, container: Container, depth: int = 0) -> str:
+    def get_prompt_cache_key(self) -> Optional[str]:
+        """
+        the content hash of the prompter for the prompt cache, None if not cacheable.
+        the self prompt of a cacheable prompter shall be determined by its content and dependencies only.
+        """
+        return None
+
+    def get_prompt_dependencies(self) -> List[str]:
+        """
+        the files that the self prompt depends on, the cached prompt expires once any of them is modified.
+        """
+        return []
+
+    def _render_self(self, container: Container) -> Tuple[str, str]:
+        """
+        :return: (title, self prompt)
+        """
+        key = self.get_prompt_cache_key() if self.__prompt_cacheable__ else None
+        if key is None:
+            return self.get_title(), self.self_prompt(container)
+        cached = prompt_cache.get(key)
+        if cached is not None:
+            return cached
+        versions = prompt_cache.dependency_versions(self.get_prompt_dependencies())
+        title, self_prompt = self.get_title(), self.self_prompt(container)
+        prompt_cache.set(key, versions, title, self_prompt)
+        return title, self_prompt
+
+    def get_prompt(self, container: Container, depth: int = 0, parallel: bool = False) -> str:
         """
         get prompt with container which provides libraries to generate prompt
         :param container:
         :param depth:
+        :param parallel: if True, render the children in parallel by the Pool of the container,
+            sequentially if no Pool is bound. opt-in for the children that are expensive and safe to render
+            in other threads. the children never render their own children in parallel, so a rendering
+            never waits for the pool tasks submitted by another pool task.
         :return:
         """
         if self.__self_prompt__ is not None:
             return self.__self_prompt__
 
-        title = self.get_title()
+        start = time.perf_counter()
+        title, self_prompt = self._render_self(container)
         depth = depth
         if title:
             title = '#' * (depth + 1) + ' ' + title
             depth = depth + 1
 
-        self_prompt = self.self_prompt(container)
         prompts = []
         if self_prompt:
             prompts.append(self_prompt)
 
         if self.__children__ is not None:
-            for child in self.__children__:
-                child_prompt = child.get_prompt(container, depth=depth)
+            if parallel and len(self.__children__) > 1:
+                child_prompts = self._render_children_in_parallel(container, depth)
+            else:
+                child_prompts = [child.get_prompt(container, depth=depth) for child in self.__children__]
+            for child_prompt in child_prompts:
                 if child_prompt:
                     prompts.append(child_prompt)
+        self.__render_time__ = time.perf_counter() - start
         # empty prompts
         if not prompts:
             return ""
@@ -163,14 +282,59 @@ class Prompter(ABC):
             if paragraph:
                 output += "\n\n" + paragraph
         self.__self_prompt__ = output.strip()
+        self.__render_time__ = time.perf_counter() - start
         return self.__self_prompt__
 
+    def _render_children_in_parallel(self, container: Container, depth: int) -> List[str]:
+        """
+        render the children in the pool, the grandchildren are rendered in the same thread of the child.
+        each child is rendered once by whoever claims it first. the caller renders the first child,
+        and the children the pool has not started yet, so it never waits for a busy pool.
+        """
+        children = self.__children__
+        pool = _get_render_pool(container)
+        if pool is None:
+            return [child.get_prompt(container, depth=depth) for child in children]
+        claims = [threading.Lock() for _ in children]
+
+        def render(i: int) -> Optional[str]:
+            if not claims[i].acquire(blocking=False):
+                return None
+            return children[i].get_prompt(container, depth=depth)
+
+        futures: List[Optional[Future]] = [None]
+        for i in range(1, len(children)):
+            futures.append(pool.submit(render, i))
+        results = [render(0)]
+        for i in range(1, len(children)):
+            prompt = render(i)
+            if prompt is None:
+                # claimed by the pool task.
+                prompt = futures[i].result()
+            results.append(prompt)
+        return results
+
+    def get_render_times(self, index: str = "") -> Dict[str, float]:
+        """
+        the seconds of the last rendering of each node, including its children.
+        :return: the index of the node like `0.1.2` => seconds. the node never rendered is absent.
+        """
+        if not index:
+            index = "0"
+        result = {}
+        if self.__render_time__ is not None:
+            result[index] = self.__render_time__
+        for idx, child in enumerate(self.__children__ or []):
+            if not child:
+                continue
+            result.update(child.get_render_times(index + "." + str(idx)))
+        return result
+
     def flatten(self, index: str = "") -> Dict[str, Self]:
         if not index:
             index = "0"
         result = {index: self}
-        idx = 0
-        for child in self.__children__:
+        for idx, child in enumerate(self.__children__ or []):
             if not child:
                 continue
             sub_index = index + "." + str(idx)
@@ -182,6 +346,9 @@ class Prompter(ABC):
 
 class ModelPrompter(BaseModel, Prompter, ABC):
 
+    def get_prompt_cache_key(self) -> Optional[str]:
+        return sha1(generate_import_path(self.__class__) + "\n" + self.model_dump_json())
+
     def __to_entity_meta__(self) -> EntityMeta:
         type_ = generate_import_path(self.__class__)
         ctx_data = self.model_dump(exclude_defaults=True)
@@ -270,6 +437,19 @@ class InspectPrmt(DataPrompter):
         description="Inspect source code of these targets. ",
     )
 
+    __prompt_cacheable__ = True
+
+    def get_prompt_dependencies(self) -> List[str]:
+        files = []
+        for target in self.source_target:
+            try:
+                filename = inspect.getsourcefile(import_from_path(target))
+            except (TypeError, ImportError, AttributeError):
+                filename = None
+            if filename:
+                files.append(filename)
+        return files
+
     def inspect_source(self, target: Union[type, Callable, str]) -> Self:
         if not isinstance(target, str):
             target = generate_import_path(target)
@@ -1,8 +1,9 @@
 import inspect
-from typing import Callable, Optional, Dict
+from typing import Callable, Optional
 from ghostos.container import Container
 from ghostos.prototypes.ghostfunc.driver import (
     GhostFuncDriver, GhostFuncCache, get_ghost_func_cache, save_ghost_func_cache,
+    ghost_func_key, precompile_ghost_func_cache,
 )
 
 __all__ = [
@@ -16,7 +17,6 @@ class GhostFunc:
     def __init__(self, container: Container):
         self._container = container
         self._container.bootstrap()
-        self._caches: Dict[str, GhostFuncCache] = {}
         self._compiled = set()
 
     def decorator(
@@ -25,6 +25,7 @@ class GhostFunc:
             llm_api: str = "",
             saving: bool = True,
             filename: Optional[str] = None,
+            precompile: bool = False,
     ) -> DECORATOR:
         """
         produce a decorator to wrap a function.
@@ -32,6 +33,7 @@ class GhostFunc:
         :param llm_api: the llm api that generating the function body.
         :param saving: if True, the thinking thread will save after each run.
         :param filename: if given, will save cache in the filename while saving is True, otherwise use default filename.
+        :param precompile: if True, compile the cached code to bytecode while decorating, instead of at first call.
         :return: a decorator to wrap function.
         """
 
@@ -41,19 +43,24 @@ class GhostFunc:
             target_modulename = target_module.__name__
             target_qualname = func.__qualname__
             target_filename = filename or target_module.__file__ + '.ghost_func.yml'
+            target_key = ghost_func_key(target_qualname, target_source)
             cache = self._get_cache(target_modulename, target_filename)
-            ghost_driver = GhostFuncDriver(
-                container=self._container,
-                cache=cache,
-                target_module=target_modulename,
-                target_qualname=target_qualname,
-                target_file=target_filename,
-                target_source=target_source,
-                caching=caching,
-                llm_api=llm_api,
-            )
+            if precompile and caching:
+                precompile_ghost_func_cache(cache, [target_key])
 
             def wrapped(*args, **kwargs):
+                # each call has its own driver, the concurrent calls share the cache only.
+                ghost_driver = GhostFuncDriver(
+                    container=self._container,
+                    cache=cache,
+                    target_module=target_modulename,
+                    target_qualname=target_qualname,
+                    target_key=target_key,
+                    target_file=target_filename,
+                    target_source=target_source,
+                    caching=caching,
+                    llm_api=llm_api,
+                )
                 try:
                     result = ghost_driver.execute(list(args), kwargs)
                     # 只有 saving 时才保存.
@@ -67,12 +74,9 @@ class GhostFunc:
 
         return decorator
 
-    def _get_cache(self, modulename: str, filename: str) -> GhostFuncCache:
-        if filename in self._caches:
-            return self._caches[filename]
-        cache = get_ghost_func_cache(modulename, filename)
-        self._caches[filename] = cache
-        return cache
+    @staticmethod
+    def _get_cache(modulename: str, filename: str) -> GhostFuncCache:
+        return get_ghost_func_cache(modulename, filename)
 
     def _save_cache(self, cache: GhostFuncCache):
         save_ghost_func_cache(cache)
@@ -1,7 +1,11 @@
-from typing import Callable, Optional, Dict, List, Any, Tuple
+from typing import Callable, Optional, Dict, List, Any, Tuple, Set, Iterator
+from contextlib import contextmanager
+from hashlib import sha1
 import os
 import yaml
 import importlib
+import tempfile
+import threading
 
 from ghostos.container import Container
 from ghostos.core.runtime import GoThreadInfo, EventTypes, thread_to_prompt
@@ -9,12 +13,23 @@ from ghostos.core.moss import MossRuntime, MossCompiler, PyContext
 from ghostos.core.llms import LLMs, LLMApi
 from ghostos.core.messages import Role, Message
 from ghostos.helpers import yaml_pretty_dump
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
-__all__ = ["GhostFuncDriver", "GhostFuncCache", 'get_ghost_func_cache', 'save_ghost_func_cache']
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+__all__ = [
+    "GhostFuncDriver", "GhostFuncCache", 'get_ghost_func_cache', 'save_ghost_func_cache',
+    'ghost_func_key', 'precompile_ghost_func_cache',
+]
 
 DECORATOR = Callable[[Callable], Callable]
 
+MOSS_EXEC_FILENAME = "<MOSS>"
+"""the filename that moss compiles the executing code with, when the pycontext has no module"""
+
 
 class GhostFuncCache(BaseModel):
     """
@@ -24,38 +39,210 @@ class GhostFuncCache(BaseModel):
     filename: Optional[str] = Field(default=None, description="the filename that decorated function located")
     threads: Dict[str, GoThreadInfo] = Field(
         default_factory=dict,
-        description="a map of function.__qualname__ to thread instance",
+        description="a map of ghost func key (function.__qualname__ with the hash of its source) to thread instance",
     )
+    _updated: Set[str] = PrivateAttr(default_factory=set)
 
+    def get_thread(self, key: str) -> Optional[GoThreadInfo]:
+        return self.threads.get(key, None)
 
-def get_ghost_func_cache(modulename: str, filename: Optional[str] = None) -> GhostFuncCache:
+    def set_thread(self, key: str, thread: GoThreadInfo) -> None:
+        """
+        set the thread of the ghost func, and mark it to be saved.
+        """
+        with _cache_lock(self):
+            self.threads[key] = thread
+            self._updated.add(key)
+
+    def get_generated_code(self, key: str) -> Optional[str]:
+        """
+        :return: the code that has been generated and executed for the ghost func.
+        """
+        thread = self.get_thread(key)
+        if thread is None:
+            return None
+        pycontext = thread.last_turn().pycontext
+        if pycontext.execute_code and pycontext.executed:
+            return pycontext.execute_code
+        return None
+
+
+def ghost_func_key(qualname: str, source: str) -> str:
+    """
+    the key of the ghost func in the cache.
+    the key changes once the definition of the function changes, so the outdated code is never reused.
+    :param qualname: the __qualname__ of the function
+    :param source: the source code of the function definition
     """
-    get ghost func from file or create one
+    return f"{qualname}:{sha1(source.encode('utf-8')).hexdigest()[:12]}"
+
+
+# the ghost func caches loaded in the process, keyed by the absolute filename.
+# concurrent calls share one cache of a file instead of reading the whole file at each call.
+_caches: Dict[str, Tuple[float, GhostFuncCache]] = {}
+_caches_lock = threading.Lock()
+_file_locks: Dict[str, threading.RLock] = {}
+
+
+def _get_file_lock(filename: str) -> threading.RLock:
+    with _caches_lock:
+        lock = _file_locks.get(filename, None)
+        if lock is None:
+            lock = _file_locks[filename] = threading.RLock()
+        return lock
+
+
+@contextmanager
+def _cache_lock(cache: GhostFuncCache) -> Iterator[None]:
+    filename = os.path.abspath(cache.filename) if cache.filename else cache.modulename
+    with _get_file_lock(filename):
+        yield
+
+
+@contextmanager
+def _lock_file(filename: str) -> Iterator[None]:
+    """
+    lock the cache file between the threads, and between the processes if the platform supports.
     """
+    with _get_file_lock(filename):
+        if fcntl is None:
+            yield
+            return
+        lockname = filename + ".lock"
+        while True:
+            f = open(lockname, "a")
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                # the lock file may be removed by the previous holder, while this one is waiting.
+                locked = os.fstat(f.fileno()).st_ino == os.stat(lockname).st_ino
+            except FileNotFoundError:
+                locked = False
+            if locked:
+                break
+            f.close()
+        try:
+            yield
+        finally:
+            # remove the lock file before unlocking, so no lock file is left next to the source files.
+            os.remove(lockname)
+            f.close()
+
+
+def _mtime(filename: str) -> float:
+    try:
+        return os.path.getmtime(filename)
+    except OSError:
+        return 0.0
+
+
+def _read_ghost_func_cache(modulename: str, filename: str) -> GhostFuncCache:
     if not os.path.exists(filename):
         return GhostFuncCache(modulename=modulename, filename=filename)
     with open(filename, "rb") as f:
-        content = f.read()
-        data = yaml.safe_load(content)
-        return GhostFuncCache(**data)
+        data = yaml.safe_load(f.read())
+    if not data:
+        return GhostFuncCache(modulename=modulename, filename=filename)
+    return GhostFuncCache(**data)
+
+
+def get_ghost_func_cache(modulename: str, filename: Optional[str] = None) -> GhostFuncCache:
+    """
+    get ghost func from file or create one.
+    the cache is shared in the process, and reloaded only when the file is changed by others.
+    """
+    if filename is None:
+        return GhostFuncCache(modulename=modulename, filename=filename)
+    abspath = os.path.abspath(filename)
+    with _get_file_lock(abspath):
+        mtime = _mtime(abspath)
+        loaded = _caches.get(abspath, None)
+        if loaded is not None and (loaded[0] == mtime or loaded[1]._updated):
+            # the unsaved cache is merged with the file while saving.
+            return loaded[1]
+        cache = _read_ghost_func_cache(modulename, filename)
+        if loaded is not None:
+            # keep the instance shared by the drivers.
+            loaded[1].threads = cache.threads
+            cache = loaded[1]
+        _caches[abspath] = (mtime, cache)
+        return cache
+
+
+def _drop_outdated_threads(cache: GhostFuncCache, updated: Set[str]) -> None:
+    """
+    drop the threads replaced by the updated ones of the same functions:
+    the threads generated for the former source, and the thread of the early versions keyed by the bare qualname,
+    which is migrated to the versioned key by the driver.
+    the bare qualname threads of the other functions are kept until they are migrated.
+    """
+    qualnames = {key.rsplit(":", 1)[0] for key in updated if ":" in key}
+    for key in list(cache.threads.keys()):
+        if key in updated:
+            continue
+        if key.rsplit(":", 1)[0] in qualnames:
+            del cache.threads[key]
 
 
 def save_ghost_func_cache(cache: GhostFuncCache, importer: Optional[Callable] = None) -> None:
     """
     save ghost func cache to file.
     if filename not given, filename would be the module.__file__ - '.py' + 'ghost_funcs.yml'
+    the file is locked and merged with the threads saved by the others, then replaced atomically.
     """
     filename = cache.filename
     if filename is None:
         importer = importer if importer else importlib.import_module
         module = importer(cache.modulename)
         filename = module.__file__
-        filename.replace(".py", ".ghost_funcs.yml")
+        filename = filename.replace(".py", ".ghost_funcs.yml")
         cache.filename = filename
 
-    content = yaml_pretty_dump(cache.model_dump(exclude_defaults=True))
-    with open(filename, 'wb') as f:
-        f.write(content.encode('utf-8'))
+    abspath = os.path.abspath(filename)
+    with _lock_file(abspath):
+        updated = set(cache._updated)
+        if not updated and os.path.exists(abspath):
+            return
+        mtime = _mtime(abspath)
+        loaded = _caches.get(abspath, None)
+        if loaded is None or loaded[1] is not cache or loaded[0] != mtime:
+            # the file is changed by the others since loaded, only the updated threads overwrite it.
+            saved = _read_ghost_func_cache(cache.modulename, abspath)
+            for key in updated:
+                saved.threads[key] = cache.threads[key]
+            cache.threads = saved.threads
+        _drop_outdated_threads(cache, updated)
+
+        content = yaml_pretty_dump(cache.model_dump(exclude_defaults=True))
+        directory = os.path.dirname(abspath)
+        fd, tmp = tempfile.mkstemp(prefix=".ghost_func.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content.encode('utf-8'))
+            os.replace(tmp, abspath)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        cache._updated.difference_update(updated)
+        _caches[abspath] = (_mtime(abspath), cache)
+
+
+def precompile_ghost_func_cache(cache: GhostFuncCache, keys: Optional[List[str]] = None) -> int:
+    """
+    compile the generated code in the cache to bytecode ahead, so the first call skips compiling.
+    :param cache: the ghost func cache
+    :param keys: the ghost func keys to compile, default is all.
+    :return: number of the compiled code.
+    """
+    from ghostos.core.moss.impl import moss_exec_cache
+    keys = keys if keys is not None else list(cache.threads.keys())
+    count = 0
+    for key in keys:
+        code = cache.get_generated_code(key)
+        if code:
+            moss_exec_cache.get_code(MOSS_EXEC_FILENAME, code)
+            count += 1
+    return count
 
 
 DEFAULT_GHOST_FUNCTION_PROMPT = """
@@ -109,6 +296,7 @@ class GhostFuncDriver:
             target_file: str,
             target_source: str,
             target_qualname: str,
+            target_key: Optional[str] = None,
             caching: bool = True,
             llm_api: str = "",
             max_turns: int = 10,
@@ -119,6 +307,7 @@ class GhostFuncDriver:
         self._target_file = target_file
         self._target_qualname = target_qualname
         self._target_source = target_source
+        self._target_key = target_key or ghost_func_key(target_qualname, target_source)
         self._caching = caching
         self._cache = cache
         self._max_turns = max_turns
@@ -126,8 +315,16 @@ class GhostFuncDriver:
     def execute(self, args: List[Any], kwargs: Dict[str, Any]) -> Any:
         thread = None
         if self._caching:
-            thread = self._cache.threads.get(self._target_qualname, None)
-        if thread is None:
+            thread = self._cache.get_thread(self._target_key)
+            if thread is None:
+                thread = self._cache.get_thread(self._target_qualname)
+                if thread is not None:
+                    # the thread saved by the early versions is keyed by the bare qualname, migrate it.
+                    self._cache.set_thread(self._target_key, thread)
+        if thread is not None:
+            # the cached thread is shared by the concurrent calls, run on a copy of it.
+            thread = thread.model_copy(deep=True)
+        else:
             thread = self._init_thread()
         return self._run(thread, args, kwargs)
 
@@ -143,9 +340,11 @@ class GhostFuncDriver:
         pycontext = thread.last_turn().pycontext
         generated = pycontext.execute_code
         if self._caching and generated and pycontext.executed:
-            thread, result = self._start_with_generated_code(generated, thread, pycontext, args, kwargs)
-        else:
-            thread, result = self._think(thread, args, kwargs)
+            result, ok = self._run_code(generated, thread, pycontext, args, kwargs)
+            if ok:
+                # nothing new to save.
+                return result
+        thread, result = self._think(thread, args, kwargs)
         # save thread at last.
         self._save_thread(thread)
         return result
@@ -191,19 +390,6 @@ class GhostFuncDriver:
         llms = self._container.force_fetch(LLMs)
         return llms.get_api(self._llm_api)
 
-    def _start_with_generated_code(
-            self,
-            generated: str,
-            thread: GoThreadInfo,
-            pycontext: PyContext,
-            args: List[Any],
-            kwargs: Dict[str, Any],
-    ) -> Tuple[GoThreadInfo, Any]:
-        result, ok = self._run_code(generated, thread, pycontext, args, kwargs)
-        if ok:
-            return thread, result
-        return self._think(thread, args, kwargs)
-
     def _think(self, thread: GoThreadInfo, args: List[Any], kwargs: Dict[str, Any]) -> Tuple[GoThreadInfo, Any]:
         turns = 0
         while True:
@@ -288,7 +474,7 @@ class GhostFuncDriver:
         return splits[0], True
 
     def _save_thread(self, thread: GoThreadInfo) -> None:
-        self._cache.threads[self._target_qualname] = thread
+        self._cache.set_thread(self._target_key, thread)
 
     def destroy(self) -> None:
         if hasattr(self, '_cache'):
@@ -21,6 +21,7 @@ from ghostos.core.messages import new_basic_connection
 from ghostos.core.aifunc import (
     AIFunc,
     AIFuncExecutor,
+    AIFuncRepository,
     get_aifunc_result_type,
     ExecFrame, ExecStep,
 )
@@ -122,6 +123,28 @@ def render_aifunc_execute_stream(route: AIFuncDetailRoute, fn: Type[AIFunc]):
     st.write(f"executed in {round(timeleft.passed(), 2)} seconds")
 
 
+def render_saved_exec_frames(fn: Type[AIFunc]):
+    repo = get_container().get(AIFuncRepository)
+    if repo is None:
+        return
+    func_name = generate_import_path(fn)
+    frame_ids = repo.list_exec_frames(func_name)
+    if not frame_ids:
+        st.info(_("No saved executions"))
+        return
+    frame_id = st.selectbox(_("Saved Executions"), frame_ids)
+    if not frame_id:
+        return
+    # only the direct sub frames are loaded with steps, the deeper ones are expanded on click.
+    frame = repo.load_exec_frame(func_name, frame_id, depth=1)
+    if frame is None:
+        st.error(f"execution {frame_id} not found")
+        return
+    render_aifunc_executed_frame_head(frame)
+    render_aifunc_frame_tail(frame)
+    render_aifunc_frame_stack(frame)
+
+
 def render_aifunc_frame_tail(frame: ExecFrame):
     if not frame:
         return
@@ -151,6 +174,12 @@ def render_aifunc_frame_stack(frame: ExecFrame):
         mapping = flatten_exec_frame_tree(frame)
         selected_item = mapping.get(selected, None)
         if isinstance(selected_item, ExecFrame):
+            if not selected_item.steps:
+                # the saved sub frame is not loaded yet.
+                repo = get_container().get(AIFuncRepository)
+                if repo is not None:
+                    loaded = repo.load_exec_frame(selected_item.func_name(), selected_item.frame_id, depth=1)
+                    selected_item = loaded or selected_item
             open_exec_frame_dialog(selected_item)
         elif isinstance(selected_item, ExecStep):
             open_exec_step_dialog(selected_item)
@@ -223,7 +252,7 @@ def main():
     # render header
     render_header(fn)
 
-    tab_exec, tab_source = st.tabs([_("Execute AIFuncs"), _("Source Code")])
+    tab_exec, tab_saved, tab_source = st.tabs([_("Execute AIFuncs"), _("Saved Executions"), _("Source Code")])
     with tab_exec:
         if not route.executed:
             render_aifunc_execute_stream(route, fn)
@@ -244,5 +273,8 @@ def main():
                 route.bind(st.session_state)
                 st.rerun()
 
+    with tab_saved:
+        render_saved_exec_frames(fn)
+
     with tab_source:
         render_source(route, fn)
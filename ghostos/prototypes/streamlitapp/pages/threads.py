@@ -22,7 +22,18 @@ def show_thread():
     thread = threads.get_thread(thread_id, create=False)
     if not thread:
         filename = os.path.abspath(thread_id)
-        if os.path.exists(filename):
+        suffix = ".thread.yml"
+        if os.path.exists(filename) and filename.endswith(suffix):
+            # the thread file may save the pycontext compactly, read it by the storage threads.
+            from ghostos.framework.threads import GoThreadsByStorage
+            from ghostos.framework.storage import FileStorageImpl
+            from ghostos.contracts.logger import LoggerItf
+            file_threads = GoThreadsByStorage(
+                storage=FileStorageImpl(os.path.dirname(filename)),
+                logger=container.force_fetch(LoggerItf),
+            )
+            thread = file_threads.get_thread(os.path.basename(filename)[:-len(suffix)], create=False)
+        elif os.path.exists(filename):
             with open(filename, "rb") as f:
                 content = f.read()
                 data = yaml.safe_load(content)
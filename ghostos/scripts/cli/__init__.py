@@ -62,6 +62,24 @@ def start_console_app(python_file_or_module: str):
     run_console_app(python_file_or_module)
 
 
+@main.command("moss-test")
+@click.argument("directory")
+@click.option("--src", "-s", default=".", show_default=True,
+              help="the python path root of the directory, module names are relative to it")
+@click.option("--processes", "-p", default=0, show_default=True,
+              help="run each test case in a worker process of the pool, 0 means in the current process")
+@click.option("--junit", default="", help="save the junit xml report to the file")
+@click.option("--json", "json_file", default="", help="save the json timing report to the file")
+def run_moss_tests(directory: str, src: str, processes: int, junit: str, json_file: str):
+    """
+    run the `__moss_test_cases__` of the moss modules in the directory
+    """
+    from ghostos.scripts.cli.run_moss_tests import run_moss_tests_in_directory
+    ok = run_moss_tests_in_directory(directory, src, processes=processes, junit=junit, json_file=json_file)
+    if not ok:
+        sys.exit(1)
+
+
 @main.command("config")
 def start_web_config():
     """
@@ -0,0 +1,81 @@
+from typing import List
+from os import path, walk
+from ghostos.core.moss import moss_test_suite, MossTestSuite, MossTestReport
+from rich.console import Console
+from rich.table import Table
+import sys
+
+__all__ = ['find_moss_test_modules', 'run_moss_tests_in_directory']
+
+
+def find_moss_test_modules(directory: str, src: str) -> List[str]:
+    """
+    find the modules that define `__moss_test_cases__` in the directory.
+    :param directory: the directory of the moss modules
+    :param src: the python path root, the module names are relative to it
+    """
+    directory = path.abspath(directory)
+    src = path.abspath(src)
+    modules = []
+    for root, dirs, files in walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
+        for filename in sorted(files):
+            if not filename.endswith(".py"):
+                continue
+            filepath = path.join(root, filename)
+            with open(filepath, "r", encoding="utf-8") as f:
+                if MossTestSuite.MAGIC_TEST_CASES_ATTR_NAME not in f.read():
+                    continue
+            relative = path.relpath(filepath, src)[:-len(".py")]
+            parts = relative.split(path.sep)
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            modules.append(".".join(parts))
+    return sorted(modules)
+
+
+def run_moss_tests_in_directory(
+        directory: str,
+        src: str = ".",
+        *,
+        processes: int = 0,
+        junit: str = "",
+        json_file: str = "",
+) -> bool:
+    """
+    run the moss test cases in the directory, print the timing report.
+    :return: all the test cases passed
+    """
+    sys.path.append(path.abspath(src))
+    modules = find_moss_test_modules(directory, src)
+    console = Console()
+    if not modules:
+        console.print(f"no moss test modules found in {directory}")
+        return True
+
+    suite = moss_test_suite()
+    report = suite.run_tests(modules, processes=processes)
+    print_report(console, report)
+    if junit:
+        with open(junit, "w") as f:
+            f.write(report.to_junit_xml())
+    if json_file:
+        with open(json_file, "w") as f:
+            f.write(report.to_json())
+    return len(report.failures()) == 0
+
+
+def print_report(console: Console, report: MossTestReport) -> None:
+    table = Table(title=f"moss tests in {report.total_time:.2f}s")
+    for column in ["module", "case", "result", "compile", "prompt", "exec"]:
+        table.add_column(column)
+    for result in report.results:
+        table.add_row(
+            result.modulename,
+            result.name,
+            "passed" if result.passed else f"failed: {result.error}",
+            f"{result.compile_time:.4f}",
+            f"{result.prompt_time:.4f}",
+            f"{result.exec_time:.4f}",
+        )
+    console.print(table)
@@ -0,0 +1,139 @@
+import time
+import logging
+from typing import Optional, List, Tuple, Union
+from ghostos.abcd import LLMThought, ParallelAction, Operator
+from ghostos.contracts.pool import DefaultPool
+from ghostos.core.llms import LLMFunc, Prompt
+from ghostos.core.messages import FunctionCaller, MessageKind
+
+
+class SleepAction(ParallelAction):
+
+    def name(self) -> str:
+        return "sleep"
+
+    def as_function(self) -> Optional[LLMFunc]:
+        return None
+
+    def update_prompt(self, prompt: Prompt) -> Prompt:
+        return prompt
+
+    def execute(self, session, caller: FunctionCaller) -> Tuple[List[MessageKind], Union[Operator, None]]:
+        seconds = float(caller.arguments)
+        time.sleep(seconds)
+        return [caller.new_output(caller.arguments)], None
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.logger = logging.getLogger("test")
+        self.outputs = []
+
+    def respond(self, messages):
+        self.outputs.extend(messages)
+
+
+def test_llm_thought_run_parallel_in_order():
+    thought = LLMThought(actions=[SleepAction()], parallel=True, parallel_timeout=1)
+    session = FakeSession()
+    pool = DefaultPool(4)
+    callers = [
+        FunctionCaller(id="a", name="sleep", arguments="0.2"),
+        FunctionCaller(id="b", name="sleep", arguments="0.1"),
+        FunctionCaller(id="c", name="sleep", arguments="0.0"),
+    ]
+    start = time.time()
+    op = thought._run_parallel(session, pool, callers)
+    assert op is None
+    assert time.time() - start < 0.3
+    assert [o.call_id for o in session.outputs] == ["a", "b", "c"]
+    pool.shutdown()
+
+
+def test_llm_thought_run_parallel_timeout():
+    thought = LLMThought(actions=[SleepAction()], parallel=True, parallel_timeout=0.1)
+    session = FakeSession()
+    pool = DefaultPool(4)
+    callers = [
+        FunctionCaller(id="a", name="sleep", arguments="0.5"),
+        FunctionCaller(id="b", name="sleep", arguments="0.0"),
+    ]
+    thought._run_parallel(session, pool, callers)
+    assert "timeout" in session.outputs[0].content
+    assert session.outputs[1].content == "0.0"
+    pool.shutdown()
+
+
+def test_llm_thought_run_parallel_timeout_counts_from_start():
+    thought = LLMThought(actions=[SleepAction()], parallel=True, parallel_timeout=0.3)
+    session = FakeSession()
+    # the second call waits for the only worker.
+    pool = DefaultPool(1)
+    callers = [
+        FunctionCaller(id="a", name="sleep", arguments="0.2"),
+        FunctionCaller(id="b", name="sleep", arguments="0.2"),
+    ]
+    thought._run_parallel(session, pool, callers)
+    assert [o.content for o in session.outputs] == ["0.2", "0.2"]
+    pool.shutdown()
+
+
+LLM_ITEMS = object()
+
+
+class FakeLLMApi:
+    def deliver_chat_completion(self, prompt, stream: bool):
+        return LLM_ITEMS
+
+
+class FakeLLMs:
+    def get_api(self, api_name: str):
+        return FakeLLMApi()
+
+
+class FakeUpstream:
+    def completes_only(self) -> bool:
+        return True
+
+
+class FakeThinkSession(FakeSession):
+
+    def __init__(self, callers: List[FunctionCaller], pool: DefaultPool):
+        from ghostos.container import Container
+        from ghostos.contracts.pool import Pool
+        from ghostos.core.llms import LLMs
+        super().__init__()
+        self.callers = callers
+        self.upstream = FakeUpstream()
+        self.container = Container()
+        self.container.set(Pool, pool)
+        self.container.set(LLMs, FakeLLMs())
+        self.container.bootstrap()
+
+    def respond(self, messages, stage: str = ""):
+        if messages is LLM_ITEMS:
+            return [], self.callers
+        self.outputs.extend(messages)
+        return messages, []
+
+
+def test_llm_thought_think_runs_parallel_calls():
+    pool = DefaultPool(4)
+    callers = [
+        FunctionCaller(id="a", name="sleep", arguments="0.5"),
+        FunctionCaller(id="b", name="sleep", arguments="0.1"),
+        FunctionCaller(id="c", name="sleep", arguments="0.0"),
+    ]
+    session = FakeThinkSession(callers, pool)
+    thought = LLMThought(actions=[SleepAction()], parallel=True, parallel_timeout=0.3)
+    start = time.time()
+    prompt, op = thought.think(session, Prompt())
+    assert op is None
+    # returns at the timeout, instead of waiting for the slow call.
+    assert time.time() - start < 0.5
+    assert [o.call_id for o in session.outputs] == ["a", "b", "c"]
+    assert "timeout" in session.outputs[0].content
+    # the timed-out call keeps running in the pool, and its outputs are discarded.
+    pool.shutdown(wait=True)
+    assert len(session.outputs) == 3
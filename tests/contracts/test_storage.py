@@ -0,0 +1,28 @@
+import time
+from ghostos.contracts.storage import LRUFileStore
+from ghostos.framework.storage import FileStorageImpl
+
+
+def test_lru_file_store_evicts_least_recently_used(tmp_path):
+    storage = FileStorageImpl(str(tmp_path))
+    storage.put("other.txt", b"x" * 100)
+    store = LRUFileStore(storage, ".lru.json", max_bytes=25)
+    store.put("a", b"a" * 10)
+    time.sleep(0.01)
+    store.put("b", b"b" * 10)
+    time.sleep(0.01)
+    # read a, so b is the least recently used one.
+    assert store.get("a") == b"a" * 10
+    time.sleep(0.01)
+    store.put("c", b"c" * 10)
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.get("c") is not None
+    # the files without the suffix are ignored.
+    assert storage.exists("other.txt")
+
+    # the index is rebuilt from the files.
+    store = LRUFileStore(storage, ".lru.json", max_bytes=25)
+    store.clear()
+    assert store.get("a") is None
+    assert storage.exists("other.txt")
@@ -0,0 +1,94 @@
+from typing import Optional, Tuple, Any
+from ghostos.container import Container
+from ghostos.core.aifunc import (
+    AIFunc, AIFuncResult, AIFuncDriver, AIFuncExecutor, ExecFrame, ExecStep,
+    DefaultAIFuncExecutorImpl, AIFuncResultCache, AIFuncResultCacheByStorage,
+)
+from ghostos.core.runtime import GoThreadInfo
+from ghostos.core.messages import Stream
+from ghostos.framework.storage import FileStorageImpl
+import time
+
+
+class CountingDriver(AIFuncDriver):
+    thinks = 0
+
+    def initialize(self, container: Container, frame: ExecFrame) -> GoThreadInfo:
+        return GoThreadInfo.new(None)
+
+    def think(
+            self,
+            manager: AIFuncExecutor,
+            thread: GoThreadInfo,
+            step: ExecStep,
+            upstream: Optional[Stream],
+    ) -> Tuple[GoThreadInfo, Optional[Any], bool]:
+        CountingDriver.thinks += 1
+        return thread, UpperResult(text=self.aifunc.text.upper()), True
+
+    def on_save(self, container: Container, frame: ExecFrame, step: ExecStep, thread: GoThreadInfo) -> None:
+        pass
+
+
+class Upper(AIFunc):
+    text: str = ""
+
+    __aifunc_driver__ = CountingDriver
+    __aifunc_memoize__ = True
+
+
+class UpperResult(AIFuncResult):
+    text: str = ""
+
+
+class NotMemoized(Upper):
+    __aifunc_memoize__ = False
+
+
+class NotMemoizedResult(UpperResult):
+    pass
+
+
+def test_aifunc_result_memoized(tmp_path):
+    CountingDriver.thinks = 0
+    container = Container()
+    cache = AIFuncResultCacheByStorage(FileStorageImpl(str(tmp_path)))
+    container.set(AIFuncResultCache, cache)
+    executor = DefaultAIFuncExecutorImpl(container=container)
+
+    r1 = executor.execute(Upper(text="hello"))
+    assert r1.text == "HELLO"
+    frame = ExecFrame.from_func(Upper(text="hello"))
+    r2 = executor.execute(Upper(text="hello"), frame)
+    assert r2.text == "HELLO"
+    assert frame.cached
+    assert CountingDriver.thinks == 1
+
+    executor.execute(Upper(text="world"))
+    assert CountingDriver.thinks == 2
+    # persisted in the storage
+    another = AIFuncResultCacheByStorage(FileStorageImpl(str(tmp_path)))
+    assert another.get(Upper(text="world")).text == "WORLD"
+
+    # opt-in only
+    executor.execute(NotMemoized(text="hello"))
+    executor.execute(NotMemoized(text="hello"))
+    assert CountingDriver.thinks == 4
+
+    cache.clear()
+    assert cache.get(Upper(text="hello")) is None
+
+
+def test_aifunc_result_cache_ttl_and_eviction(tmp_path):
+    cache = AIFuncResultCacheByStorage(FileStorageImpl(str(tmp_path)), ttl=0.05)
+    cache.save(Upper(text="a"), UpperResult(text="A"))
+    assert cache.get(Upper(text="a")).text == "A"
+    time.sleep(0.06)
+    assert cache.get(Upper(text="a")) is None
+
+    cache = AIFuncResultCacheByStorage(FileStorageImpl(str(tmp_path)), ttl=0, max_bytes=500)
+    for i in range(10):
+        cache.save(Upper(text=str(i)), UpperResult(text=str(i)))
+    assert cache.get(Upper(text="9")) is not None
+    assert cache.get(Upper(text="0")) is None
+    assert len(list(tmp_path.iterdir())) < 10
@@ -6,6 +6,14 @@ from ghostos.framework.workspaces import BasicWorkspace
 from ghostos.framework.storage import MemStorage
 from ghostos.container import Container
 from ghostos.demo import aifuncs_demo
+from typing import Optional, Tuple, Any
+from ghostos.core.aifunc import (
+    AIFunc, AIFuncResult, AIFuncDriver, AIFuncExecutor, ExecFrame, ExecStep,
+    AIFuncRepoByConfigs, DefaultAIFuncExecutorImpl,
+)
+from ghostos.core.runtime import GoThreadInfo
+from ghostos.core.messages import Stream, Role
+from ghostos.framework.storage import FileStorageImpl
 
 
 def test_aifunc_repository():
@@ -24,3 +32,81 @@ def test_aifunc_repository():
     assert len(result) > 1
 
 
+
+
+class StepDriver(AIFuncDriver):
+    steps = 0
+
+    def initialize(self, container: Container, frame: ExecFrame) -> GoThreadInfo:
+        return GoThreadInfo.new(None)
+
+    def think(
+            self,
+            manager: AIFuncExecutor,
+            thread: GoThreadInfo,
+            step: ExecStep,
+            upstream: Optional[Stream],
+    ) -> Tuple[GoThreadInfo, Optional[Any], bool]:
+        self.steps += 1
+        step.generate = Role.ASSISTANT.new(content=f"step {self.steps}")
+        if self.aifunc.children:
+            # the same as the AIFuncCtx injected to the moss code of the step.
+            ctx = manager.sub_executor(step).context()
+            ctx.parallel_run({str(i): Counting(steps=1) for i in range(self.aifunc.children)})
+        if self.steps < self.aifunc.steps:
+            return thread, None, False
+        return thread, CountingResult(steps=self.steps), True
+
+    def on_save(self, container: Container, frame: ExecFrame, step: ExecStep, thread: GoThreadInfo) -> None:
+        container.force_fetch(AIFuncRepository).save_exec_frame(frame)
+
+
+class Counting(AIFunc):
+    steps: int = 1
+    children: int = 0
+    __aifunc_driver__ = StepDriver
+
+
+class CountingResult(AIFuncResult):
+    steps: int = 0
+
+
+def test_aifunc_repository_save_frames_incrementally(tmp_path):
+    for compress in (False, True):
+        configs = MemoryConfigs({AIFuncsConf.conf_path(): "{}"})
+        storage = FileStorageImpl(str(tmp_path / str(compress)))
+        repo = AIFuncRepoByConfigs(configs.get(AIFuncsConf), configs, DefaultModules(), storage, compress)
+        container = Container()
+        container.set(AIFuncRepository, repo)
+        executor = DefaultAIFuncExecutorImpl(container=container, max_step=0)
+
+        frame = ExecFrame.from_func(Counting(steps=3, children=2))
+        executor.execute(frame.get_args(), frame)
+
+        frame_ids = repo.list_exec_frames(frame.func_name())
+        # the root frame and two sub frames of each step
+        assert len(frame_ids) == 1 + 3 * 2
+        ext = ".jsonl.gz" if compress else ".jsonl"
+        assert storage.exists(f"{frame.func_name()}/{frame.frame_id}{ext}")
+
+        loaded = repo.load_exec_frame(frame.func_name(), frame.frame_id)
+        assert loaded.get_result().steps == 3
+        assert [s.step_id for s in loaded.steps] == [s.step_id for s in frame.steps]
+        assert loaded.steps[0].generate.content == "step 1"
+        assert len(loaded.steps[0].frames) == 2
+        assert loaded.steps[0].frames[0].get_result().steps == 1
+        assert loaded.duration() > 0
+
+        # saving again appends nothing.
+        repo.save_exec_frame(frame)
+        assert len(repo.load_exec_frame(frame.func_name(), frame.frame_id).steps) == 3
+
+        # the sub frames beyond the depth only have the head.
+        shallow = repo.load_exec_frame(frame.func_name(), frame.frame_id, depth=0)
+        assert len(shallow.steps[0].frames) == 2
+        head = shallow.steps[0].frames[0]
+        assert head.frame_id == frame.steps[0].frames[0].frame_id
+        assert head.steps == []
+        assert head.get_args() == frame.steps[0].frames[0].get_args()
+        expanded = repo.load_exec_frame(head.func_name(), head.frame_id, depth=0)
+        assert expanded.get_result().steps == 1
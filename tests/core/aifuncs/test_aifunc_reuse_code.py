@@ -0,0 +1,154 @@
+from typing import Iterable
+from ghostos.container import Container
+from ghostos.core.aifunc import (
+    AIFunc, AIFuncResult, ExecFrame, AIFuncCodeStore, AIFuncCodeStoreByStorage,
+    DefaultAIFuncExecutorImpl,
+)
+from ghostos.core.llms import LLMs, LLMApi, LLMDriver, ServiceConf, ModelConf, Prompt, LLMsConfig
+from ghostos.core.messages import Message, Role
+from ghostos.core.moss import moss_container
+from ghostos.framework.llms import LLMsImpl
+from ghostos.framework.storage import MemStorage
+import gc
+
+
+class Add(AIFunc):
+    a: int = 0
+    b: int = 0
+
+    __aifunc_reuse_code__ = True
+
+
+class AddResult(AIFuncResult):
+    total: int = 0
+
+
+class CodeApi(LLMApi):
+    code = "def main(moss, fn):\n    return AddResult(total=fn.a + fn.b), True"
+
+    def __init__(self, service: ServiceConf, model: ModelConf):
+        self.service = service
+        self.model = model
+        self.calls = 0
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    def get_service(self) -> ServiceConf:
+        return self.service
+
+    def get_model(self) -> ModelConf:
+        return self.model
+
+    def parse_prompt(self, prompt: Prompt) -> Prompt:
+        return prompt
+
+    def text_completion(self, prompt: str) -> str:
+        return prompt
+
+    def chat_completion(self, prompt: Prompt) -> Message:
+        self.calls += 1
+        return Role.ASSISTANT.new(content=f"<code>\n{self.code}\n</code>")
+
+    def chat_completion_chunks(self, prompt: Prompt) -> Iterable[Message]:
+        yield self.chat_completion(prompt)
+
+    def reasoning_completion(self, prompt: Prompt) -> Iterable[Message]:
+        yield self.chat_completion(prompt)
+
+    def reasoning_completion_stream(self, prompt: Prompt) -> Iterable[Message]:
+        yield self.chat_completion(prompt)
+
+    def _parse_delivering_items(self, prompt: Prompt, stream: bool, items: Iterable[Message]) -> Iterable[Message]:
+        return items
+
+
+class ObserveFirstApi(CodeApi):
+    observe_code = "def main(moss, fn):\n    print(fn.a)\n    return None, False"
+
+    def chat_completion(self, prompt: Prompt) -> Message:
+        if self.calls == 0:
+            self.calls += 1
+            return Role.ASSISTANT.new(content=f"<code>\n{self.observe_code}\n</code>")
+        return super().chat_completion(prompt)
+
+
+class CodeDriver(LLMDriver):
+
+    def __init__(self, api_type=CodeApi):
+        self.apis = []
+        self.api_type = api_type
+
+    def driver_name(self) -> str:
+        return "fake"
+
+    def new(self, service: ServiceConf, model: ModelConf, api_name: str = "") -> LLMApi:
+        api = self.api_type(service, model)
+        self.apis.append(api)
+        return api
+
+    def calls(self) -> int:
+        return sum(api.calls for api in self.apis)
+
+
+def new_executor(store: AIFuncCodeStore, driver: CodeDriver) -> DefaultAIFuncExecutorImpl:
+    container = Container(parent=moss_container())
+    conf = LLMsConfig(
+        services=[ServiceConf(name="fake", base_url="", driver="fake")],
+        default="fake",
+        models={"fake": ModelConf(model="fake", service="fake")},
+    )
+    container.set(LLMs, LLMsImpl(conf=conf, default_driver=driver))
+    container.set(AIFuncCodeStore, store)
+    return DefaultAIFuncExecutorImpl(container=container)
+
+
+def teardown_module():
+    # the moss runtimes and their containers are in reference cycles,
+    # collect them for the tests that count the container instances.
+    gc.collect()
+
+
+def test_aifunc_reuse_succeeded_code():
+    store = AIFuncCodeStoreByStorage(MemStorage())
+    driver = CodeDriver()
+    executor = new_executor(store, driver)
+
+    assert executor.execute(Add(a=1, b=2)).total == 3
+    assert driver.calls() == 1
+    assert store.get_code(Add) == CodeApi.code
+
+    # the new request runs the stored code, without calling the llm.
+    frame = ExecFrame.from_func(Add(a=3, b=4))
+    assert executor.execute(frame.get_args(), frame).total == 7
+    assert driver.calls() == 1
+    assert CodeApi.code in frame.steps[0].generate.content
+
+
+def test_aifunc_stored_code_fallback_to_llm():
+    store = AIFuncCodeStoreByStorage(MemStorage())
+    store.save_code(Add, "def main(moss, fn):\n    raise ValueError('broken')")
+    driver = CodeDriver()
+    executor = new_executor(store, driver)
+
+    frame = ExecFrame.from_func(Add(a=1, b=1))
+    assert executor.execute(frame.get_args(), frame).total == 2
+    assert driver.calls() == 1
+    assert "broken" in frame.steps[0].messages[0].content
+    # replaced by the code succeeded.
+    assert store.get_code(Add) == CodeApi.code
+
+
+def test_aifunc_failed_stored_code_discarded():
+    store = AIFuncCodeStoreByStorage(MemStorage())
+    store.save_code(Add, "def main(moss, fn):\n    raise ValueError('broken')")
+    # the llm observes before finishing, the code is not reusable and not saved.
+    driver = CodeDriver(ObserveFirstApi)
+    executor = new_executor(store, driver)
+
+    frame = ExecFrame.from_func(Add(a=1, b=1))
+    assert executor.execute(frame.get_args(), frame).total == 2
+    assert driver.calls() == 2
+    # the failed code is not run again by the next request.
+    assert store.get_code(Add) is None
@@ -0,0 +1,97 @@
+from typing import Optional, Tuple, Any
+from ghostos.container import Container
+from ghostos.contracts.pool import Pool, DefaultPool
+from ghostos.core.aifunc import (
+    AIFunc, AIFuncResult, AIFuncDriver, AIFuncExecutor, ExecFrame, ExecStep,
+    DefaultAIFuncExecutorImpl, AIFuncParallelism,
+)
+from ghostos.core.runtime import GoThreadInfo
+from ghostos.core.messages import Stream
+import pytest
+import time
+
+
+class ConcatDriver(AIFuncDriver):
+
+    def initialize(self, container: Container, frame: ExecFrame) -> GoThreadInfo:
+        return GoThreadInfo.new(None)
+
+    def think(
+            self,
+            manager: AIFuncExecutor,
+            thread: GoThreadInfo,
+            step: ExecStep,
+            upstream: Optional[Stream],
+    ) -> Tuple[GoThreadInfo, Optional[Any], bool]:
+        time.sleep(self.aifunc.duration)
+        return thread, ConcatResult(text=self.aifunc.text), True
+
+    def on_save(self, container: Container, frame: ExecFrame, step: ExecStep, thread: GoThreadInfo) -> None:
+        pass
+
+
+class Concat(AIFunc):
+    text: str = ""
+    duration: float = 0.05
+
+    __aifunc_driver__ = ConcatDriver
+
+
+class ConcatResult(AIFuncResult):
+    text: str = ""
+
+
+def new_executor() -> Tuple[DefaultAIFuncExecutorImpl, ExecStep]:
+    container = Container()
+    container.set(Pool, DefaultPool(4))
+    step = ExecFrame.from_func(Concat()).new_step()
+    executor = DefaultAIFuncExecutorImpl(
+        container=container,
+        step=step,
+        parallelism=AIFuncParallelism(4),
+    )
+    return executor, step
+
+
+def test_dag_run_with_inputs():
+    executor, step = new_executor()
+    start = time.time()
+    results = executor.dag_run(
+        {
+            "a": Concat(text="a", duration=0.1),
+            "b": Concat(text="b", duration=0.05),
+            "c": lambda a, b: Concat(text=a.text + b.text, duration=0.05),
+            "d": lambda c: Concat(text=c.text + "d", duration=0.01),
+            "e": lambda b: Concat(text=b.text + "e", duration=0.01),
+        },
+        depends={"c": ["a", "b"], "d": ["c"], "e": ["b"]},
+    )
+    wall_time = time.time() - start
+    assert {key: r.text for key, r in results.items()} == {"a": "a", "b": "b", "c": "ab", "d": "abd", "e": "be"}
+    assert executor.get("d").text == "abd"
+    # a, b run in parallel.
+    assert wall_time < 0.1 + 0.05 + 0.05 + 0.01 + 0.05
+
+    assert len(step.dag_runs) == 1
+    dag = step.dag_runs[0]
+    assert dag.critical_path == ["a", "c", "d"]
+    assert dag.critical_path_time >= 0.16
+    assert set(dag.frames.keys()) == {"a", "b", "c", "d", "e"}
+    frame_ids = {frame.frame_id for frame in step.frames}
+    assert set(dag.frames.values()) == frame_ids
+    for frame in step.frames:
+        assert frame.duration() > 0
+
+    data = step.model_dump()
+    assert ExecStep(**data).dag_runs[0].critical_path == ["a", "c", "d"]
+
+
+def test_dag_run_invalid_dependencies():
+    executor, _ = new_executor()
+    with pytest.raises(ValueError):
+        executor.dag_run({"a": Concat()}, depends={"a": ["b"]})
+    with pytest.raises(ValueError):
+        executor.dag_run(
+            {"a": lambda b: Concat(), "b": lambda a: Concat()},
+            depends={"a": ["b"], "b": ["a"]},
+        )
@@ -0,0 +1,148 @@
+from typing import Optional, Tuple, Any, Dict
+from threading import Lock, Event
+from ghostos.container import Container
+from ghostos.contracts.pool import Pool, DefaultPool
+from ghostos.core.aifunc import (
+    AIFunc, AIFuncResult, AIFuncDriver, AIFuncExecutor, ExecFrame, ExecStep,
+    DefaultAIFuncExecutorImpl, AIFuncParallelism, AIFuncCanceledError,
+)
+from ghostos.core.runtime import GoThreadInfo
+from ghostos.core.messages import Stream
+import pytest
+import time
+
+
+class Counter:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.finished = 0
+        self._lock = Lock()
+
+    def enter(self):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+    def exit(self):
+        with self._lock:
+            self.running -= 1
+            self.finished += 1
+
+
+counter = Counter()
+
+
+class FakeDriver(AIFuncDriver):
+    steps = 0
+
+    def initialize(self, container: Container, frame: ExecFrame) -> GoThreadInfo:
+        return GoThreadInfo.new(None)
+
+    def think(
+            self,
+            manager: AIFuncExecutor,
+            thread: GoThreadInfo,
+            step: ExecStep,
+            upstream: Optional[Stream],
+    ) -> Tuple[GoThreadInfo, Optional[Any], bool]:
+        fn = self.aifunc
+        self.steps += 1
+        if fn.fanout > 0:
+            children = {f"child_{i}": Sleep(duration=fn.duration, depth=fn.depth) for i in range(fn.fanout)}
+            manager.context().parallel_run(children)
+        counter.enter()
+        try:
+            time.sleep(fn.duration)
+            if fn.fail:
+                raise ValueError("failed")
+        finally:
+            counter.exit()
+        # keep thinking for the slow siblings, so they can be canceled between the steps.
+        if fn.steps > self.steps:
+            return thread, None, False
+        return thread, SleepResult(depth=fn.depth), True
+
+    def on_save(self, container: Container, frame: ExecFrame, step: ExecStep, thread: GoThreadInfo) -> None:
+        pass
+
+
+class Sleep(AIFunc):
+    duration: float = 0.05
+    depth: int = 0
+    fanout: int = 0
+    fail: bool = False
+    steps: int = 1
+
+    __aifunc_driver__ = FakeDriver
+
+
+class SleepResult(AIFuncResult):
+    depth: int = 0
+
+
+def new_executor(max_concurrency: int, pool_size: int) -> DefaultAIFuncExecutorImpl:
+    container = Container()
+    container.set(Pool, DefaultPool(pool_size))
+    return DefaultAIFuncExecutorImpl(
+        container=container,
+        parallelism=AIFuncParallelism(max_concurrency),
+        max_step=0,
+    )
+
+
+def setup_function():
+    global counter
+    counter = Counter()
+
+
+def test_parallel_run_is_bounded():
+    executor = new_executor(max_concurrency=2, pool_size=10)
+    results = executor.parallel_run({f"fn_{i}": Sleep() for i in range(6)})
+    assert len(results) == 6
+    assert counter.finished == 6
+    # two in the pool and the caller itself.
+    assert counter.max_running <= 3
+    assert executor.get("fn_0") is results["fn_0"]
+
+
+def test_nested_parallel_run_not_deadlock_on_small_pool():
+    # every parent blocks a pool worker while waiting for its children.
+    executor = new_executor(max_concurrency=4, pool_size=2)
+    fn_dict = {f"parent_{i}": Sleep(fanout=3, depth=1, duration=0.01) for i in range(3)}
+    results: Dict[str, AIFuncResult] = executor.parallel_run(fn_dict)
+    assert len(results) == 3
+    # 3 parents and 9 children
+    assert counter.finished == 12
+
+
+def test_parallel_run_cancel_siblings_on_failure():
+    executor = new_executor(max_concurrency=4, pool_size=4)
+    fn_dict = {f"slow_{i}": Sleep(duration=0.05, steps=100) for i in range(3)}
+    fn_dict["fail"] = Sleep(duration=0.01, fail=True)
+    start = time.time()
+    with pytest.raises(ValueError):
+        executor.parallel_run(fn_dict)
+    # the slow siblings stop at the next step, instead of thinking for 100 steps.
+    assert time.time() - start < 1
+    assert counter.running == 0
+
+
+def test_parallelism_steal_not_started_tasks():
+    parallelism = AIFuncParallelism(4)
+    pool = DefaultPool(1)
+    blocker = pool.submit(time.sleep, 0.2)
+    start = time.time()
+    results = parallelism.run_all(pool, {str(i): (lambda v=i: v) for i in range(3)}, Event())
+    assert results == {"0": 0, "1": 1, "2": 2}
+    assert time.time() - start < 0.2
+    blocker.result()
+    pool.shutdown()
+
+
+def test_parallelism_canceled_error():
+    parallelism = AIFuncParallelism(2)
+    cancel = Event()
+    cancel.set()
+    with pytest.raises(AIFuncCanceledError):
+        parallelism.run_all(parallelism.default_pool(), {"a": lambda: 1}, cancel)
@@ -0,0 +1,72 @@
+from ghostos.core.llms import Prompt, TokenBudgetPipe, get_tokenizer, count_messages_tokens
+from ghostos.core.llms.tokenizer import HeuristicTokenizer
+from ghostos.core.messages import Role, MessageType
+from ghostos.core.runtime import GoThreadInfo, thread_to_prompt
+from ghostos.core.runtime.events import EventTypes
+
+
+def test_heuristic_tokenizer():
+    tokenizer = HeuristicTokenizer()
+    assert tokenizer.count_text("") == 0
+    assert tokenizer.count_text("abcd") == 1
+    assert tokenizer.count_text("abcde") == 2
+    assert tokenizer.count_text("你好") == 2
+
+
+def test_get_tokenizer_fallback():
+    tokenizer = get_tokenizer("not_exists_encoding")
+    assert tokenizer.count_text("hello world") > 0
+    assert get_tokenizer("not_exists_encoding") is tokenizer
+
+
+def test_message_tokens_cached():
+    tokenizer = HeuristicTokenizer()
+    message = Role.USER.new(content="hello world")
+    count = tokenizer.count_message(message)
+    assert count == tokenizer.count_message(message)
+    message.content = "hello world" * 10
+    assert tokenizer.count_message(message) > count
+
+
+def test_token_budget_pipe_drop_oldest():
+    history = [Role.USER.new(content=f"message {i} " * 20) for i in range(10)]
+    prompt = Prompt(
+        system=[Role.SYSTEM.new(content="you are a helpful assistant")],
+        history=history,
+        inputs=[Role.USER.new(content="hello")],
+    )
+    total = count_messages_tokens(prompt.get_messages())
+    budget = total // 2
+    prompt = TokenBudgetPipe(budget).update_prompt(prompt)
+    assert count_messages_tokens(prompt.get_messages()) <= budget
+    assert prompt.history[0].role == Role.SYSTEM.value
+    assert prompt.history[-1].msg_id == history[-1].msg_id
+    assert len(prompt.inputs) == 1
+
+
+def test_token_budget_pipe_keep_prompt_in_budget():
+    history = [Role.USER.new(content="hello")]
+    prompt = Prompt(history=history)
+    prompt = TokenBudgetPipe(10000).update_prompt(prompt)
+    assert prompt.history == history
+
+
+def test_token_budget_pipe_drop_orphan_function_outputs():
+    caller = Role.ASSISTANT.new(content="a" * 400)
+    output = MessageType.FUNCTION_OUTPUT.new(content="output", role=Role.ASSISTANT.value)
+    last = Role.USER.new(content="hello")
+    prompt = Prompt(history=[caller, output, last])
+    tokenizer = get_tokenizer()
+    budget = tokenizer.count_message(output) + tokenizer.count_message(last) + 20
+    prompt = TokenBudgetPipe(budget, notice=False).update_prompt(prompt)
+    assert [m.msg_id for m in prompt.history] == [last.msg_id]
+
+
+def test_thread_to_prompt_with_max_tokens():
+    thread = GoThreadInfo()
+    for i in range(10):
+        event = EventTypes.INPUT.new(task_id="task", messages=[Role.USER.new(content=f"turn {i} " * 20)])
+        thread.new_turn(event)
+    prompt = thread_to_prompt("prompt_id", [], thread, max_tokens=200)
+    assert count_messages_tokens(prompt.get_messages()) <= 200
+    assert len(prompt.inputs) == 1
@@ -319,3 +319,11 @@ def test_receiver_buffers_with_stages():
         buffer = buffer.next()
         assert buffer is not None
         assert buffer.tail().stage == ""
+
+
+def test_receiver_cancel_stops_stream_alive():
+    stream, retriever = new_basic_connection(timeout=5, idle=0.01)
+    assert stream.alive()
+    retriever.cancel()
+    assert not stream.alive()
+    retriever.close()
@@ -0,0 +1,60 @@
+from ghostos.core.moss import moss_container, PyContext
+from ghostos.core.moss.abcd import MossCompiler
+from ghostos.core.moss.impl import MossCompileCache, moss_compile_cache, moss_exec_cache
+from ghostos.core.moss.examples import baseline
+
+
+def test_compile_cache_reuse_code():
+    cache = MossCompileCache()
+    code = cache.get_code("__test__", "a = 1")
+    assert cache.get_code("__test__", "a = 1") is code
+    assert cache.get_code("__test__", "a = 2") is not code
+    assert cache.get_code("__other__", "a = 1") is not code
+
+
+def test_compile_cache_bounded():
+    cache = MossCompileCache(max_size=2)
+    first = cache.get_code("__test__", "a = 1")
+    cache.get_code("__test__", "a = 2")
+    cache.get_code("__test__", "a = 3")
+    assert cache.get_code("__test__", "a = 1") is not first
+
+
+def test_compile_cache_origin_attrs():
+    cache = MossCompileCache()
+    attrs = cache.get_origin_attrs(baseline, lambda m: {"foo": 1})
+    assert cache.get_origin_attrs(baseline, lambda m: {"foo": 2}) is attrs
+    assert cache.get_source(baseline) == cache.get_source(baseline)
+
+
+def test_moss_compiler_with_cache():
+    container = moss_container()
+    modules = []
+    for i in range(2):
+        compiler = container.force_fetch(MossCompiler)
+        compiler.join_context(PyContext(module=baseline.__name__))
+        runtime = compiler.compile("__test__")
+        modules.append(runtime.module())
+        # each compile has its own module
+        assert runtime.module().__dict__["plus"] is baseline.plus
+        source = runtime.prompter().pycontext_code(exclude_hide_code=False)
+        runtime.close()
+    assert modules[0] is not modules[1]
+    code = moss_compile_cache.get_code("__test__", source)
+    assert code is moss_compile_cache.get_code("__test__", source)
+    container.shutdown()
+
+
+def test_moss_exec_code_not_in_compile_cache():
+    container = moss_container()
+    compiler = container.force_fetch(MossCompiler)
+    compiler.join_context(PyContext(module=baseline.__name__))
+    runtime = compiler.compile("__test__")
+    code = "def main():\n    return 'exec cache'"
+    with runtime:
+        assert runtime.execute(code=code, target="main").returns == "exec cache"
+    compiled = moss_exec_cache.get_code(baseline.__name__, code)
+    assert moss_exec_cache.get_code(baseline.__name__, code) is compiled
+    # the one-off code does not evict the compiled modules.
+    assert moss_compile_cache.get_code(baseline.__name__, code) is not compiled
+    container.shutdown()
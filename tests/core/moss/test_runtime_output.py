@@ -0,0 +1,27 @@
+from ghostos.core.moss import moss_container, PyContext
+from ghostos.core.moss.abcd import MossCompiler
+from ghostos.core.moss.examples import baseline
+
+
+def test_moss_runtime_std_output_streaming():
+    container = moss_container()
+    compiler = container.force_fetch(MossCompiler)
+    compiler.join_context(PyContext(module=baseline.__name__))
+    with compiler.compile("__test__") as runtime:
+        chunks = []
+        runtime.stream_std_output(chunks.append)
+        result = runtime.execute(target="main", code="def main():\n    print('hello')", args=[])
+        runtime.stream_std_output(None)
+        assert result.std_output == "hello\n"
+        assert "".join(chunks) == "hello\n"
+
+
+def test_moss_runtime_std_output_per_execution():
+    container = moss_container()
+    compiler = container.force_fetch(MossCompiler)
+    compiler.join_context(PyContext(module=baseline.__name__))
+    with compiler.compile("__test__") as runtime:
+        result = runtime.execute(target="main", code="def main():\n    print('first')", args=[])
+        assert result.std_output == "first\n"
+        result = runtime.execute(target="main", code="def main():\n    print('second')", args=[])
+        assert result.std_output == "second\n"
@@ -0,0 +1,56 @@
+import pytest
+from ghostos.core.moss import MossSandboxPool, PyContext
+
+
+def test_moss_sandbox_execute_and_timeout():
+    sandbox = MossSandboxPool(1, timeout=5)
+    pycontext = PyContext(module="ghostos.demo.agents.ghostos_meta")
+    try:
+        code = "def run(moss):\n    print('hello')\n    return 1 + 1"
+        result = sandbox.execute(pycontext, target="run", code=code, local_args=["moss"])
+        assert result.returns == 2
+        assert "hello" in result.std_output
+        assert result.pycontext.execute_code == code
+
+        with pytest.raises(TimeoutError):
+            sandbox.execute(pycontext, target="run", code="def run(moss):\n    while True:\n        pass",
+                            local_args=["moss"], timeout=0.5)
+
+        # the workers are restarted after timeout
+        result = sandbox.execute(pycontext, target="run", code="def run(moss):\n    return 3", local_args=["moss"])
+        assert result.returns == 3
+    finally:
+        sandbox.close()
+
+
+def test_moss_sandbox_timeout_only_kills_the_runaway_worker():
+    from concurrent.futures import ThreadPoolExecutor
+    sandbox = MossSandboxPool(2, timeout=10)
+    pycontext = PyContext(module="ghostos.demo.agents.ghostos_meta")
+    slow = "def run(moss):\n    import time\n    time.sleep(1.5)\n    return 'slow'"
+    runaway = "def run(moss):\n    while True:\n        pass"
+    try:
+        with ThreadPoolExecutor(2) as executor:
+            slow_future = executor.submit(sandbox.execute, pycontext, target="run", code=slow, local_args=["moss"])
+            runaway_future = executor.submit(
+                sandbox.execute, pycontext, target="run", code=runaway, local_args=["moss"], timeout=0.5,
+            )
+            with pytest.raises(TimeoutError):
+                runaway_future.result()
+            # the other execution is not affected.
+            assert slow_future.result().returns == "slow"
+    finally:
+        sandbox.close()
+
+
+def test_moss_sandbox_close_fails_running_executions():
+    from threading import Timer
+    sandbox = MossSandboxPool(1)
+    pycontext = PyContext(module="ghostos.demo.agents.ghostos_meta")
+    runaway = "def run(moss):\n    while True:\n        pass"
+    Timer(1.0, sandbox.close).start()
+    with pytest.raises(RuntimeError):
+        # never timeout, but the closed sandbox fails it.
+        sandbox.execute(pycontext, target="run", code=runaway, local_args=["moss"], timeout=0)
+    with pytest.raises(RuntimeError):
+        sandbox.execute(pycontext, target="run", code="def run(moss):\n    return 1", local_args=["moss"])
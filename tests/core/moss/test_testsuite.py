@@ -0,0 +1,28 @@
+from ghostos.core.moss import moss_test_suite
+
+MODULE = "ghostos.core.moss.examples.test_suite"
+
+
+def test_moss_test_suite_run_tests():
+    suite = moss_test_suite()
+    report = suite.run_tests([MODULE])
+    assert [r.name for r in report.results] == ["test_1", "test_2", "test_3"]
+    assert [r.returns for r in report.results] == ["1", "2", "3"]
+    assert len(report.failures()) == 0
+    assert "testcase" in report.to_junit_xml()
+    assert "compile_time" in report.to_json()
+
+
+def test_moss_test_suite_run_tests_in_processes():
+    suite = moss_test_suite()
+    report = suite.run_tests([MODULE], processes=2)
+    assert [r.returns for r in report.results] == ["1", "2", "3"]
+
+
+def test_find_moss_test_modules():
+    from os.path import dirname
+    from ghostos.scripts.cli.run_moss_tests import find_moss_test_modules
+    import ghostos
+    src = dirname(dirname(ghostos.__file__))
+    modules = find_moss_test_modules(dirname(__import__(MODULE, fromlist=["x"]).__file__), src)
+    assert MODULE in modules
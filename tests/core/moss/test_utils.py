@@ -211,3 +211,28 @@ def test_parse_doc_string():
     for c in cases:
         assert parse_doc_string(c.doc, inline=c.inline) == c.expect.strip()
 
+
+
+def test_reflection_cache():
+    from ghostos.core.moss.utils import ReflectionCache
+    from ghostos.core.moss.examples import baseline
+    cache = ReflectionCache(max_size=2)
+    calls = []
+
+    def reflect():
+        calls.append(1)
+        return "prompt"
+
+    assert cache.get("test", baseline.plus, reflect) == "prompt"
+    assert cache.get("test", baseline.plus, reflect) == "prompt"
+    assert len(calls) == 1
+    assert cache.get("test", baseline.plus, reflect, "alias") == "prompt"
+    assert len(calls) == 2
+
+    # local values are never cached
+    def local_fn():
+        pass
+
+    cache.get("test", local_fn, reflect)
+    cache.get("test", local_fn, reflect)
+    assert len(calls) == 4
@@ -0,0 +1,80 @@
+from typing import List
+from threading import Lock
+import pytest
+from ghostos.errors import SessionError
+from ghostos.container import Container
+from ghostos.core.runtime import GoThreads, GoThreadInfo
+from ghostos.core.messages import Message, MessageKindParser, Role
+from ghostos.framework.messengers import DefaultMessenger
+from ghostos.framework.logger import FakeLogger
+from ghostos.framework.ghostos.session_impl import SessionImpl
+
+
+class FakeThreads:
+
+    def __init__(self):
+        self.saved: List[GoThreadInfo] = []
+
+    def save_thread(self, thread: GoThreadInfo) -> None:
+        self.saved.append(thread.model_copy(deep=True))
+
+
+class FakeRespondSession:
+    """
+    only the members that SessionImpl.respond depends on.
+    """
+    respond = SessionImpl.respond
+    _until_not_alive = SessionImpl._until_not_alive
+    _save_thread_on_stop = SessionImpl._save_thread_on_stop
+    _validate_alive = SessionImpl._validate_alive
+
+    def __init__(self):
+        self.container = Container(name="fake_session")
+        self.threads = FakeThreads()
+        self.container.set(GoThreads, self.threads)
+        self.logger = FakeLogger()
+        self.thread = GoThreadInfo.new(None)
+        self._message_parser = MessageKindParser(None, role=Role.ASSISTANT.value)
+        self._respond_lock = Lock()
+        self._destroyed = False
+        self.is_alive = True
+
+    def alive(self) -> bool:
+        return self.is_alive
+
+    def messenger(self, stage: str = "") -> DefaultMessenger:
+        return DefaultMessenger(None, stage=stage)
+
+
+def test_session_respond_canceled_saves_partial_output():
+    session = FakeRespondSession()
+    closed = []
+
+    def source():
+        try:
+            yield Role.ASSISTANT.new(content="hello")
+            # the upstream is canceled while streaming.
+            session.is_alive = False
+            yield Role.ASSISTANT.new(content="world")
+            yield Role.ASSISTANT.new(content="never")
+        finally:
+            closed.append(True)
+
+    with pytest.raises(SessionError):
+        session.respond(source())
+
+    # the llm stream is closed.
+    assert closed == [True]
+    added = session.thread.last_turn().added
+    assert [m.content for m in added] == ["hello"]
+    # the partial output is persisted.
+    assert len(session.threads.saved) == 1
+    assert [m.content for m in session.threads.saved[0].last_turn().added] == ["hello"]
+
+
+def test_session_respond_alive_returns_messages():
+    session = FakeRespondSession()
+    messages, callers = session.respond([Role.ASSISTANT.new(content="hello")])
+    assert [m.content for m in messages] == ["hello"]
+    assert callers == []
+    assert session.threads.saved == []
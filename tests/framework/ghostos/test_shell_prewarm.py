@@ -0,0 +1,40 @@
+from ghostos.container import Container
+from ghostos.contracts.storage import Storage
+from ghostos.contracts.logger import LoggerItf
+from ghostos.contracts.modules import DefaultModulesProvider
+from ghostos.core.moss import DefaultMOSSProvider
+from ghostos.core.runtime import GoProcess
+from ghostos.framework.storage import MemStorage
+from ghostos.framework.logger import FakeLogger
+from ghostos.framework.eventbuses import MemEventBusImplProvider
+from ghostos.framework.tasks import StorageTasksImplProvider
+from ghostos.framework.ghostos.shell_impl import ShellImpl, ShellConf
+
+
+def _prepare_container() -> Container:
+    container = Container()
+    container.set(Storage, MemStorage())
+    container.set(LoggerItf, FakeLogger())
+    container.register(MemEventBusImplProvider())
+    container.register(StorageTasksImplProvider())
+    container.register(DefaultMOSSProvider())
+    container.register(DefaultModulesProvider())
+    container.bootstrap()
+    return container
+
+
+def test_shell_prewarm_on_startup():
+    conf = ShellConf(
+        pool_size=4,
+        prewarm_ghosts=["ghostos.demo.agents.ghostos_meta:__ghost__"],
+        prewarm_modules=["ghostos.core.moss.examples.test_suite", "not_exists_module"],
+    )
+    shell = ShellImpl(conf, _prepare_container(), GoProcess.new(shell_id="test"), [])
+    try:
+        status = shell.prewarm_status(timeout=10)
+        # the ghost module is compiled, but no llms is bound in the container.
+        assert "LLMs" in status["ghost:ghostos.demo.agents.ghostos_meta:__ghost__"]
+        assert status["module:ghostos.core.moss.examples.test_suite"] == "ready"
+        assert status["module:not_exists_module"].startswith("failed")
+    finally:
+        shell.close()
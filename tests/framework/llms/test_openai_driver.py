@@ -0,0 +1,76 @@
+from typing import Optional, List
+from ghostos.core.llms import ServiceConf, ModelConf, Prompt, PromptStorage
+from ghostos.core.messages import Message, Role, DefaultOpenAIMessageParser
+from ghostos.framework.llms.openai_driver import OpenAIAdapter
+from ghostos.framework.logger import FakeLogger
+
+
+class FakePromptStorage(PromptStorage):
+
+    def __init__(self):
+        self.saved: List[Prompt] = []
+
+    def save(self, prompt: Prompt) -> None:
+        self.saved.append(prompt)
+
+    def get(self, prompt_id: str) -> Optional[Prompt]:
+        for prompt in self.saved:
+            if prompt.id == prompt_id:
+                return prompt
+        return None
+
+
+class FakeChunks:
+
+    def __init__(self, count: int):
+        self.count = count
+        self.closed = False
+
+    def __iter__(self):
+        for i in range(self.count):
+            if self.closed:
+                return
+            yield i
+
+    def close(self):
+        self.closed = True
+
+
+def new_adapter(storage: PromptStorage, chunks: FakeChunks) -> OpenAIAdapter:
+    service = ServiceConf(name="fake", base_url="http://localhost", token="fake")
+    model = ModelConf(model="fake", service="fake")
+    adapter = OpenAIAdapter(service, model, DefaultOpenAIMessageParser(None, None), storage, FakeLogger())
+    adapter._chat_completion = lambda prompt, stream: chunks
+    adapter._from_openai_chat_completion_chunks = lambda items: (
+        Message.new_chunk(content=str(i)) for i in items
+    )
+    return adapter
+
+
+def test_openai_chat_completion_chunks_closed_by_consumer():
+    storage = FakePromptStorage()
+    chunks = FakeChunks(10)
+    adapter = new_adapter(storage, chunks)
+    prompt = Prompt(history=[Role.USER.new(content="hello")])
+
+    items = adapter.chat_completion_chunks(prompt)
+    first = next(iter(items))
+    assert first.content == "0"
+    # the consumer cancels the streaming.
+    items.close()
+
+    assert chunks.closed
+    assert len(storage.saved) == 1
+    assert storage.saved[0].error == "canceled after 1 chunks"
+
+
+def test_openai_chat_completion_chunks_consumed():
+    storage = FakePromptStorage()
+    chunks = FakeChunks(3)
+    adapter = new_adapter(storage, chunks)
+    prompt = Prompt(history=[Role.USER.new(content="hello")])
+
+    items = list(adapter.chat_completion_chunks(prompt))
+    assert len(items) == 3
+    assert len(storage.saved) == 1
+    assert storage.saved[0].error is None
@@ -16,3 +16,108 @@ def test_prompt_storage_baseline():
     assert got.inputs == prompt.inputs
     assert got.id == prompt.id
     assert got == prompt
+
+
+def test_prompt_storage_dedup_and_retention():
+    storage = MemStorage()
+    prompts = PromptStorageImpl(storage, dedup=True, max_prompts=2)
+
+    saved = []
+    for i in range(3):
+        prompt = Prompt(system=[Message.new_tail(content="system prompt")])
+        prompt.inputs.append(Message.new_tail(content=f"hello {i}"))
+        prompts.save(prompt)
+        saved.append(prompt)
+
+    assert prompts.get(saved[0].id) is None
+    got = prompts.get(saved[2].id)
+    assert got == saved[2]
+    blobs = [filename for filename in storage.dir("", True) if filename.startswith("blobs/")]
+    assert len(blobs) == 1
+
+
+def test_prompt_storage_retention_counts_existing_files(tmp_path):
+    import os
+    import time
+    from ghostos.framework.storage import FileStorageImpl
+    storage = FileStorageImpl(str(tmp_path))
+    # saved by an earlier run.
+    previous = PromptStorageImpl(storage)
+    old = []
+    for i in range(2):
+        prompt = Prompt()
+        prompt.inputs.append(Message.new_tail(content=f"old {i}"))
+        previous.save(prompt)
+        # make the order of the mtime stable.
+        filename = os.path.join(str(tmp_path), f"{prompt.id}.prompt.yml")
+        os.utime(filename, (time.time() - 100 + i, time.time() - 100 + i))
+        old.append(prompt)
+
+    prompts = PromptStorageImpl(storage, max_prompts=2)
+    prompt = Prompt()
+    prompt.inputs.append(Message.new_tail(content="new"))
+    prompts.save(prompt)
+    assert prompts.get(old[0].id) is None
+    assert prompts.get(old[1].id) is not None
+    assert prompts.get(prompt.id) is not None
+
+
+def test_prompt_storage_expired_blobs_removed():
+    storage = MemStorage()
+    prompts = PromptStorageImpl(storage, dedup=True, max_prompts=2)
+
+    def blobs():
+        return [filename for filename in storage.dir("", True) if filename.startswith("blobs/")]
+
+    for i in range(2):
+        prompt = Prompt(system=[Message.new_tail(content="shared")])
+        prompts.save(prompt)
+    prompt = Prompt(system=[Message.new_tail(content="first")])
+    prompts.save(prompt)
+    assert len(blobs()) == 2
+    # the blob of "shared" is removed once no retained prompt refers to it.
+    for i in range(2):
+        prompts.save(Prompt(system=[Message.new_tail(content="second")]))
+    assert len(blobs()) == 1
+
+
+def test_prompt_storage_concurrent_save():
+    from threading import Thread
+    storage = MemStorage()
+    prompts = PromptStorageImpl(storage, dedup=True, max_prompts=3)
+
+    def run(i: int):
+        for j in range(20):
+            prompts.save(Prompt(system=[Message.new_tail(content=f"system {i} {j % 2}")]))
+
+    threads = [Thread(target=run, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    files = storage.dir("", True)
+    assert len([f for f in files if f.endswith(".prompt.yml")]) == 3
+    assert len([f for f in files if f.startswith("blobs/")]) <= 3
+
+
+def test_write_behind_prompt_storage_sampling():
+    from ghostos.framework.llms import WriteBehindPromptStorage
+    inner = PromptStorageImpl(MemStorage())
+    prompts = WriteBehindPromptStorage(inner, sampling="all", sample_every=2)
+    saved = [Prompt() for _ in range(4)]
+    failed = Prompt(error="failed")
+    for prompt in saved:
+        prompts.save(prompt)
+    prompts.save(failed)
+    prompts.flush()
+    assert inner.get(saved[0].id) is None
+    assert inner.get(saved[1].id) == saved[1]
+    assert inner.get(failed.id) == failed
+    prompts.close()
+
+    prompts = WriteBehindPromptStorage(inner, sampling="errors")
+    prompt = Prompt()
+    prompts.save(prompt)
+    prompts.flush()
+    assert prompts.get(prompt.id) is None
+    prompts.close()
@@ -0,0 +1,130 @@
+from typing import Iterable
+import pytest
+from ghostos.core.llms import LLMApi, LLMDriver, ServiceConf, ModelConf, Prompt
+from ghostos.core.messages import Message, Role
+from ghostos.framework.llms import ReplayLLMDriver, FileLLMRecordStore, PromptStorageImpl
+from ghostos.framework.storage import MemStorage
+from ghostos.framework.storage import FileStorageImpl
+
+
+class FakeApi(LLMApi):
+
+    def __init__(self, service: ServiceConf, model: ModelConf):
+        self.service = service
+        self.model = model
+        self.calls = 0
+        self.parsed = 0
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    def get_service(self) -> ServiceConf:
+        return self.service
+
+    def get_model(self) -> ModelConf:
+        return self.model
+
+    def parse_prompt(self, prompt: Prompt) -> Prompt:
+        if prompt.is_parsed_by(self):
+            return prompt
+        self.parsed += 1
+        prompt = prompt.model_copy(deep=True)
+        prompt.mark_parsed(self)
+        return prompt
+
+    def text_completion(self, prompt: str) -> str:
+        return prompt
+
+    def chat_completion(self, prompt: Prompt) -> Message:
+        self.parse_prompt(prompt)
+        self.calls += 1
+        return Role.ASSISTANT.new(content="hello")
+
+    def chat_completion_chunks(self, prompt: Prompt) -> Iterable[Message]:
+        self.calls += 1
+        head = Message.new_head(content="hel")
+        yield head
+        yield Message.new_chunk(content="lo", msg_id=head.msg_id)
+        yield Role.ASSISTANT.new(content="hello")
+
+    def reasoning_completion(self, prompt: Prompt) -> Iterable[Message]:
+        yield self.chat_completion(prompt)
+
+    def reasoning_completion_stream(self, prompt: Prompt) -> Iterable[Message]:
+        yield from self.chat_completion_chunks(prompt)
+
+    def _parse_delivering_items(self, prompt: Prompt, stream: bool, items: Iterable[Message]) -> Iterable[Message]:
+        return items
+
+
+class FakeDriver(LLMDriver):
+
+    def __init__(self):
+        self.apis = []
+
+    def driver_name(self) -> str:
+        return "fake"
+
+    def new(self, service: ServiceConf, model: ModelConf, api_name: str = "") -> LLMApi:
+        api = FakeApi(service, model)
+        self.apis.append(api)
+        return api
+
+
+def new_api(tmp_path, mode: str, max_bytes: int = 1024 * 1024, prompt_storage=None):
+    driver = FakeDriver()
+    store = FileLLMRecordStore(FileStorageImpl(str(tmp_path)), max_bytes)
+    replay = ReplayLLMDriver(driver, store, mode, prompt_storage=prompt_storage)
+    api = replay.new(ServiceConf(name="fake", base_url=""), ModelConf(model="fake", service="fake"))
+    return api, driver.apis[0]
+
+
+def new_prompt(content: str = "hi") -> Prompt:
+    return Prompt(inputs=[Role.USER.new(content=content)])
+
+
+def test_replay_chat_completion_chunks(tmp_path):
+    api, fake = new_api(tmp_path, "auto")
+    recorded = list(api.chat_completion_chunks(new_prompt()))
+    assert fake.calls == 1
+    # message ids of the prompt are ignored by the cache key
+    replayed = list(api.chat_completion_chunks(new_prompt()))
+    assert fake.calls == 1
+    assert [m.content for m in replayed] == [m.content for m in recorded]
+
+    list(api.chat_completion_chunks(new_prompt("other")))
+    assert fake.calls == 2
+
+
+def test_replay_mode_only(tmp_path):
+    api, fake = new_api(tmp_path, "record")
+    assert api.chat_completion(new_prompt()).content == "hello"
+    api, fake = new_api(tmp_path, "replay")
+    assert api.chat_completion(new_prompt()).content == "hello"
+    assert fake.calls == 0
+    with pytest.raises(LookupError):
+        api.chat_completion(new_prompt("missing"))
+
+
+def test_record_store_eviction(tmp_path):
+    api, fake = new_api(tmp_path, "auto", max_bytes=1000)
+    for i in range(10):
+        api.chat_completion(new_prompt(f"prompt {i}"))
+    assert 0 < len(list(tmp_path.iterdir())) < 10
+
+
+def test_replay_parse_prompt_once_and_save_replayed(tmp_path):
+    prompts = PromptStorageImpl(MemStorage())
+    api, fake = new_api(tmp_path, "auto", prompt_storage=prompts)
+    api.chat_completion(new_prompt())
+    # the real api sends the prompt parsed by the replay api.
+    assert fake.calls == 1
+    assert fake.parsed == 1
+
+    prompt = new_prompt()
+    assert api.chat_completion(prompt).content == "hello"
+    assert fake.calls == 1
+    saved = prompts.get(prompt.id)
+    assert saved is not None
+    assert [m.content for m in saved.added] == ["hello"]
@@ -33,3 +33,74 @@ def test_threads_baseline():
     assert fork.id != got.id
     assert fork.root_id == got.id
     assert fork.parent_id == got.id
+
+
+def test_threads_compact_pycontext():
+    from ghostos.framework.threads import GoThreadsByStorage
+    storage = MemStorage()
+    threads = GoThreadsByStorage(storage=storage, logger=FakeLogger(), compact=True)
+    code = "def foo():\n    return 1\n" * 100
+    saved = []
+    for _ in range(2):
+        thread = GoThreadInfo()
+        pycontext = PyContext(module=PyContext.__module__, code=code)
+        for i in range(5):
+            pycontext = pycontext.model_copy(deep=True)
+            pycontext.set_prop(f"prop_{i}", i)
+            if i == 3:
+                del pycontext.properties["prop_0"]
+            pycontext.execute_code = f"print({i})"
+            thread.new_turn(None, pycontext=pycontext)
+            thread.append(Message.new_tail(content=f"hello {i}"))
+        threads.save_thread(thread)
+        saved.append(thread)
+
+    for thread in saved:
+        got = threads.get_thread(thread.id)
+        assert got == thread
+        assert got.get_pycontext().get_prop("prop_4") == 4
+        assert got.get_pycontext().get_prop("prop_0") is None
+
+    content = storage.get(saved[0].id + ".thread.yml").decode()
+    assert code not in content
+    blobs = [filename for filename in storage.dir("", True) if filename.startswith("blobs/")]
+    assert len(blobs) == 1
+
+
+def test_threads_compact_blobs_removed(tmp_path):
+    from ghostos.framework.threads import GoThreadsByStorage
+    from ghostos.framework.storage import FileStorageImpl
+    storage = FileStorageImpl(str(tmp_path))
+    threads = GoThreadsByStorage(storage=storage, logger=FakeLogger(), compact=True)
+    thread = GoThreadInfo()
+    thread.new_turn(None, pycontext=PyContext(module=PyContext.__module__, code="a = 1"))
+    threads.save_thread(thread)
+    # the runtime files are cleared, the blob is written again.
+    for blob in (tmp_path / "blobs").iterdir():
+        blob.unlink()
+    threads.save_thread(thread)
+    assert threads.get_thread(thread.id) == thread
+
+    # the code changed, the former blob is no longer referenced.
+    thread.new_turn(None, pycontext=PyContext(module=PyContext.__module__, code="a = 2"))
+    threads.save_thread(thread)
+    other = GoThreadInfo()
+    other.new_turn(None, pycontext=PyContext(module=PyContext.__module__, code="b = 1"))
+    threads.save_thread(other)
+    storage.remove(other.id + ".thread.yml")
+    assert len(list((tmp_path / "blobs").iterdir())) == 3
+    # the new blobs are kept.
+    assert threads.remove_unreferenced_blobs() == 0
+    assert threads.remove_unreferenced_blobs(min_age=0) == 1
+    assert threads.get_thread(thread.id) == thread
+
+
+def test_threads_not_compact_by_default():
+    storage = MemStorage()
+    container = _prepare_container()
+    container.set(Storage, storage)
+    threads = container.force_fetch(GoThreads)
+    thread = GoThreadInfo()
+    thread.new_turn(None, pycontext=PyContext(module=PyContext.__module__, code="a = 1"))
+    threads.save_thread(thread)
+    assert not [filename for filename in storage.dir("", True) if filename.startswith("blobs/")]
@@ -0,0 +1,159 @@
+import time
+import logging
+from ghostos.core.moss import moss_container
+from ghostos.container import Container
+from ghostos.ghosts.moss_agent import MossAgent
+from ghostos.ghosts.moss_agent.agent import MossAgentDriver, SessionPyContext, SessionMossRuntimes
+from ghostos.core.messages import FunctionCaller
+
+
+class FakeTaskflow:
+
+    def error(self):
+        return "error"
+
+    def think(self):
+        return "think"
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.container = Container(parent=moss_container(), name="session")
+        self.container.bootstrap()
+        self.logger = logging.getLogger("test")
+        self.state = {}
+        self.upstream = None
+        self.responded = []
+
+    def respond(self, messages):
+        self.responded.extend(messages)
+        return messages, []
+
+    def taskflow(self):
+        return FakeTaskflow()
+
+    def get_context(self):
+        return None
+
+
+class CountingDriver(MossAgentDriver):
+    compiled = 0
+
+    def _get_moss_compiler(self, session):
+        self.compiled += 1
+        return super()._get_moss_compiler(session)
+
+
+def new_driver() -> CountingDriver:
+    agent = MossAgent(
+        moss_module="ghostos.demo.agents.ghostos_meta",
+        persona="persona",
+        instruction="instruction",
+    )
+    return CountingDriver(agent)
+
+
+def test_moss_agent_shares_runtime_in_session():
+    driver = new_driver()
+    session = FakeSession()
+    runtime = driver.get_moss_runtime(session)
+    instructions = driver.get_instructions(session)
+    assert instructions
+    assert driver.actions(session)[-1].runtime is runtime
+    assert driver.get_moss_runtime(session) is runtime
+
+    # executed moss code changes the pycontext, the runtime is compiled again.
+    pycontext = SessionPyContext(module="ghostos.demo.agents.ghostos_meta", execute_code="print(1)")
+    pycontext.bind(session)
+    assert driver.get_moss_runtime(session) is not runtime
+
+    session.container.shutdown()
+    assert runtime.module() is not None
+    assert runtime._closed
+
+
+def test_moss_agent_runtime_per_event_overhead():
+    driver = new_driver()
+    rounds = 10
+
+    # before: every driver call compiles its own runtime.
+    start = time.perf_counter()
+    for i in range(rounds):
+        session = FakeSession()
+        for _ in range(3):
+            compiler = driver._get_moss_compiler(session)
+            with compiler:
+                with compiler.compile(None) as rtm:
+                    driver._get_instructions(session, rtm)
+        session.container.shutdown()
+    before = time.perf_counter() - start
+
+    driver.compiled = 0
+    start = time.perf_counter()
+    for i in range(rounds):
+        session = FakeSession()
+        for _ in range(3):
+            driver.get_instructions(session)
+        session.container.shutdown()
+    after = time.perf_counter() - start
+    print(f"\nmoss agent per event overhead: before {before / rounds:.4f}s, after {after / rounds:.4f}s")
+    assert driver.compiled == rounds
+
+
+def test_moss_agent_runtime_discarded_after_failed_action():
+    driver = new_driver()
+    session = FakeSession()
+    runtime = driver.get_moss_runtime(session)
+    action = driver.actions(session)[-1]
+    code = "def run(moss):\n    global leaked\n    leaked = 1\n    print('failed output')\n    raise ValueError('failed')\n"
+    op = action.run(session, FunctionCaller(name="moss", arguments=code))
+    assert op == "error"
+    assert "failed" in session.responded[-1].content
+
+    # the failed runtime is not reused.
+    rtm = driver.get_moss_runtime(session)
+    assert rtm is not runtime
+    assert "leaked" not in rtm.module().__dict__
+
+    action = driver.actions(session)[-1]
+    assert action.runtime is rtm
+    code = "def run(moss):\n    print('passed output')\n"
+    op = action.run(session, FunctionCaller(name="moss", arguments=code))
+    assert op == "think"
+    output = session.responded[-1].content
+    assert "passed output" in output
+    assert "failed output" not in output
+
+    session.container.shutdown()
+    assert runtime._closed
+    assert rtm._closed
+
+
+def test_moss_agent_artifact_by_moss_module():
+    from types import ModuleType
+    agent = MossAgent(
+        moss_module="ghostos.demo.agents.ghostos_meta",
+        compile_module="__moss_agent_compiled__",
+        persona="persona",
+        instruction="instruction",
+    )
+    module = ModuleType("fake_agent")
+    module.__moss_agent_artifact__ = lambda ghost, moss: "artifact"
+
+    class ArtifactDriver(MossAgentDriver):
+        def get_module(self):
+            return module
+
+    driver = ArtifactDriver(agent)
+    session = FakeSession()
+    assert driver.get_moss_runtime(session).module().__name__ == "__moss_agent_compiled__"
+    assert driver.get_artifact(session) == "artifact"
+    # the artifact is produced by the runtime of the moss module, compiled apart from the compile module.
+    runtimes = session.container.force_fetch(SessionMossRuntimes)
+    runtime = runtimes.get(agent.moss_module, driver.get_pycontext(session))
+    assert runtime is not None
+    assert runtime.module().__name__ == agent.moss_module
+    assert driver.get_moss_runtime(session, agent.moss_module) is runtime
+    assert driver.get_moss_runtime(session) is not runtime
+    session.container.shutdown()
@@ -0,0 +1,41 @@
+from ghostos.helpers import BoundedOutput, BufferPrint
+from contextlib import redirect_stdout
+
+
+def test_bounded_output_keeps_head_and_tail():
+    chunks = []
+    out = BoundedOutput(max_chars=20, head_chars=10, on_write=chunks.append)
+    with redirect_stdout(out):
+        for i in range(100):
+            print(i)
+    value = out.getvalue()
+    assert value.startswith("0\n1\n2\n3\n4\n")
+    assert value.endswith("97\n98\n99\n")
+    assert out.dropped() > 0
+    assert "chars omitted" in value
+    assert "".join(chunks) == "".join(f"{i}\n" for i in range(100))
+
+
+def test_bounded_output_unlimited():
+    out = BoundedOutput(max_chars=0)
+    out.write("hello " * 10000)
+    assert out.getvalue() == "hello " * 10000
+
+
+def test_buffer_print():
+    printer = BufferPrint()
+    printer.print("hello")
+    printer.print("world")
+    assert printer.buffer() == "hello\nworld\n"
+
+
+def test_bounded_output_clear():
+    chunks = []
+    out = BoundedOutput(max_chars=10, on_write=chunks.append)
+    out.write("hello world" * 3)
+    out.clear()
+    assert out.getvalue() == ""
+    assert out.dropped() == 0
+    out.write("hello")
+    assert out.getvalue() == "hello"
+    assert len(chunks) == 2
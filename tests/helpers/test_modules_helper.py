@@ -5,3 +5,54 @@ def test_get_calling_modulename():
     modulename = get_calling_modulename()
     assert modulename is not None
     assert "test_modules" in modulename
+
+
+def test_import_path_registry_follows_reload(tmp_path):
+    import importlib
+    import sys
+    from ghostos.helpers import import_from_path, rewrite_module, import_path_registry
+    modulename = "_test_import_path_registry_module"
+    filename = tmp_path / f"{modulename}.py"
+    filename.write_text("class Foo:\n    value = 1\n")
+    sys.path.insert(0, str(tmp_path))
+    invalidated = []
+    import_path_registry.add_invalidation_hook(invalidated.append)
+    try:
+        foo = import_from_path(f"{modulename}:Foo")
+        assert foo.value == 1
+        assert import_from_path(f"{modulename}:Foo") is foo
+        assert import_from_path(f"{modulename}:Foo.value") == 1
+        # the nested attribute is reassigned, the top level one is the same.
+        foo.value = 10
+        assert import_from_path(f"{modulename}:Foo.value") == 10
+        foo.value = 1
+
+        module = sys.modules[modulename]
+        rewrite_module(module, "class Foo:\n    value = 2\n")
+        assert modulename in invalidated
+        importlib.invalidate_caches()
+        importlib.reload(module)
+        assert import_from_path(f"{modulename}:Foo").value == 2
+
+        # the module is replaced in sys.modules.
+        del sys.modules[modulename]
+        filename.write_text("class Foo:\n    value = 3\n")
+        importlib.invalidate_caches()
+        assert import_from_path(f"{modulename}:Foo").value == 3
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop(modulename, None)
+        import_path_registry.remove_invalidation_hook(invalidated.append)
+
+
+def test_generate_import_path_follows_qualname():
+    from ghostos.helpers import generate_import_path
+
+    class Foo:
+        pass
+
+    path = generate_import_path(Foo)
+    assert path == generate_import_path(Foo)
+    assert path.endswith("test_generate_import_path_follows_qualname.<locals>.Foo")
+    Foo.__qualname__ = "Bar"
+    assert generate_import_path(Foo).endswith(":Bar")
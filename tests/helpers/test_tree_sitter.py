@@ -37,3 +37,25 @@ print(source)
 """
     error = code_syntax_check(code.strip())
     assert error and "hello world)" in error
+
+
+def test_incremental_tree_parser():
+    from ghostos.helpers.tree_sitter import IncrementalTreeParser, tree_sitter_parse
+    source = "def main():\n    print('hello')\n"
+    parser = IncrementalTreeParser(source)
+    assert parser.syntax_check() is None
+
+    error = parser.syntax_check(source + "\nx = = 1\n")
+    assert error is not None
+    assert "line 4" in error
+    assert error == code_syntax_check(source + "\nx = = 1\n")
+
+    edited = source + "\ndef foo():\n    return 1\n"
+    assert parser.syntax_check(edited) is None
+    assert parser.tree().root_node.sexp() == tree_sitter_parse(edited).root_node.sexp()
+
+
+def test_tree_sitter_parse_cached():
+    from ghostos.helpers.tree_sitter import tree_sitter_parse
+    code = "a = 1"
+    assert tree_sitter_parse(code) is tree_sitter_parse(code)
@@ -0,0 +1,140 @@
+from ghostos.core.runtime import GoThreadInfo, EventTypes
+from ghostos.core.moss import PyContext
+from ghostos.prototypes.ghostfunc.driver import (
+    GhostFuncCache, get_ghost_func_cache, save_ghost_func_cache, ghost_func_key, precompile_ghost_func_cache,
+    MOSS_EXEC_FILENAME,
+)
+from threading import Thread
+import yaml
+
+
+def new_thread(code: str) -> GoThreadInfo:
+    pycontext = PyContext(module=None, execute_code=code, executed=True)
+    e = EventTypes.ROTATE.new(task_id="", messages=[], from_task_id="")
+    return GoThreadInfo.new(event=e, pycontext=pycontext)
+
+
+def test_ghost_func_key_follows_source():
+    assert ghost_func_key("foo", "def foo(a: int): ...") == ghost_func_key("foo", "def foo(a: int): ...")
+    assert ghost_func_key("foo", "def foo(a: int): ...") != ghost_func_key("foo", "def foo(a: str): ...")
+
+
+def test_ghost_func_cache_shared_in_process(tmp_path):
+    filename = str(tmp_path / "shared.ghost_func.yml")
+    cache = get_ghost_func_cache("foo", filename)
+    assert get_ghost_func_cache("foo", filename) is cache
+    cache.set_thread("a", new_thread("a = 1"))
+    save_ghost_func_cache(cache)
+    assert get_ghost_func_cache("foo", filename) is cache
+    assert cache.get_generated_code("a") == "a = 1"
+
+
+def test_ghost_func_cache_concurrent_save(tmp_path):
+    filename = str(tmp_path / "concurrent.ghost_func.yml")
+    cache = get_ghost_func_cache("foo", filename)
+
+    def run(i: int):
+        cache.set_thread(ghost_func_key(f"fn_{i}", "source"), new_thread(f"a = {i}"))
+        save_ghost_func_cache(cache)
+
+    threads = [Thread(target=run, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with open(filename) as f:
+        data = yaml.safe_load(f)
+    assert len(data["threads"]) == 8
+    # no temp file or lock file left.
+    assert [p.name for p in tmp_path.iterdir()] == ["concurrent.ghost_func.yml"]
+
+
+def test_ghost_func_cache_merge_others_saving(tmp_path):
+    filename = str(tmp_path / "merge.ghost_func.yml")
+    a, b, c = (ghost_func_key(name, "source") for name in ("a", "b", "c"))
+    cache = get_ghost_func_cache("foo", filename)
+    cache.set_thread(a, new_thread("a = 1"))
+    save_ghost_func_cache(cache)
+
+    # another process saves the file.
+    other = GhostFuncCache(modulename="foo", filename=filename)
+    other.set_thread(b, new_thread("b = 2"))
+    save_ghost_func_cache(other)
+
+    cache.set_thread(c, new_thread("c = 3"))
+    save_ghost_func_cache(cache)
+    with open(filename) as f:
+        data = yaml.safe_load(f)
+    assert set(data["threads"].keys()) == {a, b, c}
+
+
+def test_precompile_ghost_func_cache(tmp_path):
+    from ghostos.core.moss.impl import moss_exec_cache
+    cache = GhostFuncCache(modulename="foo", filename=str(tmp_path / "compile.ghost_func.yml"))
+    code = "def __main__(args, kwargs):\n    return 123, True\n"
+    cache.set_thread("a", new_thread(code))
+    assert precompile_ghost_func_cache(cache) == 1
+    compiled = moss_exec_cache.get_code(MOSS_EXEC_FILENAME, code)
+    assert moss_exec_cache.get_code(MOSS_EXEC_FILENAME, code) is compiled
+
+
+def test_ghost_func_cache_drop_outdated_threads(tmp_path):
+    filename = str(tmp_path / "outdated.ghost_func.yml")
+    old_key = ghost_func_key("foo", "def foo(a: int): ...")
+    other_key = ghost_func_key("bar", "def bar(): ...")
+    with open(filename, "w") as f:
+        data = {
+            "modulename": "foo",
+            "filename": filename,
+            "threads": {
+                "foo": new_thread("a = 0").model_dump(exclude_defaults=True),
+                old_key: new_thread("a = 1").model_dump(exclude_defaults=True),
+                other_key: new_thread("b = 1").model_dump(exclude_defaults=True),
+            },
+        }
+        f.write(yaml.safe_dump(data))
+
+    cache = get_ghost_func_cache("foo", filename)
+    new_key = ghost_func_key("foo", "def foo(a: str): ...")
+    cache.set_thread(new_key, new_thread("a = 2"))
+    save_ghost_func_cache(cache)
+    with open(filename) as f:
+        data = yaml.safe_load(f)
+    assert set(data["threads"].keys()) == {new_key, other_key}
+
+
+def test_ghost_func_cache_migrate_legacy_threads(tmp_path):
+    from ghostos.container import Container
+    from ghostos.prototypes.ghostfunc.driver import GhostFuncDriver
+    filename = str(tmp_path / "legacy.ghost_func.yml")
+    # the cache file saved before the keys have the source hash.
+    with open(filename, "w") as f:
+        data = {
+            "modulename": "foo",
+            "filename": filename,
+            "threads": {
+                "foo": new_thread("a = 0").model_dump(exclude_defaults=True),
+                "bar": new_thread("b = 0").model_dump(exclude_defaults=True),
+            },
+        }
+        f.write(yaml.safe_dump(data))
+
+    cache = get_ghost_func_cache("foo", filename)
+    source = "def foo(): ..."
+    driver = GhostFuncDriver(
+        container=Container(),
+        cache=cache,
+        target_module="foo",
+        target_file=filename,
+        target_source=source,
+        target_qualname="foo",
+    )
+    driver._run = lambda thread, args, kwargs: thread.last_turn().pycontext.execute_code
+    assert driver.execute([], {}) == "a = 0"
+    save_ghost_func_cache(cache)
+    with open(filename) as f:
+        data = yaml.safe_load(f)
+    key = ghost_func_key("foo", source)
+    # the legacy thread of foo is migrated, the one of bar is kept.
+    assert set(data["threads"].keys()) == {key, "bar"}
+    assert cache.get_generated_code(key) == "a = 0"
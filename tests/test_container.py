@@ -4,6 +4,7 @@ from abc import ABCMeta, abstractmethod
 from typing import Type, Dict, get_args, get_origin, ClassVar
 
 from ghostos.container import Container, Provider, provide
+import pytest
 
 
 def test_container_baseline():
@@ -188,3 +189,91 @@ def test_container_shutdown():
     assert Foo.instance_count == 1
     container.shutdown()
     assert Foo.instance_count == 0
+
+
+def test_container_inherited_resolution_follows_changes():
+    class Foo:
+        def __init__(self, foo: int):
+            self.foo = foo
+
+    root = Container()
+    middle = Container(parent=root)
+    leaf = Container(parent=middle)
+    assert leaf.get(Foo) is None
+    root.set(Foo, Foo(1))
+    assert leaf.force_fetch(Foo).foo == 1
+    # the closer ancestor binds it later.
+    middle.set(Foo, Foo(2))
+    assert leaf.force_fetch(Foo).foo == 2
+    middle.register(provide(Foo, singleton=False)(lambda c: Foo(3)))
+    assert leaf.force_fetch(Foo).foo == 3
+
+
+def test_container_children_share_bindings_copy_on_write():
+    class Foo:
+        def __init__(self, foo: int):
+            self.foo = foo
+
+    class Bar:
+        pass
+
+    root = Container()
+    root.register(provide(Foo, singleton=False)(lambda c: Foo(1)))
+    child = Container(parent=root)
+    other = Container(parent=root)
+    child.register(provide(Foo, singleton=False)(lambda c: Foo(2)))
+    child.set(Bar, Bar())
+    assert child.force_fetch(Foo).foo == 2
+    assert other.force_fetch(Foo).foo == 1
+    assert root.force_fetch(Foo).foo == 1
+    assert not other.bound(Bar)
+
+    # new providers of the parent are inherited by the new children.
+    root.register(provide(Bar, singleton=False)(lambda c: Bar()))
+    assert Container(parent=root).get_provider(Bar) is not None
+
+
+def test_frozen_container_template():
+    class Foo:
+        pass
+
+    template = Container(name="template")
+    template.register(provide(Foo, singleton=False)(lambda c: Foo()))
+    template.freeze()
+    assert template.frozen()
+    with pytest.raises(RuntimeError):
+        template.set(Foo, Foo())
+    with pytest.raises(RuntimeError):
+        template.register(provide(Foo, singleton=False)(lambda c: Foo()))
+
+    session = Container(parent=template, name="session")
+    foo = Foo()
+    session.set(Foo, foo)
+    assert session.force_fetch(Foo) is foo
+    assert template.force_fetch(Foo) is not foo
+
+
+def test_container_resolved_cache_per_chain():
+    class Foo:
+        pass
+
+    class Bar:
+        pass
+
+    root = Container()
+    foo = Foo()
+    root.set(Foo, foo)
+    child = Container(parent=root)
+    assert child.get(Foo) is foo
+    resolved = child._resolved[Foo]
+
+    # the bindings of the other containers do not expire the cache.
+    other = Container(parent=root)
+    other.set(Bar, Bar())
+    assert child.get(Foo) is foo
+    assert child._resolved[Foo] is resolved
+
+    # the ancestor changed.
+    root.set(Bar, Bar())
+    assert child.get(Foo) is foo
+    assert child._resolved[Foo] is not resolved
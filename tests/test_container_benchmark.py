@@ -0,0 +1,65 @@
+from ghostos.container import Container, provide
+import timeit
+
+# microseconds per operation, generous for slow CI machines.
+BUDGETS = {
+    "force_fetch_root": 20,
+    "force_fetch_inherited": 40,
+    "create_and_shutdown": 500,
+    "create_from_template": 500,
+}
+
+
+class Foo:
+    pass
+
+
+def new_chain(depth: int = 5, providers: int = 40) -> Container:
+    """
+    a chain of containers like app => shell => conversation => session => moss.
+    """
+    root = Container(name="app")
+    for i in range(providers):
+        contract = type(f"Contract{i}", (), {})
+        root.register(provide(contract, singleton=False)(lambda c: object()))
+    root.set(Foo, Foo())
+    root.bootstrap()
+    container = root
+    for i in range(depth - 1):
+        container = Container(parent=container, name=f"level_{i}")
+        container.bootstrap()
+    return container
+
+
+def per_op(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+
+def test_container_benchmark():
+    leaf = new_chain()
+    root = leaf
+    while root.parent is not None:
+        root = root.parent
+
+    def create_and_shutdown():
+        c = Container(parent=leaf, name="session")
+        c.bootstrap()
+        c.shutdown()
+
+    template = Container(parent=leaf, name="template").freeze()
+
+    def create_from_template():
+        c = Container(parent=template, name="session")
+        c.set(Foo, Foo())
+        c.bootstrap()
+        c.shutdown()
+
+    costs = {
+        "force_fetch_root": per_op(lambda: root.force_fetch(Foo), 10000),
+        "force_fetch_inherited": per_op(lambda: leaf.force_fetch(Foo), 10000),
+        "create_and_shutdown": per_op(create_and_shutdown, 1000),
+        "create_from_template": per_op(create_from_template, 1000),
+    }
+    print("\n" + "\n".join(f"{name}: {cost:.2f}us" for name, cost in costs.items()))
+    for name, cost in costs.items():
+        assert cost < BUDGETS[name], name
@@ -36,3 +36,51 @@ def test_entities():
         meta = to_entity_meta(c)
         value = from_entity_meta(meta)
         assert value == c, f"{c}: {value}"
+
+
+def test_entities_decode_legacy_records():
+    import yaml
+    import pickle
+    import base64
+    cases = [
+        [1, 2, {"a": "b"}],
+        {"a": [1, 2], "b": {"c": None}},
+        {1: "a"},
+        [],
+        {},
+    ]
+    for c in cases:
+        legacy = {"type": "list" if isinstance(c, list) else "dict", "content": yaml.safe_dump(c)}
+        assert from_entity_meta(legacy) == c
+    legacy_pickle = {"type": "pickle", "content": base64.encodebytes(pickle.dumps(Foo())).decode()}
+    assert from_entity_meta(legacy_pickle) == Foo()
+    legacy_str = {"type": "pickle", "content": base64.encodebytes(pickle.dumps("hello")).decode()}
+    assert from_entity_meta(legacy_str) == "hello"
+
+
+def test_entities_json_containers_readable_by_yaml():
+    import yaml
+    value = {"a": [1, 2.5, True, None, "中文"], "b": {"c": "[not json]"}}
+    meta = to_entity_meta(value)
+    assert yaml.safe_load(meta["content"]) == value
+    # not json safe values keep yaml.
+    meta = to_entity_meta({1: [1, 2]})
+    assert from_entity_meta(meta) == {1: [1, 2]}
+
+
+def test_entity_type_follows_redefinition():
+    import sys
+    module = sys.modules[__name__]
+    meta = to_entity_meta(Baz(baz="world"))
+    assert from_entity_meta(meta) == Baz(baz="world")
+    origin = module.Baz
+
+    class Baz2(BaseModel):
+        baz: str = "redefined"
+
+    try:
+        setattr(module, "Baz", Baz2)
+        assert isinstance(from_entity_meta(meta), Baz2)
+    finally:
+        setattr(module, "Baz", origin)
+    assert isinstance(from_entity_meta(meta), Baz)
@@ -0,0 +1,57 @@
+from typing import Dict, Any, List
+from ghostos.entity import to_entity_meta, from_entity_meta, EntityMeta
+from ghostos.core.messages import Role
+from pydantic import BaseModel, Field
+import base64
+import pickle
+import timeit
+import yaml
+
+
+class Plan(BaseModel):
+    goal: str = ""
+    steps: List[str] = Field(default_factory=list)
+    done: Dict[str, bool] = Field(default_factory=dict)
+
+
+def realistic_state() -> Dict[str, Any]:
+    """
+    state values of a task like the ones saved by the session at each event.
+    """
+    return {
+        "counter": 42,
+        "ratio": 0.5,
+        "name": "the assistant that helps the user to plan the trip",
+        "plan": Plan(goal="trip", steps=[f"step {i}" for i in range(20)], done={f"step {i}": i % 2 == 0 for i in range(20)}),
+        "variables": {f"var_{i}": {"value": i, "tags": ["a", "b"], "desc": "x" * 40} for i in range(30)},
+        "history": [Role.USER.new(content=f"message {i} " * 10).model_dump(exclude_defaults=True) for i in range(20)],
+        "tags": ["travel", "plan", "budget"] * 10,
+    }
+
+
+def legacy_to_entity_meta(value: Any) -> EntityMeta:
+    """
+    the codec before json, lists and dicts are dumped by yaml and strings are pickled.
+    """
+    if isinstance(value, (list, dict)):
+        return EntityMeta(type="list" if isinstance(value, list) else "dict", content=yaml.safe_dump(value))
+    elif isinstance(value, str):
+        return EntityMeta(type="pickle", content=base64.encodebytes(pickle.dumps(value)).decode())
+    return to_entity_meta(value)
+
+
+def round_trip(state: Dict[str, Any], encoder) -> Dict[str, Any]:
+    metas = {key: encoder(value) for key, value in state.items()}
+    return {key: from_entity_meta(meta) for key, meta in metas.items()}
+
+
+def test_entity_codec_benchmark():
+    state = realistic_state()
+    assert round_trip(state, to_entity_meta) == state
+    assert round_trip(state, legacy_to_entity_meta) == state
+
+    number = 50
+    fast = timeit.timeit(lambda: round_trip(state, to_entity_meta), number=number) / number * 1e3
+    legacy = timeit.timeit(lambda: round_trip(state, legacy_to_entity_meta), number=number) / number * 1e3
+    print(f"\nround trip of a task state: {fast:.3f}ms, legacy yaml/pickle codec: {legacy:.3f}ms")
+    assert fast < legacy
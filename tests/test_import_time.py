@@ -0,0 +1,50 @@
+from typing import Dict, Tuple
+import subprocess
+import sys
+import pytest
+
+# cumulative import time budgets in seconds, measured by `python -X importtime`.
+# the budgets are generous for slow CI machines, the modules import in a fraction of them locally.
+IMPORT_BUDGETS = {
+    "ghostos": 0.5,
+    "ghostos.bootstrap": 2.0,
+    "ghostos.scripts.cli": 1.5,
+}
+
+# heavy packages that shall be imported lazily at the first usage.
+LAZY_PACKAGES = ["openai", "litellm", "streamlit"]
+
+
+def measure_import(modulename: str) -> Tuple[float, Dict[str, bool]]:
+    """
+    import the module in a fresh interpreter.
+    :return: (cumulative import seconds, {lazy package name: imported})
+    """
+    code = (
+        f"import sys, {modulename}\n"
+        f"print(','.join(name for name in {LAZY_PACKAGES!r} if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == modulename:
+            cumulative = int(parts[1].strip())
+    imported = set(result.stdout.strip().split(","))
+    return cumulative / 1e6, {name: name in imported for name in LAZY_PACKAGES}
+
+
+@pytest.mark.parametrize("modulename", list(IMPORT_BUDGETS.keys()))
+def test_import_time_budget(modulename: str):
+    seconds, imported = measure_import(modulename)
+    print(f"\nimport {modulename}: {seconds:.3f}s, heavy packages imported: {imported}")
+    assert seconds < IMPORT_BUDGETS[modulename]
+    for name, ok in imported.items():
+        assert not ok, f"{name} shall not be imported by `import {modulename}`"
@@ -1,9 +1,12 @@
 from ghostos.prompter import (
     TextPrmt, PromptAbleClass, PromptAbleObj, ModelPrompter,
-    InspectPrmt,
+    InspectPrmt, prompt_cache,
 )
 from ghostos.container import Container
+from typing import ClassVar, List
 import inspect
+import os
+import time
 
 
 def test_is_abstract():
@@ -51,3 +54,100 @@ def test_model_prompters():
 
     t = TestPrompter()
     assert "TestPrompter" in t.get_prompt(Container())
+
+
+class CountingPrmt(ModelPrompter):
+    content: str = ""
+    dependency: str = ""
+
+    __prompt_cacheable__ = True
+    rendered: ClassVar[int] = 0
+
+    def self_prompt(self, container: Container) -> str:
+        CountingPrmt.rendered += 1
+        if self.dependency:
+            with open(self.dependency) as f:
+                return self.content + f.read()
+        return self.content
+
+    def get_title(self) -> str:
+        return ""
+
+    def get_prompt_dependencies(self) -> List[str]:
+        return [self.dependency] if self.dependency else []
+
+
+class SlowPrmt(ModelPrompter):
+    content: str = ""
+
+    def self_prompt(self, container: Container) -> str:
+        time.sleep(0.05)
+        return self.content
+
+    def get_title(self) -> str:
+        return self.content
+
+
+def test_prompt_cache_by_content():
+    prompt_cache.clear()
+    CountingPrmt.rendered = 0
+    c = Container()
+    assert CountingPrmt(content="hello").get_prompt(c) == "hello"
+    # rebuilt prompter with the same content.
+    assert CountingPrmt(content="hello").get_prompt(c) == "hello"
+    assert CountingPrmt.rendered == 1
+    assert CountingPrmt(content="world").get_prompt(c) == "world"
+    assert CountingPrmt.rendered == 2
+
+
+def test_prompt_cache_expired_by_dependency(tmp_path):
+    prompt_cache.clear()
+    filename = tmp_path / "dependency.txt"
+    filename.write_text(" v1")
+    c = Container()
+    assert CountingPrmt(content="hello", dependency=str(filename)).get_prompt(c) == "hello v1"
+    filename.write_text(" v2")
+    os.utime(filename, (time.time() + 10, time.time() + 10))
+    assert CountingPrmt(content="hello", dependency=str(filename)).get_prompt(c) == "hello v2"
+
+
+def test_prompter_parallel_rendering():
+    def new_prompter():
+        return TextPrmt(title="root").with_children(
+            *[SlowPrmt(content=f"child {i}").with_children(TextPrmt(content=f"grandchild {i}")) for i in range(4)]
+        )
+
+    from ghostos.contracts.pool import Pool, DefaultPool
+    c = Container()
+    sequential = new_prompter()
+    expected = sequential.get_prompt(c)
+    # no pool bound, rendered sequentially.
+    assert new_prompter().get_prompt(c, parallel=True) == expected
+
+    pool = DefaultPool(4)
+    c.set(Pool, pool)
+    parallel = new_prompter()
+    start = time.time()
+    assert parallel.get_prompt(c, parallel=True) == expected
+    assert time.time() - start < 0.05 * 4
+
+    times = parallel.get_render_times()
+    assert set(times.keys()) == set(parallel.flatten().keys())
+    assert times["0"] >= max(times[f"0.{i}"] for i in range(4))
+
+    # the busy pool does not block the rendering.
+    busy = DefaultPool(1)
+    c.set(Pool, busy)
+    busy.submit(time.sleep, 0.5)
+    start = time.time()
+    assert new_prompter().get_prompt(c, parallel=True) == expected
+    assert time.time() - start < 0.5
+    pool.shutdown()
+    busy.shutdown()
+
+
+def test_text_prompter_not_cached():
+    prompter = TextPrmt(title="not cached", content="hello")
+    assert not prompter.__prompt_cacheable__
+    assert "hello" in prompter.get_prompt(Container())
+    assert prompt_cache.get(prompter.get_prompt_cache_key()) is None